@@ -1,9 +1,13 @@
 import logging
+import math
+import struct
+import sys
+from array import array
 
-from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.db.models.functions import Transform
+from django.contrib.gis.geos import Polygon
 from django.utils import translation
 from django.utils.translation import ugettext as _
-from django.contrib.gis.geos import LineString
 from django.conf import settings
 from django.db import connection
 
@@ -21,33 +25,47 @@ class AltimetryHelper(object):
 
         :precision:  geometry sampling in meters
         """
-        precision = precision or settings.ALTIMETRIC_PROFILE_PRECISION
+        geom3dapi = geometry3d.transform(settings.API_SRID, clone=True)
+        return cls._elevation_profile(geometry3d, geom3dapi, offset)
 
+    @classmethod
+    def _elevation_profile(cls, geometry3d, geom3dapi, offset=0):
+        """Join (distance, x, y, z) together, distances from origin being
+        measured along the 2D native geometry.
+        """
         if geometry3d.geom_type == 'MultiLineString':
-            profile = []
-            for subcoords in geometry3d.coords:
-                subline = LineString(subcoords, srid=geometry3d.srid)
-                offset += subline.length
-                subprofile = AltimetryHelper.elevation_profile(subline, precision, offset)
-                profile.extend(subprofile)
-            return profile
-
-        # Add measure to 2D version of geometry3d
-        # Get distance from origin for each vertex
-        sql = """
-        WITH line2d AS (SELECT ST_Force2D('%(ewkt)s'::geometry) AS geom),
-             line_measure AS (SELECT ST_Addmeasure(geom, 0, ST_length(geom)) AS geom FROM line2d),
-             points2dm AS (SELECT (ST_DumpPoints(geom)).geom AS point FROM line_measure)
-        SELECT (%(offset)s + ST_M(point)) FROM points2dm;
-        """ % {'offset': offset, 'ewkt': geometry3d.ewkt}
-        cursor = connection.cursor()
-        cursor.execute(sql)
-        pointsm = cursor.fetchall()
-        # Join (offset+distance, x, y, z) together
-        geom3dapi = geometry3d.transform(settings.API_SRID, clone=True)
-        assert len(pointsm) == len(geom3dapi.coords), 'Cannot map distance to xyz'
-        dxyz = [pointsm[i] + v for i, v in enumerate(geom3dapi.coords)]
-        return dxyz
+            lines, lines_api = geometry3d.coords, geom3dapi.coords
+        elif geometry3d.geom_type == 'Point':
+            lines, lines_api = [(geometry3d.coords,)], [(geom3dapi.coords,)]
+        else:
+            lines, lines_api = [geometry3d.coords], [geom3dapi.coords]
+
+        profile = []
+        distance = offset
+        for coords, coords_api in zip(lines, lines_api):
+            assert len(coords) == len(coords_api), 'Cannot map distance to xyz'
+            previous = coords[0]
+            for point, point_api in zip(coords, coords_api):
+                distance += math.hypot(point[0] - previous[0], point[1] - previous[1])
+                profile.append((distance,) + tuple(point_api))
+                previous = point
+        return profile
+
+    @classmethod
+    def elevation_profiles(cls, objects):
+        """Extract elevation profiles of several objects (with ``geom_3d``)
+        in one query. Returns a dict {pk: profile}.
+        """
+        profiles = {}
+        by_model = {}
+        for obj in objects:
+            by_model.setdefault(type(obj), []).append(obj.pk)
+        for model, pks in by_model.items():
+            qs = model.objects.filter(pk__in=pks, geom_3d__isnull=False)
+            qs = qs.annotate(api_geom_3d=Transform('geom_3d', settings.API_SRID))
+            for pk, geom_3d, api_geom_3d in qs.values_list('pk', 'geom_3d', 'api_geom_3d'):
+                profiles[pk] = cls._elevation_profile(geom_3d, api_geom_3d)
+        return profiles
 
     @classmethod
     def altimetry_limits(cls, profile):
@@ -140,69 +158,51 @@ class AltimetryHelper(object):
             logger.warn("No DEM present")
             return {}
 
+        # Sample the DEM on a grid of points (one pixel per point), resampling
+        # the clipped DEM on a raster centered on those points.
+        resolution_w = (xmax - xmin) // precision + 1
+        resolution_h = (ymax - ymin) // precision + 1
+        xmax = xmin + (resolution_w - 1) * precision
+        ymax = ymin + (resolution_h - 1) * precision
         sql = """
-            -- Author: Celian Garcia
-            WITH columns AS (
-                    SELECT generate_series({xmin}::int, {xmax}::int, {precision}) AS x
+            WITH extent AS (
+                    SELECT ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, %(srid)s) AS geom
                 ),
-                lines AS (
-                    SELECT generate_series({ymin}::int, {ymax}::int, {precision}) AS y
+                dem AS (
+                    SELECT ST_Union(ST_Clip(mnt.rast, extent.geom)) AS rast
+                    FROM mnt, extent
+                    WHERE ST_Intersects(mnt.rast, extent.geom)
                 ),
-                resolution AS (
-                    SELECT x, y
-                    FROM (SELECT COUNT(x) AS x FROM columns) AS col,
-                         (SELECT COUNT(y) AS y FROM lines)   AS lin
-                ),
-                points2d AS (
-                    SELECT row_number() OVER () AS id,
-                           ST_SetSRID(ST_MakePoint(x, y), {srid}) AS geom,
-                           ST_Transform(ST_SetSRID(ST_MakePoint(x, y), {srid}), 4326) AS geomll
-                    FROM lines, columns
-                ),
-                draped AS (
-                    SELECT id, ST_Value(mnt.rast, p.geom)::int AS altitude
-                    FROM mnt, points2d AS p
-                    WHERE ST_Intersects(mnt.rast, p.geom)
-                ),
-                all_draped AS (
-                    SELECT geomll, geom, altitude
-                    FROM points2d LEFT JOIN draped ON (points2d.id = draped.id)
-                    ORDER BY points2d.id
-                ),
-                extent_latlng AS (
-                    SELECT ST_Envelope(ST_Union(geom)) AS extent,
-                           MIN(altitude) AS min_z,
-                           MAX(altitude) AS max_z,
-                           AVG(altitude) AS center_z
-                    FROM all_draped
+                grid AS (
+                    SELECT ST_AddBand(ST_MakeEmptyRaster(%(width)s, %(height)s, %(ulx)s, %(uly)s,
+                                                         %(precision)s, -%(precision)s, 0, 0, %(srid)s),
+                                      '32BF'::text, 0, NULL) AS rast
                 )
-            SELECT extent,
-                   ST_transform(extent, 4326),
-                   center_z,
-                   min_z,
-                   max_z,
-                   resolution.x AS resolution_w,
-                   resolution.y AS resolution_h,
-                   altitude
-            FROM extent_latlng, resolution, all_draped;
-        """.format(xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax,
-                   srid=settings.SRID, precision=precision)
-        cursor.execute(sql)
-        result = cursor.fetchall()
-        first = result[0]
-        envelop_native, envelop, center_z, min_z, max_z, resolution_w, resolution_h, a = first
-        envelop = GEOSGeometry(envelop, srid=4326)
-        envelop_native = GEOSGeometry(envelop_native, srid=settings.SRID)
-
-        altitudes = []
-        row = []
-        for i, record in enumerate(result):
-            if i > 0 and i % resolution_w == 0:
-                altitudes.append(row)
-                row = []
-            elevation = (record[7] or 0.0) - min_z
-            row.append(elevation)
-        altitudes.append(row)
+            SELECT ST_DumpValues(ST_MapAlgebra(grid.rast, 1, ST_Resample(dem.rast, grid.rast), 1,
+                                               '[rast2]', '32BF', 'FIRST'), 1)
+            FROM grid, dem;
+        """
+        cursor.execute(sql, {
+            'xmin': xmin - precision, 'ymin': ymin - precision,
+            'xmax': xmax + precision, 'ymax': ymax + precision,
+            'ulx': xmin - precision / 2.0, 'uly': ymax + precision / 2.0,
+            'width': resolution_w, 'height': resolution_h,
+            'precision': precision, 'srid': settings.SRID,
+        })
+        row = cursor.fetchone()
+        # Raster rows go from north to south
+        values = list(reversed(row[0])) if row and row[0] else [[None] * resolution_w] * resolution_h
+        draped = [int(round(v)) for line in values for v in line if v is not None]
+        min_z = min(draped) if draped else 0
+        max_z = max(draped) if draped else 0
+        center_z = float(sum(draped)) / len(draped) if draped else 0
+
+        envelop_native = Polygon.from_bbox((xmin, ymin, xmax, ymax))
+        envelop_native.srid = settings.SRID
+        envelop = envelop_native.transform(4326, clone=True)
+
+        altitudes = [[(int(round(v)) if v is not None else 0.0) - min_z for v in line]
+                     for line in values]
 
         area = {
             'center': {
@@ -248,3 +248,16 @@ class AltimetryHelper(object):
             'altitudes': altitudes
         }
         return area
+
+    @classmethod
+    def elevation_area_binary(cls, area):
+        """Compact version of the altitudes matrix of an elevation area:
+        width and height (unsigned 16 bits integers) followed by altitudes
+        (signed 16 bits integers, relative to minimum altitude, rows from
+        south to north), all little-endian.
+        """
+        resolution = area.get('resolution', {'x': 0, 'y': 0})
+        altitudes = array('h', [int(v) for line in area.get('altitudes', []) for v in line])
+        if sys.byteorder != 'little':
+            altitudes.byteswap()
+        return struct.pack('<HH', resolution['x'], resolution['y']) + altitudes.tostring()
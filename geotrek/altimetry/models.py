@@ -2,6 +2,7 @@ import os
 
 from django.conf import settings
 from django.contrib.gis.db import models
+from django.core.cache import caches
 from django.utils.translation import get_language, ugettext_lazy as _
 from django.urls import reverse
 
@@ -47,11 +48,60 @@ class AltimetryMixin(models.Model):
         self.slope = fromdb.slope
         return self
 
+    @property
+    def elevation_profile_cache_key(self):
+        """Profile is cached until the object is modified (if it has a ``date_update``)
+        """
+        date_update = getattr(self, 'date_update', None)
+        if self.pk is None or date_update is None:
+            return None
+        return 'elevation_profile_%s_%s_%s' % (self._meta.model_name, self.pk,
+                                               date_update.strftime('%y%m%d%H%M%S%f'))
+
     def get_elevation_profile(self):
-        return AltimetryHelper.elevation_profile(self.geom_3d)
+        cache = caches['fat']
+        cache_key = self.elevation_profile_cache_key
+        profile = cache.get(cache_key) if cache_key else None
+        if profile is None:
+            profile = AltimetryHelper.elevation_profile(self.geom_3d)
+            if cache_key:
+                cache.set(cache_key, profile)
+        return profile
+
+    @classmethod
+    def cache_elevation_profiles(cls, objects):
+        """Compute profiles of objects not in cache yet, in one query
+        """
+        cache = caches['fat']
+        missing = [obj for obj in objects
+                   if obj.elevation_profile_cache_key and cache.get(obj.elevation_profile_cache_key) is None]
+        profiles = AltimetryHelper.elevation_profiles(missing)
+        for obj in missing:
+            if obj.pk in profiles:
+                cache.set(obj.elevation_profile_cache_key, profiles[obj.pk])
+
+    @property
+    def elevation_area_cache_key(self):
+        """Area is cached until the object is modified (if it has a ``date_update``)
+        """
+        date_update = getattr(self, 'date_update', None)
+        if self.pk is None or date_update is None:
+            return None
+        return 'elevation_area_%s_%s_%s' % (self._meta.model_name, self.pk,
+                                            date_update.strftime('%y%m%d%H%M%S%f'))
 
     def get_elevation_area(self):
-        return AltimetryHelper.elevation_area(self.geom)
+        cache = caches['fat']
+        cache_key = self.elevation_area_cache_key
+        area = cache.get(cache_key) if cache_key else None
+        if area is None:
+            area = AltimetryHelper.elevation_area(self.geom)
+            if cache_key:
+                cache.set(cache_key, area)
+        return area
+
+    def get_elevation_area_binary(self):
+        return AltimetryHelper.elevation_area_binary(self.get_elevation_area())
 
     def get_elevation_limits(self):
         return AltimetryHelper.altimetry_limits(self.get_elevation_profile())
@@ -14,6 +14,7 @@ from geotrek.core.factories import TopologyFactory
 from geotrek.altimetry.helpers import AltimetryHelper
 
 import os
+import struct
 import sys
 import mock
 from StringIO import StringIO
@@ -57,6 +58,14 @@ class ElevationTest(TestCase):
         self.assertEqual(profile[5][3], 20.0)
         self.assertEqual(profile[6][3], 22.0)
 
+    @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+    def test_elevation_profiles(self):
+        other = Path.objects.create(geom=LineString((3, 17), (78, 17)))
+        profiles = AltimetryHelper.elevation_profiles([self.path, other])
+        self.assertEqual(profiles[self.path.pk], self.path.get_elevation_profile())
+        self.assertEqual(profiles[other.pk], other.get_elevation_profile())
+        self.assertEqual(profiles[other.pk][-1][0], 75.0)
+
     @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
     def test_elevation_limits(self):
         limits = self.path.get_elevation_limits()
@@ -132,6 +141,14 @@ class ElevationProfileTest(TestCase):
         profile = AltimetryHelper.elevation_profile(geom)
         self.assertEqual(len(profile), 4)
 
+    def test_elevation_profile_multilinestring_distances(self):
+        geom = MultiLineString(LineString((0, 0, 8), (3, 4, 10)),
+                               LineString((3, 4, 6), (3, 10, 7)),
+                               srid=settings.SRID)
+        profile = AltimetryHelper.elevation_profile(geom)
+        self.assertEqual([v[0] for v in profile], [0.0, 5.0, 5.0, 11.0])
+        self.assertEqual([v[3] for v in profile], [8, 10, 6, 7])
+
     def test_elevation_svg_output(self):
         geom = LineString((1.5, 2.5, 8), (2.5, 2.5, 10),
                           srid=settings.SRID)
@@ -226,6 +243,19 @@ class ElevationAreaTest(TestCase):
         self.assertEqual(extent['altitudes']['max'], 45)
         self.assertEqual(extent['altitudes']['min'], 0)
 
+    def test_area_provides_altitudes_from_south_to_north(self):
+        # Third row (y=19) crosses the southern row of the DEM
+        self.assertEqual(self.area['altitudes'][0], [0] * 53)
+        for altitude in self.area['altitudes'][2][3:6]:
+            self.assertIn(altitude, [30, 35, 40, 45])
+
+    def test_area_binary(self):
+        data = AltimetryHelper.elevation_area_binary(self.area)
+        self.assertEqual(len(data), 4 + 2 * 53 * 33)
+        self.assertEqual(struct.unpack('<HH', data[:4]), (53, 33))
+        altitudes = struct.unpack('<%sh' % (53 * 33), data[4:])
+        self.assertEqual(list(altitudes[:53]), self.area['altitudes'][0])
+
 
 @skipIf(settings.TREKKING_TOPOLOGY_ENABLED, 'Test without dynamic segmentation only')
 class LengthTest(TestCase):
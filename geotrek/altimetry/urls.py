@@ -3,7 +3,8 @@ from django.conf.urls import url
 from mapentity.registry import MapEntityOptions
 
 from geotrek.altimetry.views import (ElevationProfile, ElevationChart,
-                                     ElevationArea, serve_elevation_chart)
+                                     ElevationArea, ElevationAreaBinary,
+                                     serve_elevation_chart)
 
 
 urlpatterns = [
@@ -14,6 +15,7 @@ urlpatterns = [
 class AltimetryEntityOptions(MapEntityOptions):
     elevation_profile_view = ElevationProfile
     elevation_area_view = ElevationArea
+    elevation_area_binary_view = ElevationAreaBinary
     elevation_chart_view = ElevationChart
 
     def scan_views(self, *args, **kwargs):
@@ -27,6 +29,9 @@ class AltimetryEntityOptions(MapEntityOptions):
             url(r'^api/(?P<lang>\w+)/{modelname}s/(?P<pk>\d+)/dem.json$'.format(modelname=self.modelname),
                 self.elevation_area_view.as_view(model=self.model),
                 name="%s_elevation_area" % self.modelname),
+            url(r'^api/(?P<lang>\w+)/{modelname}s/(?P<pk>\d+)/dem.bin$'.format(modelname=self.modelname),
+                self.elevation_area_binary_view.as_view(model=self.model),
+                name="%s_elevation_area_binary" % self.modelname),
             url(r'^api/(?P<lang>\w+)/{modelname}s/(?P<pk>\d+)/profile.svg$'.format(modelname=self.modelname),
                 self.elevation_chart_view.as_view(model=self.model),
                 name='%s_profile_svg' % self.modelname),
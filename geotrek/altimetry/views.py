@@ -73,6 +73,15 @@ class ElevationArea(LastModifiedMixin, JSONResponseMixin, PublicOrReadPermMixin,
         return self.object.get_elevation_area()
 
 
+class ElevationAreaBinary(LastModifiedMixin, PublicOrReadPermMixin, BaseDetailView):
+    """Extract altitudes matrix on an area and return it in a compact binary format
+    (see ``AltimetryHelper.elevation_area_binary``), metadata remain in JSON version"""
+
+    def render_to_response(self, context, **response_kwargs):
+        return HttpResponse(self.object.get_elevation_area_binary(),
+                            content_type='application/octet-stream', **response_kwargs)
+
+
 def serve_elevation_chart(request, model_name, pk, from_command=False):
     model = get_object_or_404(ContentType, model=model_name).model_class()
     if not issubclass(model, AltimetryMixin):
@@ -7,14 +7,12 @@ from PIL import Image
 import re
 import shutil
 from time import sleep
-from zipfile import ZipFile
 import cairosvg
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Q
-from django.http import StreamingHttpResponse
 from django.test.client import RequestFactory
 from django.utils import translation
 from django.utils.translation import ugettext as _
@@ -25,7 +23,7 @@ from geotrek.tourism import models as tourism_models
 from geotrek.trekking import models as trekking_models
 from geotrek.api.mobile.views.trekking import TrekViewSet
 from geotrek.api.mobile.views.common import FlatPageViewSet, SettingsView
-from geotrek.trekking.management.commands.sync_rando import ZipTilesBuilder
+from geotrek.trekking.management.commands.sync_rando import ExportZipFile, ZipTilesBuilder, response_chunks
 # Register mapentity models
 from geotrek.trekking import urls  # NOQA
 from geotrek.tourism import urls  # NOQA
@@ -72,17 +70,9 @@ class Command(BaseCommand):
             if self.verbosity == 2:
                 self.stdout.write(u"\x1b[3D\x1b[31;1mfailed (HTTP {code})\x1b[0m".format(code=response.status_code))
             return
-        f = open(fullname, 'w')
-        if isinstance(response, StreamingHttpResponse):
-            content = b''.join(response.streaming_content)
-        else:
-            content = response.content
-        # Fix strange unicode characters 2028 and 2029 that make Geotrek-mobile crash
-        if fix2028:
-            content = content.replace('\\u2028', '\\n')
-            content = content.replace('\\u2029', '\\n')
-        f.write(content)
-        f.close()
+        with open(fullname, 'wb') as f:
+            for chunk in response_chunks(response, fix2028):
+                f.write(chunk)
         oldfilename = os.path.join(self.dst_root, name)
         # If new file is identical to old one, don't recreate it. This will help backup
         if os.path.isfile(oldfilename) and filecmp.cmp(fullname, oldfilename):
@@ -157,7 +147,7 @@ class Command(BaseCommand):
         self.mkdirs(dst)
         if not os.path.isfile(dst):
             os.link(src, dst)
-        if zipfile and os.path.join(url, name) not in zipfile.namelist():
+        if zipfile is not None and os.path.join(url, name) not in zipfile:
             zipfile.write(dst, os.path.join(url, name))
         if self.verbosity == 2:
             self.stdout.write(
@@ -191,7 +181,7 @@ class Command(BaseCommand):
                 image = image.resize((size, size), Image.ANTIALIAS)
             # Save
             image.save(dst, optimize=True, quality=95)
-            if name not in zipfile.namelist():
+            if name not in zipfile:
                 zipfile.write(dst, name)
             if self.verbosity == 2:
                 self.stdout.write(
@@ -203,22 +193,7 @@ class Command(BaseCommand):
             self.stdout.write(u"\x1b[36m**\x1b[0m \x1b[1m{name}\x1b[0m ...".format(name=name), ending="")
             self.stdout.flush()
 
-        oldzipfilename = os.path.join(self.dst_root, name)
-        zipfilename = os.path.join(self.tmp_root, name)
-        try:
-            oldzipfile = ZipFile(oldzipfilename, 'r')
-        except IOError:
-            uptodate = False
-        else:
-            old = set([(zi.filename, zi.CRC) for zi in oldzipfile.infolist()])
-            new = set([(zi.filename, zi.CRC) for zi in zipfile.infolist()])
-            uptodate = (old == new)
-            oldzipfile.close()
-
-        zipfile.close()
-        if uptodate:
-            stat = os.stat(oldzipfilename)
-            os.utime(zipfilename, (stat.st_atime, stat.st_mtime))
+        uptodate = zipfile.close_or_reuse(os.path.join(self.dst_root, name))
 
         if self.verbosity == 2:
             if uptodate:
@@ -281,7 +256,7 @@ class Command(BaseCommand):
         zipname_trekid = os.path.join(url_trek, "{}.zip".format(trek.pk))
         zipfullname_trekid = os.path.join(self.tmp_root, zipname_trekid)
         self.mkdirs(zipfullname_trekid)
-        trekid_zipfile = ZipFile(zipfullname_trekid, 'w')
+        trekid_zipfile = ExportZipFile(zipfullname_trekid, 'w')
 
         if not self.skip_tiles:
             self.sync_trek_tiles(trek, trekid_zipfile)
@@ -337,7 +312,7 @@ class Command(BaseCommand):
         zipname_settings = os.path.join('nolang', 'global.zip')
         zipfullname_settings = os.path.join(self.tmp_root, zipname_settings)
         self.mkdirs(zipfullname_settings)
-        self.zipfile_settings = ZipFile(zipfullname_settings, 'w')
+        self.zipfile_settings = ExportZipFile(zipfullname_settings, 'w')
 
         if not self.skip_tiles:
             self.sync_global_tiles(self.zipfile_settings)
@@ -369,22 +344,11 @@ class Command(BaseCommand):
             self.stdout.write(u"\x1b[36m**\x1b[0m \x1b[1mnolang/{}/tiles/\x1b[0m ...".format(trek.pk), ending="")
             self.stdout.flush()
 
-        def _radius2bbox(lng, lat, radius):
-            return (lng - radius, lat - radius,
-                    lng + radius, lat + radius)
-
         tiles = ZipTilesBuilder(zipfile, prefix='/{}/tiles/'.format(trek.pk), **self.builder_args)
 
-        geom = trek.geom
-        if geom.geom_type == 'MultiLineString':
-            geom = geom[0]  # FIXME
-        geom.transform(4326)
-
-        for (lng, lat) in geom.coords:
-            large = _radius2bbox(lng, lat, settings.MOBILE_TILES_RADIUS_LARGE)
-            small = _radius2bbox(lng, lat, settings.MOBILE_TILES_RADIUS_SMALL)
-            tiles.add_coverage(bbox=large, zoomlevels=settings.MOBILE_TILES_LOW_ZOOMS)
-            tiles.add_coverage(bbox=small, zoomlevels=settings.MOBILE_TILES_HIGH_ZOOMS)
+        geom = trek.geom.transform(4326, clone=True)
+        tiles.add_corridor(geom, settings.MOBILE_TILES_RADIUS_LARGE, settings.MOBILE_TILES_LOW_ZOOMS)
+        tiles.add_corridor(geom, settings.MOBILE_TILES_RADIUS_SMALL, settings.MOBILE_TILES_HIGH_ZOOMS)
 
         tiles.run()
 
@@ -7,7 +7,7 @@ from rest_framework_gis import serializers as geo_serializers
 
 from geotrek.api.mobile.serializers.tourism import InformationDeskSerializer
 from geotrek.api.v2.functions import Transform, Length, StartPoint, EndPoint
-from geotrek.zoning.models import City, District
+from geotrek.zoning.models import City
 
 if 'geotrek.trekking' in settings.INSTALLED_APPS:
     from geotrek.trekking import models as trekking_models
@@ -44,9 +44,8 @@ if 'geotrek.trekking' in settings.INSTALLED_APPS:
         departure_city = serializers.SerializerMethodField(read_only=True)
 
         def get_cities(self, obj):
-            qs = City.objects.all()
-            cities = qs.filter(geom__intersects=(obj.geom, 0))
-            return cities.values_list('code', flat=True)
+            # Resolved for the whole list (see TrekViewSet)
+            return [city.code for city in obj.cities]
 
         def get_departure_city(self, obj):
             qs = City.objects.all()
@@ -60,9 +59,7 @@ if 'geotrek.trekking' in settings.INSTALLED_APPS:
             return round(obj.length_2d_m, 1)
 
         def get_districts(self, obj):
-            qs = District.objects.all()
-            districts = qs.filter(geom__intersects=(obj.geom, 0))
-            return [district.pk for district in districts]
+            return [district.pk for district in obj.districts]
 
         class Meta:
             model = trekking_models.Trek
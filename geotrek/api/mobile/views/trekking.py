@@ -8,7 +8,9 @@ from geotrek.api.mobile.serializers import trekking as api_serializers_trekking
 from geotrek.api.mobile.serializers import tourism as api_serializers_tourism
 
 from geotrek.api.v2.functions import Transform, Length, StartPoint, EndPoint
+from geotrek.api.v2.utils import get_geometry_simplification, get_simplified_geometry
 from geotrek.trekking import models as trekking_models
+from geotrek.zoning.views import ZoningViewSetMixin
 
 from rest_framework_extensions.mixins import DetailSerializerMixin
 from rest_framework.permissions import AllowAny
@@ -17,8 +19,9 @@ from rest_framework import viewsets
 from rest_framework import decorators
 
 
-class TrekViewSet(DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
+class TrekViewSet(ZoningViewSetMixin, DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
+    zoning_layers = ['cities', 'districts']
     serializer_class = api_serializers_trekking.TrekListSerializer
     serializer_detail_class = api_serializers_trekking.TrekDetailSerializer
     filter_fields = ('difficulty', 'themes', 'networks', 'practice')
@@ -31,7 +34,9 @@ class TrekViewSet(DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
             .prefetch_related('topo_object__aggregations', 'attachments') \
             .order_by('pk').annotate(length_2d_m=Length('geom'))
         if not self.action == 'list':
-            queryset = queryset.annotate(geom2d_transformed=Transform(F('geom'), settings.API_SRID))
+            tolerance, precision = get_geometry_simplification(self.request)
+            queryset = queryset.annotate(geom2d_transformed=get_simplified_geometry(
+                trekking_models.Trek, 'geom', tolerance, precision))
         if self.action == 'list':
             queryset = queryset.annotate(count_parents=Count('trek_parents')).\
                 exclude(Q(count_parents__gt=0) & Q(published=False))
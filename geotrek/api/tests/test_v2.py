@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test.client import Client
@@ -69,6 +71,9 @@ class BaseApiTest(TestCase):
     def login(self):
         pass
 
+    def get_streaming_json(self, response):
+        return json.loads(b''.join(response.streaming_content).decode('utf-8'))
+
     def get_trek_list(self, params=None):
         self.login()
         return self.client.get(reverse('apiv2:trek-list'), params)
@@ -228,7 +233,7 @@ class APIAccessAdministratorTestCase(BaseApiTest):
 
         # regenrate with geojson 3D
         response = self.get_trek_list({'format': 'geojson', 'dim': '3'})
-        json_response = response.json()
+        json_response = self.get_streaming_json(response)
 
         # test geojson format
         self.assertEqual(sorted(json_response.keys()),
@@ -246,6 +251,75 @@ class APIAccessAdministratorTestCase(BaseApiTest):
         self.assertEqual(sorted(json_response.get('features')[0].get('properties').keys()),
                          TREK_LIST_PROPERTIES_GEOJSON_STRUCTURE)
 
+    def test_trek_list_cursor_pagination(self):
+        response = self.get_trek_list({'cursor': 0, 'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        json_response = response.json()
+        self.assertEqual(sorted(json_response.keys()), PAGINATED_JSON_STRUCTURE)
+        self.assertIsNone(json_response['count'])
+        self.assertEqual(len(json_response['results']), 10)
+        last_pk = json_response['results'][-1]['id']
+        self.assertIn('cursor={}'.format(last_pk), json_response['next'])
+
+        response = self.get_trek_list({'cursor': last_pk, 'page_size': 10})
+        json_response = response.json()
+        self.assertEqual(len(json_response['results']), self.nb_treks - 10)
+        self.assertTrue(all(trek['id'] > last_pk for trek in json_response['results']))
+        self.assertIsNone(json_response['next'])
+
+    def test_trek_list_without_count(self):
+        response = self.get_trek_list({'count': 'false', 'page_size': 10, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        json_response = response.json()
+        self.assertIsNone(json_response['count'])
+        self.assertEqual(len(json_response['results']), self.nb_treks - 10)
+        self.assertIsNone(json_response['next'])
+        self.assertNotIn('page=', json_response['previous'])
+
+    def test_trek_list_etag(self):
+        response = self.get_trek_list()
+        etag = response['ETag']
+        response = self.client.get(reverse('apiv2:trek-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        trek_models.Trek.objects.first().save()
+        response = self.client.get(reverse('apiv2:trek-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_trek_list_geojson_rendered_by_database(self):
+        response = self.get_trek_list({'format': 'geojson', 'language': 'en', 'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        json_response = self.get_streaming_json(response)
+        self.assertEqual(sorted(json_response.keys()), PAGINATED_GEOJSON_STRUCTURE)
+        self.assertEqual(json_response['count'], self.nb_treks)
+        self.assertIsNotNone(json_response['next'])
+        # Serializer is used as soon as fields are selected
+        response = self.get_trek_list({'format': 'geojson', 'language': 'en', 'page_size': 10, 'omit': ''})
+        self.assertFalse(response.streaming)
+        expected = response.json()
+        self.assertEqual(len(json_response['features']), 10)
+        for feature, expected_feature in zip(json_response['features'], expected['features']):
+            self.assertEqual(sorted(feature.keys()), GEOJSON_STRUCTURE)
+            self.assertEqual(feature['properties'], expected_feature['properties'])
+            for value, expected_value in zip(feature['bbox'], expected_feature['bbox']):
+                self.assertAlmostEqual(value, expected_value)
+
+    def test_trek_list_simplified_geometries(self):
+        response = self.get_trek_list({'simplify': 100000, 'precision': 3})
+        self.assertEqual(response.status_code, 200)
+        coordinates = response.json()['results'][0]['geometry']['coordinates']
+        self.assertEqual(len(coordinates), 2)
+        for x, y in coordinates:
+            self.assertEqual((round(x, 3), round(y, 3)), (x, y))
+
+        response = self.get_trek_list({'format': 'geojson', 'simplify': 100000, 'precision': 3})
+        feature = self.get_streaming_json(response)['features'][0]
+        self.assertEqual(len(feature['geometry']['coordinates']), 2)
+
+        response = self.get_trek_list({'precision': 'high'})
+        self.assertEqual(response.status_code, 400)
+
     def test_trek_detail(self):
         self.client.logout()
         id_trek = trek_models.Trek.objects.order_by('?').first().pk
@@ -327,7 +401,7 @@ class APIAccessAdministratorTestCase(BaseApiTest):
 
         # regenrate with geojson 3D
         response = self.get_poi_list({'format': 'geojson', 'dim': '3'})
-        json_response = response.json()
+        json_response = self.get_streaming_json(response)
 
         # test geojson format
         self.assertEqual(sorted(json_response.keys()),
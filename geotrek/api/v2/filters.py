@@ -30,7 +30,17 @@ class GeotrekQueryParamsFilter(BaseFilterBackend):
                              description=_("Limit required fields to increase performances. Ex : id,url,geometry"))
         field_omit = Field(name='omit', required=False,
                            description=_("Omit specified fields to increase performance. Ex: url,category"))
-        return field_dim, field_language, field_format, field_fields, field_omit
+        field_simplify = Field(name='simplify', required=False,
+                               description=_('Simplify geometries with this tolerance (in meters)'),
+                               example=10, type='number')
+        field_precision = Field(name='precision', required=False,
+                                description=_('Number of decimals of geometries coordinates'),
+                                example=6, type='integer')
+        field_zoom = Field(name='zoom', required=False,
+                           description=_('Simplify geometries for this map zoom level'),
+                           example=12, type='integer')
+        return (field_dim, field_language, field_format, field_fields, field_omit,
+                field_simplify, field_precision, field_zoom)
 
 
 class GeotrekInBBoxFilter(InBBOXFilter):
@@ -1,7 +1,9 @@
 from __future__ import unicode_literals
 
-from django.db.models import Func
-from django.db.models.fields import FloatField, CharField
+import json
+
+from django.db.models import Func, Subquery, Value
+from django.db.models.fields import FloatField, CharField, TextField
 from django.contrib.gis.db.models import GeometryField, PointField
 
 
@@ -12,6 +14,20 @@ def Transform(geom, srid):
     return Func(geom, srid, function='ST_Transform')
 
 
+def Simplify(geom, tolerance):
+    """
+    ST_SimplifyPreserveTopology postgis function
+    """
+    return Func(geom, tolerance, function='ST_SimplifyPreserveTopology', output_field=GeometryField())
+
+
+def SnapToGrid(geom, size):
+    """
+    ST_SnapToGrid postgis function
+    """
+    return Func(geom, size, function='ST_SnapToGrid', output_field=GeometryField())
+
+
 def Buffer(geom, radius, num_seg):
     """
     ST_Buffer postgis function
@@ -71,3 +87,141 @@ class EndPoint(Func):
     """
     function = 'ST_EndPoint'
     output_field = PointField()
+
+
+class Round(Func):
+    """
+    Value rounded to ``digits`` decimals (as numeric, like python ``round``)
+    """
+    output_field = FloatField()
+
+    def __init__(self, expression, digits=1):
+        super(Round, self).__init__(expression, digits)
+
+    def as_sql(self, compiler, connection):
+        expression, digits = self.get_source_expressions()
+        sql, params = compiler.compile(expression)
+        digits_sql, digits_params = compiler.compile(digits)
+        return "round(CAST(%s AS numeric), %s)" % (sql, digits_sql), params + digits_params
+
+
+class UTCDateTime(Func):
+    """
+    Datetime as ISO 8601 text in UTC, with milliseconds (like the JSON renderer)
+    """
+    template = "to_char(%(expressions)s AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.MS\"Z\"')"
+    output_field = TextField()
+
+
+class AbsoluteURL(Func):
+    """
+    Absolute URL of a file field (NULL if empty), from its media URL prefix
+    """
+    output_field = TextField()
+
+    def __init__(self, expression, prefix):
+        super(AbsoluteURL, self).__init__(expression)
+        self.prefix = prefix
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return "(%%s || NULLIF(%s, ''))" % sql, [self.prefix] + params
+
+
+class DetailURL(Func):
+    """
+    Absolute URL of a detail view, from its parts before and after the pk
+    """
+    output_field = TextField()
+
+    def __init__(self, expression, prefix, suffix):
+        super(DetailURL, self).__init__(expression)
+        self.prefix = prefix
+        self.suffix = suffix
+
+    def as_sql(self, compiler, connection):
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return "(%%s || CAST(%s AS text) || %%s)" % sql, [self.prefix] + params + [self.suffix]
+
+
+class JSONObject(Func):
+    """
+    JSON object (as text) from (key, expression) pairs.
+    ``json_build_object`` is not available before PostgreSQL 9.4: values are
+    converted with ``to_json``, except JSON expressions (``is_json``).
+    """
+    output_field = TextField()
+    is_json = True
+
+    def __init__(self, *pairs):
+        self.keys = [key for key, expression in pairs]
+        super(JSONObject, self).__init__(*[expression for key, expression in pairs])
+
+    def as_sql(self, compiler, connection):
+        parts, params = [], []
+        for key, expression in zip(self.keys, self.get_source_expressions()):
+            sql, expression_params = compiler.compile(expression)
+            if not getattr(expression, 'is_json', False):
+                sql = "to_json(%s)::text" % sql
+            parts.append("%%s || COALESCE(%s, 'null')" % sql)
+            params.append(json.dumps(key) + ':')
+            params.extend(expression_params)
+        return "('{' || %s || '}')" % " || ',' || ".join(parts), params
+
+
+class NullableJSON(Func):
+    """
+    JSON expression, or NULL if ``key`` is NULL (e.g. optional foreign key)
+    """
+    output_field = TextField()
+    is_json = True
+
+    def as_sql(self, compiler, connection):
+        key, expression = self.get_source_expressions()
+        key_sql, key_params = compiler.compile(key)
+        sql, params = compiler.compile(expression)
+        return "CASE WHEN %s IS NULL THEN NULL ELSE %s END" % (key_sql, sql), key_params + params
+
+
+class JSONArray(Subquery):
+    """
+    JSON array (as text) of the JSON values selected by ``queryset`` (one column)
+    """
+    template = "COALESCE((SELECT '[' || string_agg(json_item, ',') || ']' " \
+               "FROM (%(subquery)s) json_items(json_item)), '[]')"
+    output_field = TextField()
+    is_json = True
+
+
+class GeoJSONFeature(Func):
+    """
+    GeoJSON feature (as text) with bbox, like ``GeoFeatureModelSerializer``.
+    Geometry is written with ``precision`` decimals.
+    """
+    output_field = TextField()
+    is_json = True
+
+    def __init__(self, geometry, properties, id=None, precision=15):
+        expressions = [geometry, properties, Value(precision)]
+        if id is not None:
+            expressions.append(id)
+        super(GeoJSONFeature, self).__init__(*expressions)
+
+    def as_sql(self, compiler, connection):
+        expressions = self.get_source_expressions()
+        geometry_sql, geometry_params = compiler.compile(expressions[0])
+        properties_sql, properties_params = compiler.compile(expressions[1])
+        precision_sql, precision_params = compiler.compile(expressions[2])
+        id_sql, id_params = "''", []
+        if len(expressions) > 3:
+            id_sql, id_params = compiler.compile(expressions[3])
+            id_sql = "'\"id\":' || COALESCE(to_json(%s)::text, 'null') || ','" % id_sql
+        # Geometry is computed once, in a sub-select
+        sql = ("(SELECT '{' || %s || '\"type\":\"Feature\",\"geometry\":' "
+               "|| COALESCE(ST_AsGeoJSON(feature.geom, %s), 'null') "
+               "|| CASE WHEN feature.geom IS NULL THEN '' ELSE ',\"bbox\":[' "
+               "|| ST_XMin(feature.geom) || ',' || ST_YMin(feature.geom) || ',' "
+               "|| ST_XMax(feature.geom) || ',' || ST_YMax(feature.geom) || ']' END "
+               "|| ',\"properties\":' || %s || '}' "
+               "FROM (SELECT %s AS geom) feature)") % (id_sql, precision_sql, properties_sql, geometry_sql)
+        return sql, id_params + precision_params + properties_params + geometry_params
@@ -2,23 +2,105 @@ from __future__ import unicode_literals
 
 from collections import OrderedDict
 
+from django.utils.translation import ugettext as _
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page number pagination, with two alternatives avoiding the ``COUNT(*)``
+    query and large offsets:
+
+    - ``?cursor=<pk>``: keyset pagination, objects after the given pk
+      (start with ``cursor=0``). Only for lists ordered by pk.
+    - ``?count=false``: page number pagination without total count.
+    """
     page_size = 100
     page_size_query_param = 'page_size'
     max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = None
+        self.count = None
+        self.next_link = None
+        self.previous_link = None
+        if self.cursor_query_param in request.query_params and self.is_ordered_by_pk(queryset):
+            return self.paginate_queryset_by_cursor(queryset, request)
+        if request.query_params.get(self.count_query_param, '').lower() in ('false', '0'):
+            return self.paginate_queryset_without_count(queryset, request)
+        return super(StandardResultsSetPagination, self).paginate_queryset(queryset, request, view)
+
+    def is_ordered_by_pk(self, queryset):
+        return list(queryset.query.order_by) in (['pk'], ['id'])
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        try:
+            cursor = int(request.query_params[self.cursor_query_param] or 0)
+        except ValueError:
+            raise NotFound(_(u"Invalid cursor."))
+        page_size = self.get_page_size(request)
+        objects = list(queryset.filter(pk__gt=cursor)[:page_size + 1])
+        if len(objects) > page_size:
+            objects = objects[:page_size]
+            url = remove_query_param(request.build_absolute_uri(), self.page_query_param)
+            # Objects can be pks (see GeotrekViewset.list_sql_geojson)
+            self.next_link = replace_query_param(url, self.cursor_query_param, getattr(objects[-1], 'pk', objects[-1]))
+        return objects
+
+    def paginate_queryset_without_count(self, queryset, request):
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 0
+        if page_number < 1:
+            raise NotFound(_(u"Invalid page."))
+        page_size = self.get_page_size(request)
+        offset = (page_number - 1) * page_size
+        objects = list(queryset[offset:offset + page_size + 1])
+        if not objects and page_number > 1:
+            raise NotFound(_(u"Invalid page."))
+        url = request.build_absolute_uri()
+        if len(objects) > page_size:
+            objects = objects[:page_size]
+            self.next_link = replace_query_param(url, self.page_query_param, page_number + 1)
+        if page_number == 2:
+            self.previous_link = remove_query_param(url, self.page_query_param)
+        elif page_number > 2:
+            self.previous_link = replace_query_param(url, self.page_query_param, page_number - 1)
+        return objects
+
+    def get_count(self):
+        return self.page.paginator.count if self.page is not None else self.count
+
+    def get_next_link(self):
+        if self.page is not None:
+            return super(StandardResultsSetPagination, self).get_next_link()
+        return self.next_link
+
+    def get_previous_link(self):
+        if self.page is not None:
+            return super(StandardResultsSetPagination, self).get_previous_link()
+        return self.previous_link
 
     def get_paginated_response(self, data):
         if self.request.query_params.get('format', 'json') == 'geojson':
             return Response(OrderedDict([
                 ('type', 'FeatureCollection'),
-                ('count', self.page.paginator.count),
+                ('count', self.get_count()),
                 ('next', self.get_next_link()),
                 ('previous', self.get_previous_link()),
                 ('features', data['features'])
             ]))
         else:
-            return super(StandardResultsSetPagination, self).get_paginated_response(data)
+            return Response(OrderedDict([
+                ('count', self.get_count()),
+                ('next', self.get_next_link()),
+                ('previous', self.get_previous_link()),
+                ('results', data)
+            ]))
@@ -1,6 +1,17 @@
 from __future__ import unicode_literals
 
+import math
+
 from django.conf import settings
+from django.db.models import F
+from django.utils.translation import ugettext as _
+from rest_framework.exceptions import ParseError
+
+from geotrek.api.v2.functions import JSONObject, Transform, Simplify, SnapToGrid
+
+# Web mercator resolution (meters by pixel) at zoom level 0, with 256px tiles
+ZOOM_0_RESOLUTION = 156543.03392804097
+MAX_PRECISION = 15
 
 
 def get_translation_or_dict(model_field_name, serializer, instance):
@@ -23,3 +34,78 @@ def get_translation_or_dict(model_field_name, serializer, instance):
             data.update({language: getattr(instance, '{}_{}'.format(model_field_name, language), )})
 
     return data
+
+
+def get_translation_or_dict_expression(model_field_name, request, lookup=''):
+    """
+    Same as ``get_translation_or_dict``, as an SQL expression
+    :param model_field_name: Model name field
+    :param request: request object
+    :param lookup: relation path to the model (ex: 'difficulty__')
+    :return: expression of the translated field or JSON object with all translations
+    """
+    lang = request.GET.get('language', 'all') if request else 'all'
+
+    if lang != 'all':
+        return F('{}{}_{}'.format(lookup, model_field_name, lang))
+
+    return JSONObject(*[
+        (language, F('{}{}_{}'.format(lookup, model_field_name, language)))
+        for language in settings.MODELTRANSLATION_LANGUAGES
+    ])
+
+
+def get_geometry_simplification(request):
+    """
+    Return geometry simplification requested with ``simplify`` (tolerance in
+    meters), ``precision`` (number of decimals) or ``zoom`` (tolerance of
+    about a pixel and matching precision) parameters
+    :param request: request object
+    :return: (tolerance or None, precision or None)
+    """
+    params = request.GET if request else {}
+    tolerance, precision = None, None
+    try:
+        if 'zoom' in params:
+            zoom = int(params['zoom'])
+            if not 0 <= zoom <= 30:
+                raise ValueError
+            tolerance = ZOOM_0_RESOLUTION / 2 ** zoom
+            precision = min(MAX_PRECISION, int(math.ceil(math.log10(256 * 2 ** zoom / 360.0))))
+        if 'simplify' in params:
+            tolerance = float(params['simplify'])
+            if tolerance < 0:
+                raise ValueError
+        if 'precision' in params:
+            precision = int(params['precision'])
+            if not 0 <= precision <= MAX_PRECISION:
+                raise ValueError
+    except ValueError:
+        raise ParseError(_("Invalid geometry simplification parameters."))
+    return tolerance or None, precision
+
+
+def get_simplified_geometry(model, field_name, tolerance=None, precision=None):
+    """
+    Geometry field simplified (topology-preserving), transformed to API SRID,
+    and snapped to ``precision`` decimals.
+    Starts from the precomputed simplified geometry closest to the tolerance, if any.
+    :param model: Model class
+    :param field_name: geometry field name ('geom' or 'geom_3d')
+    :param tolerance: simplification tolerance in SRID units
+    :param precision: number of decimals in API SRID
+    :return: geometry expression
+    """
+    if tolerance and field_name == 'geom':
+        precomputed = [t for t in getattr(model, 'SIMPLIFIED_TOLERANCES', ()) if t <= tolerance]
+        if precomputed:
+            field_name = 'geom_simplified_{}'.format(max(precomputed))
+            if max(precomputed) == tolerance:
+                tolerance = None
+    geom = F(field_name)
+    if tolerance:
+        geom = Simplify(geom, tolerance)
+    geom = Transform(geom, settings.API_SRID)
+    if precision is not None:
+        geom = SnapToGrid(geom, 10 ** -precision)
+    return geom
@@ -5,7 +5,7 @@ from django.db.models import F
 
 from geotrek.api.v2 import serializers as api_serializers, \
     viewsets as api_viewsets
-from geotrek.api.v2.functions import Transform, Length, Length3D
+from geotrek.api.v2.functions import Transform, Length, Length3D, Round
 from geotrek.core import models as core_models
 
 
@@ -23,3 +23,13 @@ class PathViewSet(api_viewsets.GeotrekViewset):
                   length_2d_m=Length('geom'),
                   length_3d_m=Length3D('geom_3d')) \
         .order_by('pk')  # Required for reliable pagination
+    sql_feature_id = True
+
+    def get_sql_properties(self):
+        return [
+            ('name', F('name')),
+            ('comments', F('comments')),
+            ('url', self.get_sql_detail_url()),
+            ('length_2d', Round(Length('geom'))),
+            ('length_3d', Round(Length3D('geom_3d'))),
+        ]
@@ -1,13 +1,14 @@
 from __future__ import unicode_literals
 
 from django.conf import settings
-from django.db.models import F
+from django.db.models import F, IntegerField, OuterRef, Subquery
 from django.db.models.aggregates import Count
 from rest_framework import response, decorators
 
 from geotrek.api.v2 import serializers as api_serializers, \
     viewsets as api_viewsets
-from geotrek.api.v2.functions import Transform, Length, Length3D
+from geotrek.api.v2.functions import Transform, Length, Length3D, Round, UTCDateTime, \
+    JSONObject, NullableJSON
 from geotrek.trekking import models as trekking_models
 
 
@@ -24,6 +25,51 @@ class TrekViewSet(api_viewsets.GeotrekViewset):
         .order_by('pk')  # Required for reliable pagination
     filter_fields = ('difficulty', 'themes', 'networks', 'practice')
 
+    def get_sql_properties(self):
+        return [
+            ('id', F('pk')),
+            ('url', self.get_sql_detail_url()),
+            ('name', self.get_sql_translation('name')),
+            ('description_teaser', self.get_sql_translation('description_teaser')),
+            ('description', self.get_sql_translation('description')),
+            ('departure', self.get_sql_translation('departure')),
+            ('arrival', self.get_sql_translation('arrival')),
+            ('duration', F('duration')),
+            ('difficulty', NullableJSON(F('difficulty'), JSONObject(
+                ('id', F('difficulty__id')),
+                ('label', self.get_sql_translation('difficulty', 'difficulty__')),
+                ('cirkwi_level', F('difficulty__cirkwi_level')),
+                ('pictogram', self.get_sql_media_url('difficulty__pictogram')),
+            ))),
+            ('length_2d', Round(Length('geom'))),
+            ('length_3d', Round(Length3D('geom_3d'))),
+            ('ascent', F('ascent')),
+            ('descent', F('descent')),
+            ('min_elevation', F('min_elevation')),
+            ('max_elevation', F('max_elevation')),
+            ('themes', self.get_sql_related_list(
+                'themes',
+                ('id', F('pk')),
+                ('label', self.get_sql_translation('label')),
+                ('pictogram', self.get_sql_media_url('pictogram')),
+            )),
+            ('networks', self.get_sql_related_list(
+                'networks',
+                ('id', F('pk')),
+                ('label', self.get_sql_translation('network')),
+                ('pictogram', self.get_sql_media_url('pictogram')),
+            )),
+            ('practice', NullableJSON(F('practice'), JSONObject(
+                ('id', F('practice__id')),
+                ('name', self.get_sql_translation('name', 'practice__')),
+                ('pictogram', self.get_sql_media_url('practice__pictogram')),
+            ))),
+            ('external_id', F('eid')),
+            ('published', self.get_sql_translation('published')),
+            ('update_datetime', UTCDateTime(F('date_update'))),
+            ('create_datetime', UTCDateTime(F('date_insert'))),
+        ]
+
     @decorators.list_route(methods=['get'])
     def all_practices(self, request, *args, **kwargs):
         """
@@ -114,6 +160,13 @@ class TourViewSet(TrekViewSet):
     queryset = TrekViewSet.queryset.annotate(count_children=Count('trek_children')) \
         .filter(count_children__gt=0)
 
+    def get_sql_properties(self):
+        children = trekking_models.OrderedTrekChild._base_manager.filter(parent=OuterRef('pk')) \
+            .order_by().values('parent').annotate(count=Count('pk')).values('count')
+        return super(TourViewSet, self).get_sql_properties() + [
+            ('count_children', Subquery(children, output_field=IntegerField())),
+        ]
+
 
 class POIViewSet(api_viewsets.GeotrekViewset):
     serializer_class = api_serializers.POIListSerializer
@@ -126,6 +179,23 @@ class POIViewSet(api_viewsets.GeotrekViewset):
         .order_by('pk')  # Required for reliable pagination
     filter_fields = ('type',)
 
+    def get_sql_properties(self):
+        return [
+            ('id', F('pk')),
+            ('url', self.get_sql_detail_url()),
+            ('name', self.get_sql_translation('name')),
+            ('type', JSONObject(
+                ('id', F('type__id')),
+                ('label', self.get_sql_translation('label', 'type__')),
+                ('pictogram', self.get_sql_media_url('type__pictogram')),
+            )),
+            ('description', self.get_sql_translation('description')),
+            ('external_id', F('eid')),
+            ('published', self.get_sql_translation('published')),
+            ('update_datetime', UTCDateTime(F('date_update'))),
+            ('create_datetime', UTCDateTime(F('date_insert'))),
+        ]
+
     @decorators.list_route(methods=['get'])
     def all_types(self, request, *args, **kwargs):
         """
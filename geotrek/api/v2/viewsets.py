@@ -1,13 +1,29 @@
 from __future__ import unicode_literals
 
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.urlresolvers import reverse
+from django.db.models import Count, F, Max, OuterRef
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+from django.utils.translation import get_language
 from django_filters.rest_framework.backends import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.authentication import BasicAuthentication, SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework_extensions.mixins import DetailSerializerMixin
 
 from geotrek.api.v2 import pagination as api_pagination, filters as api_filters
+from geotrek.api.v2.functions import (AbsoluteURL, DetailURL, GeoJSONFeature,
+                                      JSONArray, JSONObject)
 from geotrek.api.v2.serializers import override_serializer
+from geotrek.api.v2.utils import (get_translation_or_dict_expression, get_geometry_simplification,
+                                  get_simplified_geometry)
 
 
 class GeotrekViewset(DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
@@ -21,6 +37,7 @@ class GeotrekViewset(DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
     pagination_class = api_pagination.StandardResultsSetPagination
     permission_classes = [IsAuthenticated, ]
     authentication_classes = [BasicAuthentication, SessionAuthentication]
+    sql_feature_id = False  # Like GeoFeatureModelSerializer, when 'id' is the model pk
 
     def get_serializer_class(self):
         base_serializer_class = super(GeotrekViewset, self).get_serializer_class()
@@ -28,8 +45,131 @@ class GeotrekViewset(DetailSerializerMixin, viewsets.ReadOnlyModelViewSet):
         dimension = self.request.query_params.get('dim', '2')
         return override_serializer(format_output, dimension, base_serializer_class)
 
+    def get_queryset(self):
+        queryset = super(GeotrekViewset, self).get_queryset()
+        tolerance, precision = get_geometry_simplification(self.request)
+        if tolerance is None and precision is None:
+            return queryset
+        annotations = {}
+        for name, field_name in (('geom2d_transformed', 'geom'), ('geom3d_transformed', 'geom_3d')):
+            if name in queryset.query.annotations:
+                annotations[name] = get_simplified_geometry(queryset.model, field_name, tolerance, precision)
+        return queryset.annotate(**annotations)
+
     def get_serializer_context(self):
         return {
             'request': self.request,
             'kwargs': self.kwargs
         }
+
+    def get_etag(self, queryset):
+        """
+        ETag of filtered objects, from their latest update date and their count.
+        Returns None if objects have no update date.
+        """
+        try:
+            queryset.model._meta.get_field('date_update')
+        except FieldDoesNotExist:
+            return None
+        stats = queryset.order_by().values('pk').aggregate(latest=Max('date_update'), count=Count('pk'))
+        key = '{}-{}-{}'.format(stats['latest'], stats['count'], get_language())
+        return quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def conditional_response(self, request, queryset, method, *args, **kwargs):
+        etag = self.get_etag(queryset)
+        if etag is not None:
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+            if if_none_match and (if_none_match.strip() == '*' or etag in parse_etags(if_none_match)):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = method(request, *args, **kwargs)
+        if etag is not None and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def get_sql_properties(self):
+        """
+        (name, expression) pairs of GeoJSON features properties, to let
+        PostgreSQL render lists features instead of the serializer.
+        Returns None to always use the serializer.
+        """
+        return None
+
+    def get_sql_geometry(self):
+        field_name = 'geom_3d' if self.request.query_params.get('dim', '2') == '3' else 'geom'
+        tolerance, precision = get_geometry_simplification(self.request)
+        return get_simplified_geometry(self.queryset.model, field_name, tolerance, precision)
+
+    def get_sql_translation(self, field, lookup=''):
+        return get_translation_or_dict_expression(field, self.request, lookup)
+
+    def get_sql_media_url(self, field):
+        return AbsoluteURL(F(field), self.request.build_absolute_uri(settings.MEDIA_URL))
+
+    def get_sql_detail_url(self):
+        """
+        Same URL as the serializer ``url`` field
+        """
+        view_name = self.serializer_class._declared_fields['url'].view_name
+        url = self.request.build_absolute_uri(reverse(view_name, kwargs={'pk': 0}))
+        prefix, suffix = url.rsplit('/0/', 1)
+        return DetailURL(F('pk'), prefix + '/', '/' + suffix)
+
+    def get_sql_related_list(self, field_name, *pairs):
+        """
+        JSON array of objects related through the many-to-many ``field_name``,
+        in their default ordering (like a nested serializer with ``many=True``)
+        """
+        field = self.queryset.model._meta.get_field(field_name)
+        related = field.related_model._default_manager.filter(**{field.related_query_name(): OuterRef('pk')})
+        return JSONArray(related.annotate(json_value=JSONObject(*pairs)).values('json_value'))
+
+    def use_sql_geojson(self):
+        params = self.request.query_params
+        if params.get('format') != 'geojson' or 'fields' in params or 'omit' in params:
+            return False
+        return self.get_sql_properties() is not None
+
+    def list_sql_geojson(self, request, *args, **kwargs):
+        """
+        Paginated FeatureCollection, whose features are rendered by PostgreSQL
+        and streamed to the client.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        pks = list(self.paginate_queryset(queryset.values_list('pk', flat=True)))
+        tolerance, precision = get_geometry_simplification(request)
+        feature = GeoJSONFeature(self.get_sql_geometry(),
+                                 JSONObject(*self.get_sql_properties()),
+                                 id=F('pk') if self.sql_feature_id else None,
+                                 precision=precision if precision is not None else 15)
+        # Annotations and aggregations of the list queryset are not needed
+        features = queryset.model._default_manager.filter(pk__in=pks) \
+            .order_by(*queryset.query.order_by) \
+            .annotate(geojson_feature=feature) \
+            .values_list('geojson_feature', flat=True)
+        collection = OrderedDict([
+            ('type', 'FeatureCollection'),
+            ('count', self.paginator.get_count()),
+            ('next', self.paginator.get_next_link()),
+            ('previous', self.paginator.get_previous_link()),
+        ])
+        return StreamingHttpResponse(self.stream_feature_collection(collection, features),
+                                     content_type='application/json')
+
+    def stream_feature_collection(self, collection, features):
+        yield json.dumps(collection)[:-1] + ', "features": ['
+        for i, feature in enumerate(features.iterator()):
+            yield feature if i == 0 else ',' + feature
+        yield ']}'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.use_sql_geojson():
+            method = self.list_sql_geojson
+        else:
+            method = super(GeotrekViewset, self).list
+        return self.conditional_response(request, queryset, method, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return self.conditional_response(request, queryset, super(GeotrekViewset, self).retrieve, *args, **kwargs)
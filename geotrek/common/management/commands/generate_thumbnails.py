@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from multiprocessing import Pool
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from geotrek.common.models import Attachment
+from geotrek.common.thumbnails import generate_thumbnails
+
+
+def _init_worker():
+    # Do not share cache connections with the main process
+    for cache in caches.all():
+        cache.close()
+
+
+def _generate_thumbnails(attachment):
+    return attachment.attachment_file.name, generate_thumbnails(attachment)
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnails of all pictures attachments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jobs', '-j', dest='jobs', type=int, default=1,
+                            help='Number of processes generating thumbnails in parallel')
+
+    def handle(self, *args, **options):
+        pictures = list(Attachment.objects.filter(is_image=True).exclude(attachment_file='').order_by('pk'))
+
+        if options['jobs'] > 1:
+            # Each worker opens its own database connection
+            connections.close_all()
+            pool = Pool(options['jobs'], initializer=_init_worker)
+            results = pool.imap_unordered(_generate_thumbnails, pictures, chunksize=16)
+        else:
+            pool = None
+            results = (_generate_thumbnails(picture) for picture in pictures)
+
+        failed = 0
+        try:
+            for name, generated in results:
+                if not generated:
+                    failed += 1
+                    self.stderr.write("{pict} invalid or missing from disk".format(pict=name))
+                elif options['verbosity'] > 1:
+                    self.stdout.write("{pict} generated".format(pict=name))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        if options['verbosity'] > 0:
+            self.stdout.write("Thumbnails of {count} pictures generated".format(count=len(pictures) - failed))
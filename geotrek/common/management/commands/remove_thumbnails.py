@@ -8,12 +8,14 @@ from django.conf import settings
 
 from easy_thumbnails.models import Thumbnail
 
+from geotrek.common.thumbnails import invalidate_thumbnails_index
+
 
 class Command(BaseCommand):
     help = "Remove all thumbnails"
 
     def handle(self, *args, **options):
-        thumbnails = Thumbnail.objects.all()
+        thumbnails = Thumbnail.objects.select_related('source')
 
         for thumbnail in thumbnails:
             path = os.path.join(settings.MEDIA_ROOT, thumbnail.name)
@@ -22,3 +24,4 @@ class Command(BaseCommand):
             thumbnail.delete()
             if options['verbosity'] > 0:
                 self.stdout.write("{pict} deleted".format(pict=thumbnail.name))
+        invalidate_thumbnails_index(*set(thumbnail.source.name for thumbnail in thumbnails))
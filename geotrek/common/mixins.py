@@ -3,19 +3,19 @@ import os
 import logging
 import shutil
 import datetime
-import hashlib
 
 from django.conf import settings
-from django.db.models import Manager as DefaultManager
+from django.apps import apps
+from django.db.models import Manager as DefaultManager, Prefetch
+from django.db.models.signals import post_save, post_delete
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from django.template.defaultfilters import slugify
 
 from easy_thumbnails.exceptions import InvalidImageFormatError
-from easy_thumbnails.files import get_thumbnailer
-from easy_thumbnails.alias import aliases
 from embed_video.backends import detect_backend, VideoDoesntExistException
 
+from geotrek.common.thumbnails import get_picture_thumbnail
 from geotrek.common.utils import classproperty
 
 logger = logging.getLogger(__name__)
@@ -70,10 +70,60 @@ class NoDeleteMixin(models.Model):
         return NoDeleteManager
 
 
+def pictures_prefetch():
+    """
+    Prefetch attachments of many objects in one query, ordered like
+    ``PicturesMixin.pictures`` expects them.
+    """
+    Attachment = apps.get_model(settings.PAPERCLIP_ATTACHMENT_MODEL)
+    return Prefetch('attachments', queryset=Attachment.objects.order_by('-starred', 'attachment_file'))
+
+
+def connect_pictures_invalidation(model):
+    """
+    Invalidate pictures memoized by ``PicturesMixin`` instances when
+    attachments (``model``) are saved or deleted.
+    """
+    def invalidate(sender, **kwargs):
+        PicturesMixin.attachments_version += 1
+
+    uid = 'pictures_%s' % model._meta.label_lower
+    post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+
+
 class PicturesMixin(object):
     """A common class to share code between Trek and POI regarding
     attached pictures"""
 
+    # Bumped on attachments changes, see connect_pictures_invalidation()
+    attachments_version = 0
+
+    def _memoized(self, name, compute):
+        """
+        Pictures and their thumbnails are used by many serializer fields,
+        compute them once per instance, until an attachment changes.
+        """
+        memo = getattr(self, '_pictures_memo', None)
+        if memo is None or memo[0] != PicturesMixin.attachments_version:
+            if memo is not None:
+                # Prefetched attachments are outdated as well
+                getattr(self, '_prefetched_objects_cache', {}).pop('attachments', None)
+            memo = self._pictures_memo = (PicturesMixin.attachments_version, {})
+        if name not in memo[1]:
+            memo[1][name] = compute()
+        return memo[1][name]
+
+    def _ordered_attachments(self):
+        if 'attachments' in getattr(self, '_prefetched_objects_cache', {}):
+            # Any prefetch ordering, sorted as below
+            return sorted(self.attachments.all(), key=lambda a: (not a.starred, a.attachment_file.name))
+        return list(self.attachments.all().order_by('-starred', 'attachment_file'))
+
+    @property
+    def attachments_ordered(self):
+        return self._memoized('attachments', self._ordered_attachments)
+
     @property
     def pictures(self):
         """
@@ -81,14 +131,12 @@ class PicturesMixin(object):
         Since we allow screenshot to be overriden by attachments
         named 'mapimage', filter it from object pictures.
         """
-        if hasattr(self, '_pictures'):
-            return self._pictures
-        all_attachments = self.attachments.all().order_by('-starred', 'attachment_file')
-        return [a for a in all_attachments if a.is_image and a.title != 'mapimage']
+        return self._memoized('pictures', lambda: [a for a in self.attachments_ordered
+                                                   if a.is_image and a.title != 'mapimage'])
 
     @pictures.setter
     def pictures(self, values):
-        self._pictures = values
+        self._pictures_memo = (PicturesMixin.attachments_version, {'pictures': values})
 
     @property
     def serializable_pictures(self):
@@ -117,34 +165,23 @@ class PicturesMixin(object):
 
     @property
     def resized_pictures(self):
+        return self._memoized('resized', self._resized_pictures)
+
+    def _resized_pictures(self):
         resized = []
         for picture in self.pictures:
-            thumbnailer = get_thumbnailer(picture.attachment_file)
             try:
-                # Uppercase options aren't used by prepared options (a primary
-                # use of prepared options is to generate the filename -- these
-                # options don't alter the filename).
-                text = settings.THUMBNAIL_COPYRIGHT_FORMAT.format(author=picture.author, title=picture.title,
-                                                                  legend=picture.legend)
-                ali = thumbnailer.get_options({'size': (800, 800),
-                                               'TEXT': text,
-                                               'SIZE_WATERMARK': settings.THUMBNAIL_COPYRIGHT_SIZE,
-                                               'watermark': hashlib.md5(text.encode('utf-8')).hexdigest()
-                                               })
-
-                thdetail = thumbnailer.get_thumbnail(ali)
+                thdetail = get_picture_thumbnail(picture, 'resized')
             except (IOError, InvalidImageFormatError):
                 logger.info(_("Image %s invalid or missing from disk.") % picture.attachment_file)
             else:
                 resized.append((picture, thdetail))
         return resized
 
-    @property
-    def picture_print(self):
+    def _first_thumbnail(self, name):
         for picture in self.pictures:
-            thumbnailer = get_thumbnailer(picture.attachment_file)
             try:
-                thumbnail = thumbnailer.get_thumbnail(aliases.get('print'))
+                thumbnail = get_picture_thumbnail(picture, name)
             except (IOError, InvalidImageFormatError):
                 logger.info(_("Image %s invalid or missing from disk.") % picture.attachment_file)
                 continue
@@ -153,19 +190,13 @@ class PicturesMixin(object):
             return thumbnail
         return None
 
+    @property
+    def picture_print(self):
+        return self._memoized('print', lambda: self._first_thumbnail('print'))
+
     @property
     def thumbnail(self):
-        for picture in self.pictures:
-            thumbnailer = get_thumbnailer(picture.attachment_file)
-            try:
-                thumbnail = thumbnailer.get_thumbnail(aliases.get('small-square'))
-            except (IOError, InvalidImageFormatError):
-                logger.info(_("Image %s invalid or missing from disk.") % picture.attachment_file)
-                continue
-            thumbnail.author = picture.author
-            thumbnail.legend = picture.legend
-            return thumbnail
-        return None
+        return self._memoized('small-square', lambda: self._first_thumbnail('small-square'))
 
     def resized_picture_mobile(self, root_pk):
         pictures = self.serializable_pictures_mobile(root_pk)
@@ -197,8 +228,7 @@ class PicturesMixin(object):
 
     @property
     def videos(self):
-        all_attachments = self.attachments.all().order_by('-starred')
-        return all_attachments.exclude(attachment_video='')
+        return [a for a in self.attachments_ordered if a.attachment_video]
 
     @property
     def serializable_videos(self):
@@ -220,9 +250,7 @@ class PicturesMixin(object):
 
     @property
     def files(self):
-        all_attachments = self.attachments.all().order_by('-starred')
-        all_attachments = all_attachments.exclude(attachment_file='')
-        return [a for a in all_attachments if not a.is_image]
+        return [a for a in self.attachments_ordered if a.attachment_file and not a.is_image]
 
     @property
     def serializable_files(self):
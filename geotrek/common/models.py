@@ -8,7 +8,8 @@ from django.utils.translation import ugettext_lazy as _
 from paperclip.models import FileType as BaseFileType, Attachment as BaseAttachment
 
 from geotrek.authent.models import StructureOrNoneRelated
-from geotrek.common.mixins import PictogramMixin, OptionalPictogramMixin
+from geotrek.common.mixins import PictogramMixin, OptionalPictogramMixin, connect_pictures_invalidation
+from geotrek.common.thumbnails import connect_thumbnails_generation
 
 
 class Organism(StructureOrNoneRelated):
@@ -121,3 +122,7 @@ class TargetPortal(models.Model):
 
     def __unicode__(self):
         return self.name
+
+
+connect_thumbnails_generation(Attachment)
+connect_pictures_invalidation(Attachment)
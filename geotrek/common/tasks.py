@@ -6,6 +6,9 @@ from celery import Task, shared_task, current_task
 from django.utils.translation import ugettext as _
 from django.contrib.auth.models import User
 
+from geotrek.common.models import Attachment
+from geotrek.common.thumbnails import generate_thumbnails
+
 
 class GeotrekImportTask(Task):
     '''
@@ -118,3 +121,12 @@ def import_datas_from_web(**kwargs):
         'report': parser.report(output_format='html').replace('$celery_id', current_task.request.id),
         'name': current_task.name
     }
+
+
+@shared_task(name='geotrek.common.generate-thumbnails')
+def generate_attachment_thumbnails(pk):
+    attachment = Attachment.objects.filter(pk=pk).first()
+    # Attachment may have been deleted meanwhile
+    if attachment is None or not attachment.attachment_file or not attachment.is_image:
+        return False
+    return generate_thumbnails(attachment)
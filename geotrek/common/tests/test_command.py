@@ -91,3 +91,14 @@ class CommandTests(TestCase):
         self.assertTrue(os.path.exists(self.picture.attachment_file.path))
         self.assertFalse(os.path.exists("{name}.120x120_q85_crop.png".format(name=self.picture.attachment_file.path)))
         self.assertEqual(Thumbnail.objects.count(), 0)
+
+    def test_generate_thumbnails(self):
+        output = StringIO()
+        self.content = POIFactory(geom='SRID=%s;POINT(1 1)' % settings.SRID)
+        self.picture = AttachmentFactory(content_object=self.content,
+                                         attachment_file=get_dummy_uploaded_image())
+        call_command('generate_thumbnails', verbosity=2, stdout=output)
+        self.assertIn("{name} generated".format(name=self.picture.attachment_file.name), output.getvalue())
+        self.assertTrue(os.path.exists("{path}.120x120_q85_crop.png".format(path=self.picture.attachment_file.path)))
+        self.assertTrue(os.path.exists("{path}.1000x500_q85_crop-smart.png".format(path=self.picture.attachment_file.path)))
+        self.assertEqual(Thumbnail.objects.count(), 3)
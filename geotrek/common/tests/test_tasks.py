@@ -1,7 +1,15 @@
 # -*- encoding: utf-8 -*-
+import mock
 
+from django.conf import settings
 from django.test import TestCase
+from kombu.exceptions import OperationalError
+
+from geotrek.common.factories import AttachmentFactory
 from geotrek.common.tasks import import_datas, import_datas_from_web
+from geotrek.common.thumbnails import get_picture_thumbnail, queue_thumbnails_generation
+from geotrek.common.utils.testdata import get_dummy_uploaded_image
+from geotrek.trekking.factories import POIFactory
 from geotrek.common.models import Organism
 from geotrek.common.parsers import ExcelParser, GlobalImportError
 
@@ -50,3 +58,14 @@ class TasksTest(TestCase):
             name='OrganismParser',
             module='geotrek.common.tests.test_tasks'
         )
+
+
+class ThumbnailsTasksTest(TestCase):
+    @mock.patch('geotrek.common.tasks.generate_attachment_thumbnails.delay',
+                side_effect=OperationalError("Error 111 connecting to redis:6379. Connection refused."))
+    def test_thumbnails_generated_on_demand_without_broker(self, delay):
+        content = POIFactory(geom='SRID=%s;POINT(1 1)' % settings.SRID)
+        picture = AttachmentFactory.create(content_object=content, attachment_file=get_dummy_uploaded_image())
+        queue_thumbnails_generation(picture.pk)
+        delay.assert_called_once_with(picture.pk)
+        self.assertTrue(get_picture_thumbnail(picture, 'small-square'))
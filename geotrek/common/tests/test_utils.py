@@ -2,11 +2,15 @@
 
 import mock
 
+from django.conf import settings
+from django.contrib.gis.geos import LineString, Point
+from django.core.cache import caches
 from django.db import connection
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from ..utils import sql_extent, uniquify
 from ..utils.postgresql import debug_pg_notices
+from ..utils.spatial_cache import SpatialCacheGrid
 from ..utils.import_celery import (create_tmp_destination,
                                    subclasses,
                                    )
@@ -24,6 +28,9 @@ class UtilsTest(TestCase):
     def test_uniquify(self):
         self.assertEqual([3, 2, 1], uniquify([3, 3, 2, 1, 3, 1, 2]))
 
+    def test_uniquify_unhashable(self):
+        self.assertEqual([[1], 2, [3]], uniquify([[1], 2, [1], [3], 2]))
+
     def test_postgresql_notices(self):
         def raisenotice():
             cursor = connection.cursor()
@@ -56,3 +63,28 @@ class UtilsTest(TestCase):
             ('/tmp/geotrek/bombadil', '/tmp/geotrek/bombadil/bombadil'),
             create_tmp_destination('bombadil')
         )
+
+
+@override_settings(SPATIAL_EXTENT=(0, 0, 1000, 1000), SPATIAL_CACHE_GRID_SIZE=10)
+class SpatialCacheGridTest(TestCase):
+    def setUp(self):
+        caches['fat'].clear()
+        self.grid = SpatialCacheGrid('test')
+
+    def test_cell_at(self):
+        self.assertEqual(self.grid.cell_at(50, 50), 0)
+        self.assertEqual(self.grid.cell_at(150, 250), 21)
+        # Outside extent
+        self.assertEqual(self.grid.cell_at(-50, 2000), 90)
+
+    def test_cells_of(self):
+        geom = LineString((50, 50), (150, 150), srid=settings.SRID)
+        self.assertEqual(self.grid.cells_of(geom), {0, 1, 10, 11})
+
+    def test_invalidate(self):
+        versions = self.grid.versions()
+        self.grid.invalidate(Point(150, 250, srid=settings.SRID))
+        new_versions = self.grid.versions()
+        self.assertNotEqual(versions[21], new_versions[21])
+        del versions[21], new_versions[21]
+        self.assertEqual(versions, new_versions)
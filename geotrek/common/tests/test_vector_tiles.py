@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.gis.geos import LineString, Point
+from django.core.cache import caches
+from django.test import TestCase
+
+from geotrek.common import vector_tiles
+
+
+class VectorTilesTest(TestCase):
+    def setUp(self):
+        caches['fat'].clear()
+        self.geom = LineString((3.0, 45.0), (3.01, 45.01), srid=4326)
+        self.geom.transform(settings.SRID)
+
+    def tile_of(self, geom, z):
+        point = geom.centroid.transform(vector_tiles.WEB_MERCATOR_SRID, clone=True)
+        size = 2 * vector_tiles.ORIGIN / 2 ** z
+        return int((point.x + vector_tiles.ORIGIN) / size), int((vector_tiles.ORIGIN - point.y) / size)
+
+    def test_tile_bounds(self):
+        origin = vector_tiles.ORIGIN
+        self.assertEqual(vector_tiles.tile_bounds(0, 0, 0), (-origin, -origin, origin, origin))
+        self.assertEqual(vector_tiles.tile_bounds(1, 1, 0), (0, 0, origin, origin))
+
+    def test_invalid_tiles(self):
+        self.assertTrue(vector_tiles.is_valid_tile(2, 3, 3))
+        self.assertFalse(vector_tiles.is_valid_tile(2, 4, 0))
+        self.assertFalse(vector_tiles.is_valid_tile(-1, 0, 0))
+
+    def test_invalidation_is_scoped_to_modified_area(self):
+        x, y = self.tile_of(self.geom, 14)
+        far = Point(6.0, 48.0, srid=4326)
+        far.transform(settings.SRID)
+        far_x, far_y = self.tile_of(far, 14)
+        low_key = vector_tiles.get_tile_cache_key('path', 5, 16, 11, 'en')
+        key = vector_tiles.get_tile_cache_key('path', 14, x, y, 'en')
+        far_key = vector_tiles.get_tile_cache_key('path', 14, far_x, far_y, 'en')
+        vector_tiles.invalidate_vector_tiles(['path'], self.geom)
+        self.assertNotEqual(low_key, vector_tiles.get_tile_cache_key('path', 5, 16, 11, 'en'))
+        self.assertNotEqual(key, vector_tiles.get_tile_cache_key('path', 14, x, y, 'en'))
+        self.assertEqual(far_key, vector_tiles.get_tile_cache_key('path', 14, far_x, far_y, 'en'))
+
+    def test_invalidation_of_other_layers(self):
+        x, y = self.tile_of(self.geom, 14)
+        key = vector_tiles.get_tile_cache_key('trek', 14, x, y, 'en')
+        vector_tiles.invalidate_vector_tiles(['path'], self.geom)
+        self.assertEqual(key, vector_tiles.get_tile_cache_key('trek', 14, x, y, 'en'))
+
+    def test_large_invalidation_bumps_whole_layer(self):
+        large = LineString((-5.0, 42.0), (8.0, 51.0), srid=4326)
+        far = Point(-60.0, 10.0, srid=4326)
+        x, y = self.tile_of(far, 14)
+        key = vector_tiles.get_tile_cache_key('path', 14, x, y, 'en')
+        vector_tiles.invalidate_vector_tiles(['path'], large)
+        self.assertNotEqual(key, vector_tiles.get_tile_cache_key('path', 14, x, y, 'en'))
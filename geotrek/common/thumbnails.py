@@ -0,0 +1,137 @@
+"""
+Thumbnails of attachments pictures, generated ahead of time.
+
+Every thumbnail used by ``PicturesMixin`` (see ``picture_thumbnail_options()``)
+is generated in background by a celery task when an attachment is saved
+(from forms or parsers), and for all attachments by the
+``generate_thumbnails`` command.
+
+Names of thumbnails generated for a picture are recorded in the ``fat``
+cache, in one index entry per picture file, so that finding a thumbnail
+does not check files on disk. Thumbnails missing from the index are
+generated on demand, like before.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.translation import ugettext as _
+
+from easy_thumbnails.alias import aliases
+from easy_thumbnails.exceptions import InvalidImageFormatError
+from easy_thumbnails.files import get_thumbnailer, ThumbnailFile
+
+logger = logging.getLogger(__name__)
+
+# Aliases of ``THUMBNAIL_ALIASES`` used for attachments pictures
+PICTURE_ALIASES = ('small-square', 'print')
+
+
+def picture_thumbnail_options(picture):
+    """
+    Options of thumbnails of an attachment picture, by name: the watermarked
+    ``resized`` picture (APIs, Geotrek-rando and mobile sync) and aliases.
+    """
+    text = settings.THUMBNAIL_COPYRIGHT_FORMAT.format(author=picture.author, title=picture.title,
+                                                      legend=picture.legend)
+    # Uppercase options aren't used by prepared options (a primary
+    # use of prepared options is to generate the filename -- these
+    # options don't alter the filename).
+    options = {
+        'resized': {'size': (800, 800),
+                    'TEXT': text,
+                    'SIZE_WATERMARK': settings.THUMBNAIL_COPYRIGHT_SIZE,
+                    'watermark': hashlib.md5(text.encode('utf-8')).hexdigest()},
+    }
+    for alias in PICTURE_ALIASES:
+        options[alias] = aliases.get(alias)
+    return options
+
+
+def _index_key(name):
+    return 'thumbnails_index_%s' % hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+def invalidate_thumbnails_index(*names):
+    """
+    Forget thumbnails recorded for the given picture files.
+    """
+    caches['fat'].delete_many([_index_key(name) for name in names])
+
+
+def get_picture_thumbnail(picture, name):
+    """
+    Thumbnail ``name`` of an attachment picture, from the index or generated
+    (and recorded). Raises ``IOError`` or ``InvalidImageFormatError`` if the
+    picture can not be read.
+    """
+    thumbnailer = get_thumbnailer(picture.attachment_file)
+    options = thumbnailer.get_options(picture_thumbnail_options(picture)[name])
+    # Actual name may differ (transparent pictures), it is recorded by expected name
+    expected = thumbnailer.get_thumbnail_name(options)
+    key = _index_key(picture.attachment_file.name)
+    index = caches['fat'].get(key) or {}
+    if expected in index:
+        return ThumbnailFile(name=index[expected], storage=thumbnailer.thumbnail_storage,
+                             thumbnail_options=options)
+    thumbnail = thumbnailer.get_thumbnail(options)
+    index[expected] = thumbnail.name
+    caches['fat'].set(key, index, None)
+    return thumbnail
+
+
+def generate_thumbnails(picture):
+    """
+    Generate all thumbnails of an attachment picture, and record them in the
+    index. Returns ``False`` if the picture can not be read.
+    """
+    thumbnailer = get_thumbnailer(picture.attachment_file)
+    index = {}
+    try:
+        for options in picture_thumbnail_options(picture).values():
+            options = thumbnailer.get_options(options)
+            index[thumbnailer.get_thumbnail_name(options)] = thumbnailer.get_thumbnail(options).name
+    except (IOError, InvalidImageFormatError):
+        logger.info(_("Image %s invalid or missing from disk.") % picture.attachment_file)
+        return False
+    caches['fat'].set(_index_key(picture.attachment_file.name), index, None)
+    return True
+
+
+def queue_thumbnails_generation(pk):
+    """
+    Generate thumbnails of attachment ``pk`` in background. Without broker or
+    worker, they are generated on demand instead.
+    """
+    from geotrek.common.tasks import generate_attachment_thumbnails
+
+    try:
+        generate_attachment_thumbnails.delay(pk)
+    except Exception as e:
+        logger.warning(_("Thumbnails of attachment %(pk)s not queued: %(error)s") % {'pk': pk, 'error': e})
+
+
+def connect_thumbnails_generation(model):
+    """
+    Generate thumbnails of pictures attachments (``model``) in background when
+    they are saved, once the transaction is committed.
+    """
+    def generate(sender, instance, **kwargs):
+        if not instance.attachment_file:
+            return
+        # File or copyright (watermark) may have changed
+        invalidate_thumbnails_index(instance.attachment_file.name)
+        if instance.is_image:
+            pk = instance.pk
+            transaction.on_commit(lambda: queue_thumbnails_generation(pk))
+
+    def invalidate(sender, instance, **kwargs):
+        if instance.attachment_file:
+            invalidate_thumbnails_index(instance.attachment_file.name)
+
+    uid = 'thumbnails_%s' % model._meta.label_lower
+    post_save.connect(generate, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
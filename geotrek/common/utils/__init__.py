@@ -98,7 +98,16 @@ def uniquify(values):
     Return unique values, order preserved
     """
     unique = []
-    [unique.append(i) for i in values if i not in unique]
+    seen = set()
+    for value in values:
+        try:
+            if value in seen:
+                continue
+            seen.add(value)
+        except TypeError:  # Unhashable values
+            if value in unique:
+                continue
+        unique.append(value)
     return unique
 
 
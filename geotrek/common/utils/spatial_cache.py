@@ -0,0 +1,101 @@
+"""
+Cache partitioned by a fixed grid over ``settings.SPATIAL_EXTENT``.
+
+Each cell carries its own version (stored in the ``fat`` cache), bumped when
+an object within the cell is modified. Every object belongs to the cell
+containing the lower-left corner of its bounding box, so that cached
+fragments of a cell only change when objects of this cell are modified.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, Func, IntegerField
+
+
+class SpatialCacheGrid(object):
+    def __init__(self, name, size=None):
+        self.name = name
+        self._size = size
+
+    @property
+    def size(self):
+        """ Number of cells along each axis """
+        return self._size or settings.SPATIAL_CACHE_GRID_SIZE
+
+    @property
+    def cell_width(self):
+        xmin, ymin, xmax, ymax = settings.SPATIAL_EXTENT
+        return float(xmax - xmin) / self.size
+
+    @property
+    def cell_height(self):
+        xmin, ymin, xmax, ymax = settings.SPATIAL_EXTENT
+        return float(ymax - ymin) / self.size
+
+    def cells(self):
+        return range(self.size * self.size)
+
+    def _col_row(self, x, y):
+        xmin, ymin, xmax, ymax = settings.SPATIAL_EXTENT
+        col = min(self.size - 1, max(0, int((x - xmin) // self.cell_width)))
+        row = min(self.size - 1, max(0, int((y - ymin) // self.cell_height)))
+        return col, row
+
+    def cell_at(self, x, y):
+        """
+        Cell containing point (x, y) in SRID, objects outside the spatial extent
+        belong to border cells.
+        """
+        col, row = self._col_row(x, y)
+        return row * self.size + col
+
+    def cells_of(self, geometry):
+        """
+        Cells covered by the geometry bounding box.
+        """
+        if geometry.srid and geometry.srid != settings.SRID:
+            geometry = geometry.transform(settings.SRID, clone=True)
+        xmin, ymin, xmax, ymax = geometry.extent
+        col_min, row_min = self._col_row(xmin, ymin)
+        col_max, row_max = self._col_row(xmax, ymax)
+        return set(row * self.size + col
+                   for col in range(col_min, col_max + 1)
+                   for row in range(row_min, row_max + 1))
+
+    def cell_expression(self, geom_field='geom'):
+        """
+        Cell of objects, to be used in querysets.
+        """
+        xmin, ymin, xmax, ymax = settings.SPATIAL_EXTENT
+        axis = "LEAST(%(last)s, GREATEST(0, FLOOR((ST_%(axis)sMin(%%(expressions)s) - %(min)r) / %(step)r)))::integer"
+        template = "(%s * %s + %s)" % (
+            axis % {'last': self.size - 1, 'axis': 'Y', 'min': float(ymin), 'step': self.cell_height},
+            self.size,
+            axis % {'last': self.size - 1, 'axis': 'X', 'min': float(xmin), 'step': self.cell_width},
+        )
+        return Func(F(geom_field), template=template, output_field=IntegerField())
+
+    def _version_key(self, cell):
+        return 'spatial_cache_%s_%s' % (self.name, cell)
+
+    def versions(self):
+        """
+        Current version of every cell.
+        """
+        keys = dict((cell, self._version_key(cell)) for cell in self.cells())
+        versions = caches['fat'].get_many(keys.values())
+        return dict((cell, versions.get(key, '0')) for cell, key in keys.items())
+
+    def invalidate(self, *geometries):
+        """
+        Bump versions of cells covered by the given geometries.
+        """
+        cells = set()
+        for geometry in geometries:
+            if geometry is not None and not geometry.empty:
+                cells |= self.cells_of(geometry)
+        if cells:
+            version = uuid.uuid4().hex
+            caches['fat'].set_many(dict((self._version_key(cell), version) for cell in cells), None)
+        return cells
@@ -0,0 +1,121 @@
+"""
+Vector tiles (Mapbox Vector Tiles, generated by PostGIS) and their cache.
+
+Tiles are cached in the ``fat`` cache, under a key including versions of
+the area they cover:
+
+- a version of the whole layer (bumped when too many cells are modified),
+- a version of low zoom levels (bumped on any modification, since a tile
+  covers a large part of the territory below ``CELL_ZOOM``),
+- a version of the grid cell (tile of zoom ``CELL_ZOOM``) containing the tile.
+
+Modifying an object only bumps the versions of cells covering its bounding
+box (before and after modification), other tiles remain cached.
+"""
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+
+
+WEB_MERCATOR_SRID = 3857
+ORIGIN = 20037508.342789244
+MAX_ZOOM = 22
+CELL_ZOOM = 10
+MAX_CELLS = 256
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+
+def tile_bounds(z, x, y):
+    """
+    Bounds (xmin, ymin, xmax, ymax) of tile z/x/y, in web mercator.
+    """
+    size = 2 * ORIGIN / 2 ** z
+    xmin = -ORIGIN + x * size
+    ymax = ORIGIN - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def _version_key(layer, *args):
+    return 'vector_tiles_version_%s' % '_'.join(str(arg) for arg in (layer, ) + args)
+
+
+def get_tile_cache_key(layer, z, x, y, language):
+    """
+    Cache key of tile z/x/y, changing when an object of the tile is modified.
+    """
+    keys = [_version_key(layer), _version_key(layer, 'low')]
+    if z >= CELL_ZOOM:
+        keys[1] = _version_key(layer, x >> (z - CELL_ZOOM), y >> (z - CELL_ZOOM))
+    versions = caches['fat'].get_many(keys)
+    return 'vector_tile_%s_%s_%s_%s_%s_%s' % (layer, language, z, x, y,
+                                              '_'.join(versions.get(key, '0') for key in keys))
+
+
+def _cells(geometry):
+    """
+    Cells of zoom ``CELL_ZOOM`` covering the geometry bounding box, including
+    the tiles buffer.
+    """
+    size = 2 * ORIGIN / 2 ** CELL_ZOOM
+    margin = size * TILE_BUFFER / TILE_EXTENT
+    xmin, ymin, xmax, ymax = geometry.transform(WEB_MERCATOR_SRID, clone=True).extent
+    last = 2 ** CELL_ZOOM - 1
+    col_min = max(0, int((xmin - margin + ORIGIN) / size))
+    col_max = min(last, int((xmax + margin + ORIGIN) / size))
+    row_min = max(0, int((ORIGIN - ymax - margin) / size))
+    row_max = min(last, int((ORIGIN - ymin + margin) / size))
+    return set((col, row)
+               for col in range(col_min, col_max + 1)
+               for row in range(row_min, row_max + 1))
+
+
+def invalidate_vector_tiles(layers, *geometries):
+    """
+    Invalidate cached tiles of ``layers`` covering the given geometries.
+    """
+    cells = set()
+    for geometry in geometries:
+        if geometry is None or geometry.empty:
+            continue
+        cells |= _cells(geometry)
+        if len(cells) > MAX_CELLS:
+            break
+    if not cells:
+        return
+    version = uuid.uuid4().hex
+    versions = {}
+    for layer in layers:
+        if len(cells) > MAX_CELLS:
+            versions[_version_key(layer)] = version
+            continue
+        versions[_version_key(layer, 'low')] = version
+        for col, row in cells:
+            versions[_version_key(layer, col, row)] = version
+    caches['fat'].set_many(versions, None)
+
+
+def connect_vector_tiles_invalidation(model, layers, geom_field='geom'):
+    """
+    Invalidate tiles of ``layers`` when instances of ``model`` are saved or
+    deleted, once the transaction is committed.
+    """
+    def store_previous_geometry(sender, instance, **kwargs):
+        instance._vector_tiles_geom = None
+        if instance.pk:
+            instance._vector_tiles_geom = sender._base_manager.filter(pk=instance.pk).values_list(geom_field, flat=True).first()
+
+    def invalidate(sender, instance, **kwargs):
+        geometries = (getattr(instance, '_vector_tiles_geom', None), getattr(instance, geom_field))
+        transaction.on_commit(lambda: invalidate_vector_tiles(layers, *geometries))
+
+    uid = 'vector_tiles_%s' % model._meta.label_lower
+    pre_save.connect(store_previous_geometry, sender=model, weak=False, dispatch_uid=uid)
+    post_save.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(invalidate, sender=model, weak=False, dispatch_uid=uid)
@@ -6,12 +6,20 @@ from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.utils import DatabaseError
-from django.http import HttpResponse, HttpResponseNotFound
+from django.http import HttpResponse, HttpResponseNotFound, Http404
 from django.utils.translation import ugettext as _
 from django_celery_results.models import TaskResult
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.views import static
+from django.views.generic import View
+from django.db import connection
+from django.db.models import F, Func, Value
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.db.models.functions import Transform
+from django.contrib.gis.geos import Polygon
+from django.utils.translation import get_language
+from django.core.cache import caches
 
 from mapentity.helpers import api_bbox
 from mapentity.registry import registry
@@ -19,6 +27,7 @@ from mapentity import views as mapentity_views
 
 from geotrek.celery import app as celery_app
 from geotrek.common.utils import sql_extent
+from geotrek.common import vector_tiles
 from geotrek.common.models import FileType, Attachment
 from geotrek import __version__
 
@@ -83,6 +92,93 @@ class PublicOrReadPermMixin(object):
         return obj
 
 
+class VectorTileView(View):
+    """
+    Layer as Mapbox Vector Tiles (z/x/y), generated by PostGIS (>= 2.4).
+
+    ``properties`` items are field names or (name, lookup) tuples.
+    Tiles are cached until an object they contain is modified (see
+    ``geotrek.common.vector_tiles``).
+    """
+    queryset = None
+    layer = None
+    properties = []
+    geom_field = 'geom'
+
+    @property
+    def model(self):
+        return self.queryset.model
+
+    def get_layer(self):
+        return self.layer or self.model._meta.model_name
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def get_geometry(self, z):
+        """
+        Source geometry: the precomputed simplified geometry (if any) whose
+        tolerance is below the tile resolution.
+        """
+        resolution = 2 * vector_tiles.ORIGIN / 2 ** z / vector_tiles.TILE_EXTENT
+        tolerances = [t for t in getattr(self.model, 'SIMPLIFIED_TOLERANCES', ()) if t <= resolution]
+        if self.geom_field == 'geom' and tolerances:
+            return F('geom_simplified_{}'.format(max(tolerances)))
+        return F(self.geom_field)
+
+    def get_tile(self, z, x, y):
+        xmin, ymin, xmax, ymax = vector_tiles.tile_bounds(z, x, y)
+        margin = (xmax - xmin) * vector_tiles.TILE_BUFFER / vector_tiles.TILE_EXTENT
+        bbox = Polygon.from_bbox((xmin - margin, ymin - margin, xmax + margin, ymax + margin))
+        bbox.srid = vector_tiles.WEB_MERCATOR_SRID
+        bbox.transform(settings.SRID)
+        envelope = Func(Value(xmin), Value(ymin), Value(xmax), Value(ymax), Value(vector_tiles.WEB_MERCATOR_SRID),
+                        function='ST_MakeEnvelope', output_field=GeometryField(srid=vector_tiles.WEB_MERCATOR_SRID))
+        mvt_geom = Func(Transform(self.get_geometry(z), vector_tiles.WEB_MERCATOR_SRID), envelope,
+                        Value(vector_tiles.TILE_EXTENT), Value(vector_tiles.TILE_BUFFER), Value(True),
+                        function='ST_AsMVTGeom', output_field=GeometryField(srid=vector_tiles.WEB_MERCATOR_SRID))
+        names, lookups = ['id'], []
+        for prop in self.properties:
+            name, lookup = prop if isinstance(prop, tuple) else (prop, prop)
+            names.append(name)
+            lookups.append(lookup)
+        qs = self.get_queryset().filter(**{'%s__bboverlaps' % self.geom_field: bbox})
+        qs = qs.annotate(mvt_geom=mvt_geom).values_list('mvt_geom', 'pk', *lookups)
+        inner_sql, params = qs.query.sql_with_params()
+        columns = ['c%s' % i for i in range(len(names) + 1)]
+        sql = """
+        SELECT ST_AsMVT(tile, %%s, %%s, 'geom') FROM (
+            SELECT %(select)s FROM (%(inner)s) AS tile_columns(%(columns)s) WHERE c0 IS NOT NULL
+        ) AS tile
+        """ % {
+            'select': ', '.join(['c0 AS geom'] + ['%s AS "%s"' % (column, prop_name) for column, prop_name in zip(columns[1:], names)]),
+            'inner': inner_sql,
+            'columns': ', '.join(columns),
+        }
+        cursor = connection.cursor()
+        cursor.execute(sql, (self.get_layer(), vector_tiles.TILE_EXTENT) + tuple(params))
+        tile = cursor.fetchone()[0]
+        return bytes(tile) if tile is not None else b''
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.has_perm(self.model.get_permission_codename('layer')):
+            raise PermissionDenied
+        return super(VectorTileView, self).dispatch(request, *args, **kwargs)
+
+    def get(self, request, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if not vector_tiles.is_valid_tile(z, x, y):
+            raise Http404
+        cache = caches['fat']
+        key = vector_tiles.get_tile_cache_key(self.get_layer(), z, x, y, get_language())
+        tile = cache.get(key)
+        if tile is None:
+            tile = self.get_tile(z, x, y)
+            cache.set(key, tile)
+        return HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+
+
 class DocumentPublicMixin(object):
     template_name_suffix = "_public"
 
@@ -1,5 +1,7 @@
 from __future__ import unicode_literals
 
+from django.conf import settings
+from django.db.backends.signals import connection_created
 from django.utils.translation import ugettext_lazy as _
 
 from geotrek.appconfig import GeotrekConfig
@@ -8,3 +10,16 @@ from geotrek.appconfig import GeotrekConfig
 class CoreConfig(GeotrekConfig):
     name = 'geotrek.core'
     verbose_name = _("Core")
+
+    def ready(self):
+        super(CoreConfig, self).ready()
+        connection_created.connect(set_topology_geometry_mode, dispatch_uid='geotrek.core.topology_geometry_mode')
+
+
+def set_topology_geometry_mode(sender, connection, **kwargs):
+    """
+    Apply ``TOPOLOGY_GEOMETRY_UPDATE`` setting to database session (see triggers)
+    """
+    if settings.TOPOLOGY_GEOMETRY_UPDATE != 'immediate':
+        cursor = connection.cursor()
+        cursor.execute("SET geotrek.evenements_geometry = %s", [settings.TOPOLOGY_GEOMETRY_UPDATE])
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from django_filters import CharFilter, ModelChoiceFilter
 
-from .models import Topology, Path, Trail
+from .models import Topology, Path, PathAggregation, Trail
 
 from geotrek.common.filters import OptionalRangeFilter, StructureRelatedFilterSet
 from geotrek.infrastructure.filters import InfrastructureFilterSet
@@ -46,33 +46,27 @@ class TopologyFilter(ModelChoiceFilter):
         """
         This piece of code should be rewritten nicely with managers : TODO !
         """
-        overlapping = Topology.overlapping(edges)
+        overlapping = Topology.overlapping(edges).order_by().values('pk')
 
         # In case, we filter on paths
         if qs.model == Path:
-            paths = []
-            for o in overlapping:
-                paths.extend(o.paths.all())
-            return qs.filter(pk__in=[path.pk for path in set(paths)])
+            return qs.filter(pk__in=PathAggregation.objects.filter(topo_object__in=overlapping)
+                                                           .order_by().values('path'))
 
         # TODO: This is (amazingly) ugly in terms of OOP. Should refactor overlapping()
         elif issubclass(qs.model, maintenance_models.Intervention):
-            return qs.filter(topology__in=[topo.pk for topo in overlapping])
+            return qs.filter(topology__in=overlapping)
         elif issubclass(qs.model, maintenance_models.Project):
             # Find all interventions overlapping those edges
             interventions = self._topology_filter(maintenance_models.Intervention.objects.existing()
-                                                  .select_related('project')
                                                   .filter(project__in=qs),
                                                   edges)
             # Return only the projects concerned by the interventions
-            projects = []
-            for intervention in interventions:
-                projects.append(intervention.project.pk)
-            return qs.filter(pk__in=set(projects))
+            return qs.filter(pk__in=interventions.order_by().values('project'))
 
         else:
             assert issubclass(qs.model, Topology), "%s is not a Topology as expected" % qs.model
-            return qs.filter(pk__in=[topo.pk for topo in overlapping])
+            return qs.filter(pk__in=overlapping)
 
 
 class PathFilterSet(StructureRelatedFilterSet):
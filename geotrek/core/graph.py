@@ -1,6 +1,21 @@
+import heapq
 import math
+import logging
+import uuid
+from array import array
 from collections import defaultdict
 
+from django.core.cache import caches
+from django.db import connection, transaction
+
+
+logger = logging.getLogger(__name__)
+
+GRAPH_CACHE_KEY = 'path_graph'
+GRAPH_JSON_CACHE_KEY = 'path_graph_json'
+GRAPH_LOCK_KEY = 'path_graph_lock'
+GRAPH_LOCK_TIMEOUT = 60
+
 
 def path_modifier(path):
     length = 0.0 if math.isnan(path.length) else path.length
@@ -55,3 +70,394 @@ def graph_edges_nodes_of_qs(qs):
         'edges': dict(edges),
         'nodes': dict(nodes),
     }
+
+
+class PathGraph(object):
+    """
+    Graph of the path network: nodes are path extremities, edges are paths.
+
+    Edges and nodes are stored in flat arrays (one slot per edge or node),
+    and only path extremities are loaded from database. The graph is
+    updated incrementally with the paths modified by each transaction (see
+    ``path_graph_changed()``), and with the paths modified since the latest
+    seen modification date for other changes, instead of being rebuilt
+    from the whole network.
+
+    ``version`` changes only when the network changes (not when other
+    attributes of paths are modified).
+    """
+    def __init__(self):
+        self.latest = None
+        self.version = uuid.uuid4().hex
+        # Nodes (node id is the slot index + 1, like in the JSON graph)
+        self._node_ids = {}
+        self._node_x = array('d')
+        self._node_y = array('d')
+        self._node_degree = array('l')
+        self._free_nodes = []
+        # Edges
+        self._edge_slots = {}
+        self._edge_pk = array('l')
+        self._edge_start = array('l')
+        self._edge_end = array('l')
+        self._edge_length = array('d')
+        self._free_edges = []
+        # Adjacency: node id -> edge slots
+        self._adjacency = defaultdict(list)
+
+    def __len__(self):
+        return len(self._edge_slots)
+
+    def __contains__(self, pk):
+        return pk in self._edge_slots
+
+    def _get_or_create_node(self, x, y):
+        node = self._node_ids.get((x, y))
+        if node is not None:
+            return node
+        if self._free_nodes:
+            node = self._free_nodes.pop()
+            self._node_x[node - 1] = x
+            self._node_y[node - 1] = y
+        else:
+            self._node_x.append(x)
+            self._node_y.append(y)
+            self._node_degree.append(0)
+            node = len(self._node_x)
+        self._node_ids[(x, y)] = node
+        return node
+
+    def _release_node(self, node):
+        self._node_degree[node - 1] -= 1
+        if self._node_degree[node - 1] <= 0:
+            self._node_degree[node - 1] = 0
+            del self._node_ids[(self._node_x[node - 1], self._node_y[node - 1])]
+            self._adjacency.pop(node, None)
+            self._free_nodes.append(node)
+
+    def add_path(self, pk, start, end, length):
+        """
+        Add (or replace) the path ``pk`` going from ``start`` to ``end`` (x, y)
+        Returns False if the path was already in graph unchanged.
+        """
+        if length is None or math.isnan(length):
+            length = 0.0
+        if pk in self._edge_slots:
+            node_start, node_end, current_length = self.edge(pk)
+            if (self.node_coords(node_start), self.node_coords(node_end), current_length) == (tuple(start), tuple(end), length):
+                return False
+            self.remove_path(pk)
+        node_start = self._get_or_create_node(*start)
+        node_end = self._get_or_create_node(*end)
+        if self._free_edges:
+            slot = self._free_edges.pop()
+            self._edge_pk[slot] = pk
+            self._edge_start[slot] = node_start
+            self._edge_end[slot] = node_end
+            self._edge_length[slot] = length
+        else:
+            slot = len(self._edge_pk)
+            self._edge_pk.append(pk)
+            self._edge_start.append(node_start)
+            self._edge_end.append(node_end)
+            self._edge_length.append(length)
+        self._edge_slots[pk] = slot
+        for node in (node_start, node_end):
+            self._node_degree[node - 1] += 1
+            self._adjacency[node].append(slot)
+        return True
+
+    def remove_path(self, pk):
+        slot = self._edge_slots.pop(pk, None)
+        if slot is None:
+            return False
+        for node in (self._edge_start[slot], self._edge_end[slot]):
+            slots = self._adjacency.get(node)
+            if slots is not None and slot in slots:
+                slots.remove(slot)
+            self._release_node(node)
+        self._edge_pk[slot] = 0
+        self._free_edges.append(slot)
+        return True
+
+    def node_coords(self, node):
+        return self._node_x[node - 1], self._node_y[node - 1]
+
+    def edge(self, pk):
+        """
+        Returns (start node, end node, length) of the path ``pk``
+        """
+        slot = self._edge_slots[pk]
+        return self._edge_start[slot], self._edge_end[slot], self._edge_length[slot]
+
+    def neighbours(self, node):
+        """
+        Yields (other node, path pk, length) for each path touching ``node``
+        """
+        for slot in self._adjacency.get(node, ()):
+            start, end = self._edge_start[slot], self._edge_end[slot]
+            other = end if start == node else start
+            yield other, self._edge_pk[slot], self._edge_length[slot]
+
+    def serialize(self):
+        """
+        Returns the graph in the format used by ``graph_edges_nodes_of_qs``
+        (and expected by the Javascript router).
+        """
+        edges = {}
+        nodes = defaultdict(dict)
+        for pk, slot in self._edge_slots.iteritems():
+            start, end = self._edge_start[slot], self._edge_end[slot]
+            edges[pk] = {'id': pk,
+                         'length': self._edge_length[slot],
+                         'nodes_id': [start, end]}
+            nodes[start][end] = pk
+            nodes[end][start] = pk
+        return {
+            'edges': edges,
+            'nodes': dict(nodes),
+        }
+
+    def _edge_positions(self, pk, from_node):
+        """
+        Positions (start, end) of a path fully walked from ``from_node``
+        """
+        start, end, length = self.edge(pk)
+        return (0.0, 1.0) if start == from_node else (1.0, 0.0)
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest way between ``source`` and ``target``, given as
+        (path pk, position along path), as a list of
+        (path pk, start position, end position).
+
+        A* search, using the euclidean distance to the target path
+        extremities as heuristic (path lengths are never shorter).
+        Returns None if target cannot be reached.
+        """
+        src_pk, src_pos = source
+        dst_pk, dst_pos = target
+        src_start, src_end, src_length = self.edge(src_pk)
+        dst_start, dst_end, dst_length = self.edge(dst_pk)
+
+        best_cost, best_node = float('inf'), None
+        if src_pk == dst_pk:
+            best_cost = abs(dst_pos - src_pos) * src_length
+
+        # Cost and position to reach target from its path extremities
+        targets = {}
+        for node, cost, position in ((dst_start, dst_pos * dst_length, 0.0),
+                                     (dst_end, (1 - dst_pos) * dst_length, 1.0)):
+            if node not in targets or cost < targets[node][0]:
+                targets[node] = (cost, position)
+        targets_coords = [self.node_coords(node) for node in targets]
+
+        def heuristic(node):
+            x, y = self.node_coords(node)
+            return min(math.hypot(x - tx, y - ty) for tx, ty in targets_coords)
+
+        distances = {}
+        previous = {}
+        heap = []
+        for node, cost, position in ((src_start, src_pos * src_length, 0.0),
+                                     (src_end, (1 - src_pos) * src_length, 1.0)):
+            if cost < distances.get(node, float('inf')):
+                distances[node] = cost
+                previous[node] = (None, src_pk, src_pos, position)
+                heapq.heappush(heap, (cost + heuristic(node), cost, node))
+
+        while heap:
+            estimate, cost, node = heapq.heappop(heap)
+            if estimate >= best_cost:
+                break
+            if cost > distances[node]:
+                continue  # Outdated heap entry
+            if node in targets and cost + targets[node][0] < best_cost:
+                best_cost, best_node = cost + targets[node][0], node
+            for other, pk, length in self.neighbours(node):
+                other_cost = cost + length
+                if other_cost < distances.get(other, float('inf')):
+                    distances[other] = other_cost
+                    previous[other] = (node, pk) + self._edge_positions(pk, node)
+                    heapq.heappush(heap, (other_cost + heuristic(other), other_cost, other))
+
+        if best_node is None:
+            if src_pk == dst_pk:
+                return [(src_pk, src_pos, dst_pos)]
+            return None
+
+        steps = [(dst_pk, targets[best_node][1], dst_pos)]
+        node = best_node
+        while node is not None:
+            node, pk, start, end = previous[node]
+            steps.append((pk, start, end))
+        steps.reverse()
+        # Remove zero-length steps at extremities (e.g. snapped on a node)
+        useful = [step for step in steps if step[1] != step[2]]
+        return useful or steps[:1]
+
+    @classmethod
+    def _fetch_endpoints(cls, since=None, pks=None):
+        from .models import Path
+
+        sql = """
+        SELECT id, visible AND NOT brouillon,
+               ST_X(ST_StartPoint(geom)), ST_Y(ST_StartPoint(geom)),
+               ST_X(ST_EndPoint(geom)), ST_Y(ST_EndPoint(geom)),
+               longueur
+        FROM %(table)s
+        """ % {'table': Path._meta.db_table}
+        params = []
+        if pks is not None:
+            sql += " WHERE id = ANY(%s)"
+            params.append(list(pks))
+        elif since is not None:
+            sql += " WHERE date_update >= %s"
+            params.append(since)
+        sql += " ORDER BY id"
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+    @classmethod
+    def _fetch_latest(cls):
+        from .models import Path
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT max(date_update) FROM %s" % Path._meta.db_table)
+        return cursor.fetchone()[0]
+
+    @classmethod
+    def _fetch_pks(cls):
+        from .models import Path
+
+        cursor = connection.cursor()
+        cursor.execute("SELECT id FROM %s WHERE visible AND NOT brouillon" % Path._meta.db_table)
+        return set(row[0] for row in cursor.fetchall())
+
+    def _apply(self, rows):
+        """
+        Returns True if the network was modified.
+        """
+        modified = False
+        for pk, enabled, start_x, start_y, end_x, end_y, length in rows:
+            if enabled:
+                modified = self.add_path(pk, (start_x, start_y), (end_x, end_y), length) or modified
+            else:
+                modified = self.remove_path(pk) or modified
+        return modified
+
+    @classmethod
+    def load(cls):
+        """
+        Build the whole graph in one query.
+        """
+        graph = cls()
+        graph.latest = cls._fetch_latest()
+        graph._apply(cls._fetch_endpoints())
+        return graph
+
+    def apply_changes(self, updated=None, removed=None):
+        """
+        Apply changes of the given paths pks (modified or deleted).
+        Returns True if the graph was modified.
+        """
+        modified = False
+        for pk in removed or []:
+            modified = self.remove_path(pk) or modified
+        if updated:
+            modified = self._apply(self._fetch_endpoints(pks=updated)) or modified
+        if modified:
+            self.version = uuid.uuid4().hex
+        return modified
+
+    def refresh(self):
+        """
+        Apply the changes made to paths since the latest seen modification
+        date, for paths modified outside of Django (e.g. split by triggers).
+        Returns True if the graph was modified.
+        """
+        latest = self._fetch_latest()
+        if latest == self.latest:
+            return False
+        modified = self._apply(self._fetch_endpoints(since=self.latest))
+        # Paths can be deleted at DB-level
+        for pk in set(self._edge_slots) - self._fetch_pks():
+            modified = self.remove_path(pk) or modified
+        self.latest = latest
+        if modified:
+            self.version = uuid.uuid4().hex
+        return True
+
+
+def get_path_graph(updated=None):
+    """
+    Returns the path graph, up-to-date, shared through the ``fat`` cache.
+    ``updated`` is an optional list of path pks to fetch again.
+    """
+    cache = caches['fat']
+    graph = cache.get(GRAPH_CACHE_KEY)
+    if graph is None:
+        graph = PathGraph.load()
+    else:
+        changed = graph.refresh()
+        if updated:
+            changed = graph.apply_changes(updated=updated) or changed
+        if not changed:
+            return graph
+    cache.set(GRAPH_CACHE_KEY, graph, None)
+    return graph
+
+
+def update_path_graph(updated=None, removed=None):
+    """
+    Apply paths changes to the cached graph, if any.
+    When another process is already updating it, drop it instead, it will
+    be rebuilt on next access.
+    """
+    cache = caches['fat']
+    graph = cache.get(GRAPH_CACHE_KEY)
+    if graph is None:
+        return
+    if not cache.add(GRAPH_LOCK_KEY, True, GRAPH_LOCK_TIMEOUT):
+        cache.delete(GRAPH_CACHE_KEY)
+        return
+    try:
+        if graph.apply_changes(updated=updated, removed=removed):
+            cache.set(GRAPH_CACHE_KEY, graph, None)
+    except Exception as e:
+        logger.exception(e)
+        cache.delete(GRAPH_CACHE_KEY)
+    finally:
+        cache.delete(GRAPH_LOCK_KEY)
+
+
+class PathGraphChanges(object):
+    """
+    Paths modified or deleted in the current transaction, applied to the
+    cached graph once it is committed.
+    """
+    def __init__(self):
+        self.updated = set()
+        self.removed = set()
+
+    def __call__(self):
+        update_path_graph(updated=self.updated - self.removed, removed=self.removed)
+
+
+def path_graph_changed(updated=(), removed=()):
+    """
+    Record paths changes of the current transaction, so that they are applied
+    with a single update of the cached graph.
+    """
+    conn = transaction.get_connection()
+    changes = getattr(conn, 'path_graph_changes', None)
+    # Dropped with its callback if the transaction (or savepoint) was rolled back
+    pending = changes is not None and any(func is changes for sids, func in conn.run_on_commit)
+    if not pending:
+        changes = conn.path_graph_changes = PathGraphChanges()
+    changes.updated.update(updated)
+    changes.removed.update(removed)
+    if not pending:
+        # Called immediately in autocommit mode
+        transaction.on_commit(changes)
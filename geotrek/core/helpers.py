@@ -1,18 +1,43 @@
 import json
 import logging
+from contextlib import contextmanager
 
 from django.conf import settings
 from django.contrib.gis.geos import GEOSGeometry
-from django.db import connection
+from django.db import connection, transaction
 from django.contrib.gis.geos import Point
+from django.db.models import Expression, F, FloatField, IntegerField, Subquery
 from django.db.models.query import QuerySet
 
-from geotrek.common.utils import sqlfunction, uniquify
+from geotrek.common.utils import sqlfunction
 
 
 logger = logging.getLogger(__name__)
 
 
+@contextmanager
+def topologies_geometry_mode(mode):
+    """
+    Change how geometry of topologies is computed by triggers within the block:
+    'immediate', 'transaction', 'worker' (see ``TOPOLOGY_GEOMETRY_UPDATE`` setting) or
+    'off' (geometries have to be updated afterwards with ``TopologyHelper.update_geometry()``).
+    In 'transaction' mode, geometries are computed once at the end of the block.
+    """
+    with transaction.atomic():
+        cursor = connection.cursor()
+        # Blocks can be nested, restore mode of the enclosing block
+        cursor.execute("SELECT ft_evenements_geometry_mode()")
+        previous = cursor.fetchone()[0]
+        cursor.execute("SET LOCAL geotrek.evenements_geometry = %s", [mode])
+        # On error, the mode is reset by the rollback of the block
+        yield
+        if mode == 'transaction':
+            # Compute queued geometries now, while the mode applies
+            cursor.execute("SET CONSTRAINTS e_t_evenement_differe_geometry_tgr IMMEDIATE")
+            cursor.execute("SET CONSTRAINTS e_t_evenement_differe_geometry_tgr DEFERRED")
+        cursor.execute("SET LOCAL geotrek.evenements_geometry = %s", [previous])
+
+
 class TopologyHelper(object):
     @classmethod
     def deserialize(cls, serialized):
@@ -97,6 +122,10 @@ class TopologyHelper(object):
         PathAggregation.objects.filter(topo_object=topology).delete()
 
         try:
+            # Fetch all paths at once
+            path_pks = set(int(pk) for subtopology in objdict for pk in subtopology['paths'])
+            paths_by_pk = Path.objects.in_bulk(path_pks)
+            aggregations = []
             counter = 0
             for j, subtopology in enumerate(objdict):
                 last_topo = j == len(objdict) - 1
@@ -108,8 +137,12 @@ class TopologyHelper(object):
                     # Javascript hash keys are parsed as a string
                     idx = str(i)
                     start_position, end_position = positions.get(idx, (0.0, 1.0))
-                    path = Path.objects.get(pk=path)
-                    topology.add_path(path, start=start_position, end=end_position, order=counter, reload=False)
+                    try:
+                        path = paths_by_pk[int(path)]
+                    except KeyError:
+                        raise Path.DoesNotExist("Path %s does not exist." % path)
+                    aggregations.append(PathAggregation(topo_object=topology, path=path, order=counter,
+                                                        start_position=start_position, end_position=end_position))
                     if not last_topo and last_path:
                         counter += 1
                         # Intermediary marker.
@@ -131,13 +164,106 @@ class TopologyHelper(object):
                         elif len(paths) == 1:
                             pos = end_position
                         assert pos >= 0, "Invalid position (%s, %s)." % (start_position, end_position)
-                        topology.add_path(path, start=pos, end=pos, order=counter, reload=False)
+                        aggregations.append(PathAggregation(topo_object=topology, path=path, order=counter,
+                                                            start_position=pos, end_position=pos))
                     counter += 1
-        except (AssertionError, ValueError, KeyError, Path.DoesNotExist) as e:
+        except (AssertionError, ValueError, KeyError, TypeError, Path.DoesNotExist) as e:
             raise ValueError("Invalid serialized topology : %s" % e)
+
+        # Insert all aggregations at once, and compute geometry only once
+        with topologies_geometry_mode('off'):
+            PathAggregation.objects.bulk_create(aggregations)
+        cls.update_geometry([topology.pk])
+        topology.deleted = False
         topology.save()
         return topology
 
+    @classmethod
+    def update_geometry(cls, topology_pks):
+        """
+        Compute geometry (and altimetry) of specified topologies.
+        """
+        cursor = connection.cursor()
+        cursor.execute("SELECT update_geometry_of_evenement(pk) FROM unnest(%s::integer[]) AS pk",
+                       [list(topology_pks)])
+
+    @classmethod
+    def bulk_create(cls, topologies, batch_size=1000):
+        """
+        Insert many new topologies (instances of a ``Topology`` subclass) with a
+        few queries per batch. ``QuerySet.bulk_create()`` does not support
+        multi-table inheritance: rows of topologies are inserted first, then rows
+        of the subclass table. Geometries are saved as is.
+        """
+        from .models import Topology
+
+        if not topologies:
+            return topologies
+        model = type(topologies[0])
+        shortmodelname = model._meta.object_name.lower().replace('edge', '')
+        static_offset = settings.TOPOLOGY_STATIC_OFFSETS.get(shortmodelname)
+        fields = [f for f in Topology._meta.concrete_fields if not f.primary_key]
+        parents = []
+        for topology in topologies:
+            if static_offset is not None:
+                topology.offset = static_offset
+            parent = Topology(**dict((f.attname, getattr(topology, f.attname)) for f in fields))
+            # Set by Topology.__init__()
+            parent.kind = topology.kind
+            parents.append(parent)
+        Topology.objects.bulk_create(parents, batch_size=batch_size)
+
+        link = model._meta.get_ancestor_link(Topology)
+        for topology, parent in zip(topologies, parents):
+            setattr(topology, link.attname, parent.pk)
+        # Same as Model.save_base() with parents already saved
+        fields = model._meta.local_concrete_fields
+        for i in range(0, len(topologies), batch_size):
+            model._base_manager._insert(topologies[i:i + batch_size], fields=fields)
+        return topologies
+
+    @classmethod
+    def bulk_create_points(cls, topologies, points, batch_size=1000):
+        """
+        Insert many new point topologies (see ``bulk_create()``) located at
+        ``points``. With dynamic segmentation, points are snapped to their
+        closest path in one spatial query, aggregations are inserted at once
+        and geometries computed afterwards.
+        """
+        from .models import PathAggregation
+
+        points = [point.transform(settings.SRID, clone=True) if point.srid != settings.SRID else point
+                  for point in points]
+        for topology, point in zip(topologies, points):
+            topology.geom = Point(point.x, point.y, srid=settings.SRID)
+        if not settings.TREKKING_TOPOLOGY_ENABLED:
+            return cls.bulk_create(topologies, batch_size=batch_size)
+
+        closests = PathHelper.closest_many(points)
+        for topology, point, closest in zip(topologies, points, closests):
+            if closest is None:
+                raise IndexError("No path found close to %s" % point.ewkt)
+            topology.offset = closest[2]
+        with topologies_geometry_mode('off'):
+            cls.bulk_create(topologies, batch_size=batch_size)
+            aggregations = [PathAggregation(topo_object_id=topology.pk, path_id=path, order=0,
+                                            start_position=position, end_position=position)
+                            for topology, (path, position, offset) in zip(topologies, closests)]
+            PathAggregation.objects.bulk_create(aggregations, batch_size=batch_size)
+        cls.update_geometry([topology.pk for topology in topologies])
+        return topologies
+
+    @classmethod
+    def update_deferred_geometries(cls, batch_size=100):
+        """
+        Compute geometry of topologies queued by triggers in 'worker' mode.
+        Returns the number of topologies updated.
+        """
+        with topologies_geometry_mode('immediate'):
+            cursor = connection.cursor()
+            cursor.execute("SELECT update_geometry_of_deferred_evenements(%s)", [batch_size])
+            return cursor.fetchone()[0]
+
     @classmethod
     def _topologypoint(cls, lng, lat, kind=None, snap=None):
         """
@@ -207,61 +333,131 @@ class TopologyHelper(object):
 
     @classmethod
     def overlapping(cls, klass, queryset):
-        from .models import Path, Topology, PathAggregation
+        """
+        Topologies of ``klass`` sharing paths with a topology or a queryset of
+        topologies, in order of progression along them, as a single query.
+        """
+        from .models import Topology
+
+        if not isinstance(queryset, QuerySet):
+            queryset = Topology.objects.filter(pk=queryset.pk)
+        topologies = queryset.order_by().values('pk')
+
+        return klass.objects.existing()\
+                            .filter(pk__in=OverlappingTopologies(topologies))\
+                            .annotate(overlapping_position=OverlappingPosition(topologies))\
+                            .order_by('overlapping_position', 'pk')
+
+
+class OverlappingTopologies(Expression):
+    """
+    Subquery of topologies having aggregations which overlap aggregations of
+    ``topologies`` (a queryset of primary keys), to be used with ``__in``.
+    """
+    template = """
+    SELECT a.evenement FROM e_r_evenement_troncon a
+    JOIN e_r_evenement_troncon pa ON pa.troncon = a.troncon
+         AND least(a.pk_debut, a.pk_fin) <= greatest(pa.pk_debut, pa.pk_fin)
+         AND greatest(a.pk_debut, a.pk_fin) >= least(pa.pk_debut, pa.pk_fin)
+    WHERE pa.evenement IN %(topologies)s
+    """
+
+    def __init__(self, topologies, output_field=None):
+        super(OverlappingTopologies, self).__init__(output_field or IntegerField())
+        self.topologies = Subquery(topologies)
+
+    def get_source_expressions(self):
+        return [self.topologies]
+
+    def set_source_expressions(self, exprs):
+        self.topologies, = exprs
+
+    def as_sql(self, compiler, connection):
+        topologies_sql, params = compiler.compile(self.topologies)
+        return self.template % {'topologies': topologies_sql}, params
+
+
+class OverlappingPosition(OverlappingTopologies):
+    """
+    Position of each topology along overlapped ``topologies``: order of the
+    first shared path, plus position on it in direction of progression.
+    """
+    template = """
+    (SELECT min(pa.ordre + CASE WHEN pa.pk_debut > pa.pk_fin THEN 1 - a.pk_debut ELSE a.pk_debut END)
+     FROM e_r_evenement_troncon a
+     JOIN e_r_evenement_troncon pa ON pa.troncon = a.troncon
+          AND least(a.pk_debut, a.pk_fin) <= greatest(pa.pk_debut, pa.pk_fin)
+          AND greatest(a.pk_debut, a.pk_fin) >= least(pa.pk_debut, pa.pk_fin)
+     WHERE pa.evenement IN %(topologies)s AND a.evenement = %(topology)s)
+    """
+
+    def __init__(self, topologies, topology='pk'):
+        super(OverlappingPosition, self).__init__(topologies, FloatField())
+        self.topology = F(topology)
+
+    def get_source_expressions(self):
+        return [self.topologies, self.topology]
+
+    def set_source_expressions(self, exprs):
+        self.topologies, self.topology = exprs
+
+    def as_sql(self, compiler, connection):
+        topologies_sql, topologies_params = compiler.compile(self.topologies)
+        topology_sql, topology_params = compiler.compile(self.topology)
+        sql = self.template % {'topologies': topologies_sql, 'topology': topology_sql}
+        return sql, topologies_params + topology_params
 
-        all_objects = klass.objects.existing()
-        is_generic = klass.KIND == Topology.KIND
-        single_input = isinstance(queryset, QuerySet)
 
-        if single_input:
-            topology_pks = [str(pk) for pk in queryset.values_list('pk', flat=True)]
-        else:
-            topology_pks = [str(queryset.pk)]
-
-        if len(topology_pks) == 0:
-            return all_objects.filter(pk__in=[])
+class PathHelper(object):
+    # Number of nearest paths (using spatial index) among which the closest is searched
+    CLOSEST_CANDIDATES = 10
 
+    @classmethod
+    def closest_many(cls, points, exclude=None, max_distance=None):
+        """
+        Returns (path pk, position, offset) of the closest path of each point,
+        or None if no path was found (within ``max_distance`` meters).
+        """
+        from .models import Path
+
+        if not points:
+            return []
+        ewkts = [point.transform(settings.SRID, clone=True).ewkt if point.srid != settings.SRID else point.ewkt
+                 for point in points]
+        conditions = ['t.visible', 'NOT t.brouillon']
+        params = [ewkts, len(ewkts)]
+        if exclude is not None and exclude.pk is not None:
+            conditions.append('t.id != %s')
+            params.append(exclude.pk)
+        if max_distance is not None:
+            conditions.append('ST_DWithin(t.geom, pts.geom, %s)')
+            params.append(max_distance)
+        params.append(cls.CLOSEST_CANDIDATES)
         sql = """
-        WITH topologies AS (SELECT id FROM %(topology_table)s WHERE id IN (%(topology_list)s)),
-        -- Concerned aggregations
-             aggregations AS (SELECT * FROM %(aggregations_table)s a, topologies t
-                              WHERE a.evenement = t.id),
-        -- Concerned paths along with (start, end)
-             paths_aggr AS (SELECT a.pk_debut AS start, a.pk_fin AS end, p.id, a.ordre AS order
-                            FROM %(paths_table)s p, aggregations a
-                            WHERE a.troncon = p.id
-                            ORDER BY a.ordre)
-        -- Retrieve primary keys
-        SELECT t.id
-        FROM %(topology_table)s t, %(aggregations_table)s a, paths_aggr pa
-        WHERE a.troncon = pa.id AND a.evenement = t.id
-          AND least(a.pk_debut, a.pk_fin) <= greatest(pa.start, pa.end)
-          AND greatest(a.pk_debut, a.pk_fin) >= least(pa.start, pa.end)
-          AND %(extra_condition)s
-        ORDER BY (pa.order + CASE WHEN pa.start > pa.end THEN (1 - a.pk_debut) ELSE a.pk_debut END);
-        """ % {
-            'topology_table': Topology._meta.db_table,
-            'aggregations_table': PathAggregation._meta.db_table,
-            'paths_table': Path._meta.db_table,
-            'topology_list': ','.join(topology_pks),
-            'extra_condition': 'true' if is_generic else "kind = '%s'" % klass.KIND
-        }
-
+        SELECT pts.idx, c.id, i.position, i.distance
+        FROM (SELECT idx, ST_GeomFromEWKT((%%s::text[])[idx]) AS geom
+              FROM generate_series(1, %%s) AS idx) AS pts
+        -- Nearest candidates using spatial index (KNN), then exact distance
+        CROSS JOIN LATERAL (
+            SELECT k.id FROM (
+                SELECT t.id, t.geom
+                FROM %(table)s t
+                WHERE %(conditions)s
+                ORDER BY t.geom <-> pts.geom
+                LIMIT %%s
+            ) AS k
+            ORDER BY ST_Distance(k.geom, pts.geom)
+            LIMIT 1
+        ) AS c
+        CROSS JOIN LATERAL ft_troncon_interpolate(c.id, pts.geom) AS i(position FLOAT, distance FLOAT)
+        """ % {'table': Path._meta.db_table, 'conditions': ' AND '.join(conditions)}
         cursor = connection.cursor()
-        cursor.execute(sql)
-        result = cursor.fetchall()
-        pk_list = uniquify([row[0] for row in result])
-
-        # Return a QuerySet and preserve pk list order
-        # http://stackoverflow.com/a/1310188/141895
-        ordering = 'CASE %s END' % ' '.join(['WHEN %s.id=%s THEN %s' % (Topology._meta.db_table, id_, i)
-                                             for i, id_ in enumerate(pk_list)])
-        queryset = all_objects.filter(pk__in=pk_list).extra(
-            select={'ordering': ordering}, order_by=('ordering',))
-        return queryset
+        cursor.execute(sql, params)
+        closests = [None] * len(points)
+        for idx, pk, position, distance in cursor.fetchall():
+            closests[idx - 1] = (pk, position, distance)
+        return closests
 
-
-class PathHelper(object):
     @classmethod
     def snap(cls, path, point):
         if not path.pk:
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from geotrek.core.helpers import TopologyHelper
+
+
+class Command(BaseCommand):
+    help = "Compute geometry of topologies queued by triggers (TOPOLOGY_GEOMETRY_UPDATE = 'worker')\n"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', '-b', action='store', dest='batch_size', default=100, type=int,
+                            help="Number of topologies updated by transaction")
+
+    def handle(self, *args, **options):
+        verbosity = options.get('verbosity')
+        batch_size = options.get('batch_size')
+
+        total = 0
+        while True:
+            count = TopologyHelper.update_deferred_geometries(batch_size=batch_size)
+            if not count:
+                break
+            total += count
+            if verbosity >= 2:
+                self.stdout.write(u"{0} topologies updated".format(total))
+        if verbosity > 0:
+            self.stdout.write(self.style.NOTICE(u"{0} topologies updated".format(total)))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2026-10-18 10:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_auto_20190925_1243'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredTopology',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topology', models.IntegerField(db_column=b'evenement', db_index=True, verbose_name='Topology')),
+            ],
+            options={
+                'db_table': 'e_t_evenement_differe',
+                'verbose_name': 'Deferred topology',
+                'verbose_name_plural': 'Deferred topologies',
+            },
+        ),
+    ]
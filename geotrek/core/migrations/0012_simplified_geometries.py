@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2026-10-18 14:00
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+import django.contrib.gis.db.models.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_deferredtopology'),
+    ]
+
+    operations = [
+        # Views selecting all topology columns are re-created after migration
+        migrations.RunSQL(
+            "DROP VIEW IF EXISTS zonage.f_v_commune, zonage.f_v_secteur, zonage.f_v_zonage;"
+            "DROP VIEW IF EXISTS foncier.f_v_nature, foncier.f_v_foncier, foncier.f_v_competence,"
+            " foncier.f_v_gestion_signaletique, foncier.f_v_gestion_travaux;",
+            migrations.RunSQL.noop
+        ),
+        migrations.AddField(
+            model_name='path',
+            name='geom_simplified_10',
+            field=django.contrib.gis.db.models.fields.GeometryField(db_column=b'geom_simplifie_10', default=None, editable=False, null=True, spatial_index=False, srid=settings.SRID),
+        ),
+        migrations.AddField(
+            model_name='path',
+            name='geom_simplified_100',
+            field=django.contrib.gis.db.models.fields.GeometryField(db_column=b'geom_simplifie_100', default=None, editable=False, null=True, spatial_index=False, srid=settings.SRID),
+        ),
+        migrations.AddField(
+            model_name='topology',
+            name='geom_simplified_10',
+            field=django.contrib.gis.db.models.fields.GeometryField(db_column=b'geom_simplifie_10', default=None, editable=False, null=True, spatial_index=False, srid=settings.SRID),
+        ),
+        migrations.AddField(
+            model_name='topology',
+            name='geom_simplified_100',
+            field=django.contrib.gis.db.models.fields.GeometryField(db_column=b'geom_simplifie_100', default=None, editable=False, null=True, spatial_index=False, srid=settings.SRID),
+        ),
+        # Fill existing geometries, without touching update dates
+        migrations.RunSQL(
+            "ALTER TABLE l_t_troncon DISABLE TRIGGER USER;"
+            "UPDATE l_t_troncon SET geom_simplifie_10 = ST_SimplifyPreserveTopology(geom, 10),"
+            " geom_simplifie_100 = ST_SimplifyPreserveTopology(geom, 100);"
+            "ALTER TABLE l_t_troncon ENABLE TRIGGER USER;"
+            "ALTER TABLE e_t_evenement DISABLE TRIGGER USER;"
+            "UPDATE e_t_evenement SET geom_simplifie_10 = ST_SimplifyPreserveTopology(geom, 10),"
+            " geom_simplifie_100 = ST_SimplifyPreserveTopology(geom, 100);"
+            "ALTER TABLE e_t_evenement ENABLE TRIGGER USER;",
+            migrations.RunSQL.noop
+        ),
+    ]
@@ -6,7 +6,12 @@ import simplekml
 from django.contrib.gis.db import models
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
-from django.contrib.gis.geos import fromstr, LineString
+from django.contrib.gis.db.models import Extent
+from django.contrib.gis.geos import fromstr, LineString, Polygon
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 
 from mapentity.models import MapEntityMixin
 from mapentity.serializers import plain_text
@@ -16,16 +21,42 @@ from geotrek.common.mixins import (TimeStampedModelMixin, NoDeleteMixin,
                                    AddPropertyMixin)
 from geotrek.common.utils import classproperty
 from geotrek.common.utils.postgresql import debug_pg_notices
+from geotrek.common.utils.spatial_cache import SpatialCacheGrid
+from geotrek.common.vector_tiles import invalidate_vector_tiles
 from geotrek.altimetry.models import AltimetryMixin
 
 from .helpers import PathHelper, TopologyHelper
+from . import graph as graph_lib
 from django.db import connections, DEFAULT_DB_ALIAS
 
 from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance
 
 logger = logging.getLogger(__name__)
 
 
+class SimplifiedGeometryMixin(models.Model):
+    """
+    Geometry simplified (topology-preserving) for the most common tolerances,
+    computed at DB-level (see ``ft_geom_simplifie_iu()``).
+    """
+    SIMPLIFIED_TOLERANCES = (10, 100)  # in SRID units
+
+    geom_simplified_10 = models.GeometryField(srid=settings.SRID, null=True, default=None, editable=False,
+                                              spatial_index=False, db_column='geom_simplifie_10')
+    geom_simplified_100 = models.GeometryField(srid=settings.SRID, null=True, default=None, editable=False,
+                                               spatial_index=False, db_column='geom_simplifie_100')
+
+    class Meta:
+        abstract = True
+
+    def reload(self, fromdb):
+        """Reload fields computed at DB-level (triggers)
+        """
+        self.geom_simplified_10 = fromdb.geom_simplified_10
+        self.geom_simplified_100 = fromdb.geom_simplified_100
+
+
 class PathManager(models.GeoManager):
     # Use this manager when walking through FK/M2M relationships
     use_for_related_fields = True
@@ -48,7 +79,7 @@ class PathInvisibleManager(models.GeoManager):
 # is explicitly disbaled here (see manual index creation in custom SQL files).
 
 
-class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
+class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin, SimplifiedGeometryMixin,
            TimeStampedModelMixin, StructureRelated):
     geom = models.LineStringField(srid=settings.SRID, spatial_index=False)
     geom_cadastre = models.LineStringField(null=True, srid=settings.SRID, spatial_index=False,
@@ -129,10 +160,10 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
                                                           ]
 
     @classmethod
-    def closest(cls, point, exclude=None):
+    def closest(cls, point, exclude=None, max_distance=None):
         """
         Returns the closest path of the point.
-        Will fail if no path in database.
+        Will fail if no path in database (or within ``max_distance`` meters).
         """
         # TODO: move to custom manager
         if point.srid != settings.SRID:
@@ -140,7 +171,25 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
         qs = cls.objects.exclude(draft=True)
         if exclude:
             qs = qs.exclude(pk=exclude.pk)
-        return qs.exclude(visible=False).distance(point).order_by('distance')[0]
+        if max_distance is not None:
+            qs = qs.filter(geom__dwithin=(point, Distance(m=max_distance)))
+        # Nearest candidates are found using spatial index (KNN), then sorted by exact distance
+        knn = '%s.geom <-> ST_GeomFromEWKT(%%s)' % cls._meta.db_table
+        qs = qs.exclude(visible=False).extra(select={'knn': knn}, select_params=[point.ewkt], order_by=['knn'])
+        candidates = list(qs[:PathHelper.CLOSEST_CANDIDATES])
+        if not candidates:
+            raise IndexError("No path found close to %s" % point.ewkt)
+        return min(candidates, key=lambda path: path.geom.distance(point))
+
+    @classmethod
+    def closest_many(cls, points, exclude=None, max_distance=None):
+        """
+        Returns the closest path of each point, in one query.
+        ``None`` is returned for points without path (within ``max_distance`` meters).
+        """
+        closests = PathHelper.closest_many(points, exclude=exclude, max_distance=max_distance)
+        paths = cls.objects.in_bulk([closest[0] for closest in closests if closest])
+        return [paths.get(closest[0]) if closest else None for closest in closests]
 
     def is_overlap(self):
         return not PathHelper.disjoint(self.geom, self.pk)
@@ -174,6 +223,7 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
             fromdb = self.__class__.objects.get(pk=self.pk)
             self.geom = fromdb.geom
             AltimetryMixin.reload(self, fromdb)
+            SimplifiedGeometryMixin.reload(self, fromdb)
             TimeStampedModelMixin.reload(self, fromdb)
         return self
 
@@ -196,22 +246,26 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
         r = super(Path, self).delete(*args, **kwargs)
         if not Path.objects.exists():
             return r
-        for topology in topologies:
-            if isinstance(topology.geom, Point):
-                closest = self.closest(topology.geom, self)
-                position, offset = closest.interpolate(topology.geom)
-                new_topology = Topology.objects.create()
-                aggrobj = PathAggregation(topo_object=new_topology,
-                                          start_position=position,
-                                          end_position=position,
-                                          path=closest)
-                aggrobj.save()
-                point = Point(topology.geom.x, topology.geom.y, srid=settings.SRID)
-                new_topology.geom = point
-                new_topology.offset = offset
-                new_topology.position = position
-                new_topology.save()
-                topology.mutate(new_topology)
+        topologies = [topology for topology in topologies if isinstance(topology.geom, Point)]
+        # Find closest paths of all orphan points at once
+        closests = PathHelper.closest_many([topology.geom for topology in topologies], exclude=self)
+        paths = Path.objects.in_bulk([closest[0] for closest in closests if closest])
+        for topology, closest in zip(topologies, closests):
+            if closest is None:
+                continue
+            closest, position, offset = closest
+            new_topology = Topology.objects.create()
+            aggrobj = PathAggregation(topo_object=new_topology,
+                                      start_position=position,
+                                      end_position=position,
+                                      path=paths[closest])
+            aggrobj.save()
+            point = Point(topology.geom.x, topology.geom.y, srid=settings.SRID)
+            new_topology.geom = point
+            new_topology.offset = offset
+            new_topology.position = position
+            new_topology.save()
+            topology.mutate(new_topology)
         return r
 
     @property
@@ -309,6 +363,7 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
             if result:
                 # reload object after unification
                 self.reload()
+                graph_lib.path_graph_changed(updated=[self.pk], removed=[path_to_merge.pk])
 
             return result
 
@@ -317,7 +372,54 @@ class Path(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
         return self.geom.transform(settings.API_SRID, clone=True).extent if self.geom else None
 
 
-class Topology(AddPropertyMixin, AltimetryMixin, TimeStampedModelMixin, NoDeleteMixin):
+path_layer_grid = SpatialCacheGrid('path_layer')
+
+
+def invalidate_path_caches(*geometries):
+    """ Invalidate cached layers around modified paths.
+    Paths touching them are included, since they can have been split or
+    merged at DB-level.
+    """
+    geometries = [geom for geom in geometries if geom is not None and not geom.empty]
+    if not geometries:
+        return
+    touching = Q()
+    for geom in geometries:
+        touching |= Q(geom__intersects=geom)
+    extent = Path.include_invisible.filter(touching).aggregate(extent=Extent('geom'))['extent']
+    if extent:
+        geometries.append(Polygon.from_bbox(extent))
+        geometries[-1].srid = settings.SRID
+    path_layer_grid.invalidate(*geometries)
+    # Topologies follow their paths (at DB-level)
+    invalidate_vector_tiles(['path', 'trek', 'poi'], *geometries)
+
+
+@receiver(pre_save, sender=Path, dispatch_uid="path_caches_pre_save")
+def on_path_pre_save(sender, instance, **kwargs):
+    instance._previous_geom = None
+    if instance.pk:
+        instance._previous_geom = Path.include_invisible.filter(pk=instance.pk).values_list('geom', flat=True).first()
+
+
+@receiver(post_save, sender=Path, dispatch_uid="path_graph_on_save")
+def on_path_saved(sender, instance, **kwargs):
+    """ Apply path changes to the cached network graph and layers.
+    """
+    geometries = (getattr(instance, '_previous_geom', None), instance.geom)
+    graph_lib.path_graph_changed(updated=[instance.pk])
+    transaction.on_commit(lambda: invalidate_path_caches(*geometries))
+
+
+@receiver(post_delete, sender=Path, dispatch_uid="path_graph_on_delete")
+def on_path_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    geom = instance.geom
+    graph_lib.path_graph_changed(removed=[pk])
+    transaction.on_commit(lambda: invalidate_path_caches(geom))
+
+
+class Topology(AddPropertyMixin, AltimetryMixin, SimplifiedGeometryMixin, TimeStampedModelMixin, NoDeleteMixin):
     paths = models.ManyToManyField(Path, db_column='troncons', through='PathAggregation', verbose_name=_(u"Path"))
     offset = models.FloatField(default=0.0, db_column='decallage', verbose_name=_(u"Offset"))  # in SRID units
     kind = models.CharField(editable=False, verbose_name=_(u"Kind"), max_length=32)
@@ -436,6 +538,7 @@ class Topology(AddPropertyMixin, AltimetryMixin, TimeStampedModelMixin, NoDelete
             # any unsaved value
             self.offset = fromdb.offset
             AltimetryMixin.reload(self, fromdb)
+            SimplifiedGeometryMixin.reload(self, fromdb)
             TimeStampedModelMixin.reload(self, fromdb)
             NoDeleteMixin.reload(self, fromdb)
 
@@ -538,6 +641,22 @@ class PathAggregation(models.Model):
         ordering = ['order', ]
 
 
+class DeferredTopology(models.Model):
+    """
+    Topologies whose geometry computation is pending
+    (see ``TOPOLOGY_GEOMETRY_UPDATE`` setting). Filled by triggers.
+    """
+    topology = models.IntegerField(db_column='evenement', db_index=True, verbose_name=_(u"Topology"))
+
+    class Meta:
+        db_table = 'e_t_evenement_differe'
+        verbose_name = _(u"Deferred topology")
+        verbose_name_plural = _(u"Deferred topologies")
+
+    def __unicode__(self):
+        return u"%s (%s)" % (_(u"Deferred topology"), self.topology)
+
+
 class PathSource(StructureOrNoneRelated):
 
     source = models.CharField(verbose_name=_(u"Source"), max_length=50)
@@ -131,3 +131,16 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+
+
+-------------------------------------------------------------------------------
+-- Simplified geometries (see SimplifiedGeometryMixin.SIMPLIFIED_TOLERANCES)
+-------------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION geotrek.ft_geom_simplifie_iu() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    NEW.geom_simplifie_10 := ST_SimplifyPreserveTopology(NEW.geom, 10);
+    NEW.geom_simplifie_100 := ST_SimplifyPreserveTopology(NEW.geom, 100);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
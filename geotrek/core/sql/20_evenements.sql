@@ -33,6 +33,15 @@ CREATE TRIGGER e_t_evenement_date_update_tgr
     BEFORE INSERT OR UPDATE ON e_t_evenement
     FOR EACH ROW EXECUTE PROCEDURE ft_date_update();
 
+-------------------------------------------------------------------------------
+-- Keep simplified geometries up-to-date
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS e_t_evenement_geom_simplifie_iu_tgr ON e_t_evenement;
+CREATE TRIGGER e_t_evenement_geom_simplifie_iu_tgr
+    BEFORE INSERT OR UPDATE OF geom ON e_t_evenement
+    FOR EACH ROW EXECUTE PROCEDURE ft_geom_simplifie_iu();
+
 ---------------------------------------------------------------------
 -- Make sure cache key (base on lastest updated) is refresh on DELETE
 ---------------------------------------------------------------------
@@ -179,7 +188,7 @@ BEGIN
     -- Since the evenement to be modified is available in NEW, we could improve
     -- performance with some refactoring.
 
-    PERFORM update_geometry_of_evenement(NEW.id);
+    PERFORM update_or_defer_geometry_of_evenement(NEW.id);
 
     RETURN NULL;
 END;
@@ -45,6 +45,36 @@ $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS e_r_evenement_troncon_geometry_tgr ON e_r_evenement_troncon;
 
+CREATE OR REPLACE FUNCTION geotrek.ft_evenements_geometry_mode() RETURNS text AS $$
+BEGIN
+    -- How geometry of evenements is computed (see TOPOLOGY_GEOMETRY_UPDATE setting),
+    -- can be changed for the current transaction using SET LOCAL geotrek.evenements_geometry = ...
+    --   'immediate': computed as soon as paths or aggregations change
+    --   'transaction': computed once per evenement when transaction is committed
+    --   'worker': queued in e_t_evenement_differe, see update_topologies_geometry command
+    --   'off': not computed (bulk operations)
+    RETURN current_setting('geotrek.evenements_geometry');
+EXCEPTION WHEN undefined_object THEN
+    RETURN 'immediate';
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION geotrek.update_or_defer_geometry_of_evenement(eid integer) RETURNS void AS $$
+DECLARE
+    mode text;
+BEGIN
+    mode := ft_evenements_geometry_mode();
+    IF mode = 'off' THEN
+        RETURN;
+    ELSIF mode IN ('transaction', 'worker') THEN
+        INSERT INTO e_t_evenement_differe (evenement)
+        SELECT eid WHERE NOT EXISTS (SELECT 1 FROM e_t_evenement_differe WHERE evenement = eid);
+    ELSE
+        PERFORM update_geometry_of_evenement(eid);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE OR REPLACE FUNCTION geotrek.ft_evenements_troncons_geometry() RETURNS trigger SECURITY DEFINER AS $$
 DECLARE
     eid integer;
@@ -62,7 +92,7 @@ BEGIN
     END IF;
 
     FOREACH eid IN ARRAY eids LOOP
-        PERFORM update_geometry_of_evenement(eid);
+        PERFORM update_or_defer_geometry_of_evenement(eid);
     END LOOP;
 
     RETURN NULL;
@@ -74,6 +104,56 @@ AFTER INSERT OR UPDATE OR DELETE ON e_r_evenement_troncon
 FOR EACH ROW EXECUTE PROCEDURE ft_evenements_troncons_geometry();
 
 
+-------------------------------------------------------------------------------
+-- Compute deferred geometries of Evenements
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS e_t_evenement_differe_geometry_tgr ON e_t_evenement_differe;
+
+CREATE OR REPLACE FUNCTION geotrek.ft_evenements_differes_geometry() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    -- Evenements queued in 'worker' mode are left to update_topologies_geometry command
+    IF ft_evenements_geometry_mode() != 'transaction' THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM e_t_evenement_differe WHERE evenement = NEW.evenement;
+    -- Evenement may have already been processed (queued several times)
+    IF FOUND THEN
+        PERFORM update_geometry_of_evenement(NEW.evenement);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fired once the transaction is about to be committed
+CREATE CONSTRAINT TRIGGER e_t_evenement_differe_geometry_tgr
+AFTER INSERT ON e_t_evenement_differe
+DEFERRABLE INITIALLY DEFERRED
+FOR EACH ROW EXECUTE PROCEDURE ft_evenements_differes_geometry();
+
+
+CREATE OR REPLACE FUNCTION geotrek.update_geometry_of_deferred_evenements(batch_size integer) RETURNS integer AS $$
+DECLARE
+    eid integer;
+    t_count integer := 0;
+BEGIN
+    FOR eid IN WITH batch AS (
+                   DELETE FROM e_t_evenement_differe
+                   WHERE evenement IN (SELECT evenement FROM e_t_evenement_differe ORDER BY id LIMIT batch_size)
+                   RETURNING evenement
+               )
+               SELECT DISTINCT evenement FROM batch
+    LOOP
+        PERFORM update_geometry_of_evenement(eid);
+        t_count := t_count + 1;
+    END LOOP;
+    RETURN t_count;
+END;
+$$ LANGUAGE plpgsql;
+
+
 -------------------------------------------------------------------------------
 -- Emulate junction points
 -------------------------------------------------------------------------------
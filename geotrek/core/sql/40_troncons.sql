@@ -51,6 +51,16 @@ CREATE TRIGGER l_t_troncon_date_update_tgr
     FOR EACH ROW EXECUTE PROCEDURE ft_date_update();
 
 
+-------------------------------------------------------------------------------
+-- Keep simplified geometries up-to-date
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS l_t_troncon_20_geom_simplifie_iu_tgr ON l_t_troncon;
+CREATE TRIGGER l_t_troncon_20_geom_simplifie_iu_tgr
+    BEFORE INSERT OR UPDATE OF geom ON l_t_troncon
+    FOR EACH ROW EXECUTE PROCEDURE ft_geom_simplifie_iu();
+
+
 -------------------------------------------------------------------------------
 -- Check overlapping paths
 -------------------------------------------------------------------------------
@@ -104,7 +114,7 @@ BEGIN
                GROUP BY e.id, e.decallage
                HAVING BOOL_OR(et.pk_debut != et.pk_fin) OR e.decallage = 0.0
     LOOP
-        PERFORM update_geometry_of_evenement(eid);
+        PERFORM update_or_defer_geometry_of_evenement(eid);
     END LOOP;
 
     -- Special case of point geometries with offset != 0
@@ -1,21 +1,25 @@
 import json
+from datetime import timedelta
 from unittest import skipIf
 
 from django.test import TestCase
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.contrib.gis.geos import LineString
+from django.contrib.gis.geos import LineString, Point
+from django.core.cache import caches
 from django.core.urlresolvers import reverse
+from django.db import connection
 
 from geotrek.core.factories import PathFactory
-from geotrek.core.graph import graph_edges_nodes_of_qs
-from geotrek.core.models import Path
+from geotrek.core.graph import graph_edges_nodes_of_qs, get_path_graph, PathGraph, PathGraphChanges, GRAPH_CACHE_KEY
+from geotrek.core.models import Path, Topology
 
 
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
 class SimpleGraph(TestCase):
 
     def setUp(self):
+        caches['fat'].clear()
         user = User.objects.create_user('homer', 'h@s.com', 'dooh')
         success = self.client.login(username=user.username, password='dooh')
         self.assertTrue(success)
@@ -80,3 +84,189 @@ class SimpleGraph(TestCase):
         PathFactory(geom=LineString((0, 0), (1, 1)))
         response = self.client.get(self.url)
         self.assertNotEqual(response['Cache-Control'], None)
+
+    def test_json_graph_not_modified(self):
+        path = PathFactory(geom=LineString((0, 0), (1, 1)))
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        path.name = "Renamed"
+        path.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        PathFactory(geom=LineString((1, 1), (2, 2)))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathGraphTest(TestCase):
+
+    def test_load_same_as_queryset_graph(self):
+        PathFactory(geom=LineString((1, 1), (0, 20), (2, 2)))
+        PathFactory(geom=LineString((2, 2), (0, 30), (3, 3)))
+        PathFactory(geom=LineString((4, 4), (0, 40), (5, 5)))
+        graph = PathGraph.load()
+        expected = graph_edges_nodes_of_qs(Path.objects.order_by('id'))
+        self.assertDictEqual(graph.serialize(), expected)
+
+    def test_draft_paths_are_excluded(self):
+        path = PathFactory(geom=LineString((0, 0), (1, 1)))
+        draft = PathFactory(geom=LineString((1, 1), (2, 2)), draft=True)
+        graph = PathGraph.load()
+        self.assertIn(path.pk, graph)
+        self.assertNotIn(draft.pk, graph)
+
+    def test_refresh_applies_modified_paths(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        graph = PathGraph.load()
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        self.assertTrue(graph.refresh())
+        self.assertEqual(len(graph), 2)
+        start_1, end_1, length_1 = graph.edge(path_1.pk)
+        start_2, end_2, length_2 = graph.edge(path_2.pk)
+        self.assertEqual(end_1, start_2)
+        self.assertEqual(graph.node_coords(end_2), (2, 2))
+        self.assertFalse(graph.refresh())
+
+    def test_refresh_applies_paths_stamped_with_latest_date(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        graph = PathGraph.load()
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        path_3 = PathFactory(geom=LineString((2, 2), (3, 3)))
+        # Refreshed once path_2 was committed, in the same second as path_3
+        graph.latest = Path.objects.get(pk=path_2.pk).date_update
+        self.assertTrue(graph.refresh())
+        self.assertIn(path_2.pk, graph)
+        self.assertIn(path_3.pk, graph)
+
+    def test_apply_changes_fetches_paths_whatever_their_date(self):
+        PathFactory(geom=LineString((0, 0), (1, 1)))
+        graph = PathGraph.load()
+        path = PathFactory(geom=LineString((1, 1), (2, 2)))
+        # Committed long after being stamped
+        graph.latest = Path.objects.get(pk=path.pk).date_update + timedelta(hours=1)
+        self.assertTrue(graph.apply_changes(updated=[path.pk]))
+        self.assertIn(path.pk, graph)
+
+    def test_changes_are_applied_once_per_transaction(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        pk = path_2.pk
+        path_2.delete()
+        callbacks = [func for sids, func in connection.run_on_commit if isinstance(func, PathGraphChanges)]
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(callbacks[0].updated, {path_1.pk, pk})
+        self.assertEqual(callbacks[0].removed, {pk})
+
+    def test_version_changes_with_network_only(self):
+        path = PathFactory(geom=LineString((0, 0), (1, 1)))
+        graph = PathGraph.load()
+        version = graph.version
+        path.name = "Renamed"
+        path.save()
+        graph.refresh()
+        self.assertEqual(graph.version, version)
+        path.geom = LineString((0, 0), (2, 2))
+        path.save()
+        graph.refresh()
+        self.assertNotEqual(graph.version, version)
+
+    def test_refresh_removes_deleted_paths(self):
+        path_1 = PathFactory(geom=LineString((0, 0), (1, 1)))
+        path_2 = PathFactory(geom=LineString((1, 1), (2, 2)))
+        graph = PathGraph.load()
+        pk = path_2.pk
+        path_2.delete()
+        graph.apply_changes(removed=[pk])
+        self.assertNotIn(pk, graph)
+        start, end, length = graph.edge(path_1.pk)
+        self.assertEqual([n for n, p, l in graph.neighbours(end)], [start])
+
+    def test_nodes_are_reused_after_removal(self):
+        graph = PathGraph()
+        graph.add_path(1, (0, 0), (1, 1), 1.4)
+        graph.add_path(2, (1, 1), (2, 2), 1.4)
+        graph.remove_path(2)
+        self.assertEqual(graph.serialize()['nodes'], {1: {2: 1}, 2: {1: 1}})
+        graph.add_path(3, (1, 1), (3, 3), 2.8)
+        self.assertEqual(graph.edge(3), (2, 3, 2.8))
+
+
+class PathGraphShortestPathTest(TestCase):
+
+    def setUp(self):
+        #  1 --(1)-- 2 --(2)-- 3
+        #            |         |
+        #       (3) long      (4)
+        #            |         |
+        #            4 --(5)-- 5
+        self.graph = PathGraph()
+        self.graph.add_path(1, (0, 0), (10, 0), 10)
+        self.graph.add_path(2, (10, 0), (20, 0), 10)
+        self.graph.add_path(3, (10, 0), (10, -10), 30)
+        self.graph.add_path(4, (20, -10), (20, 0), 10)
+        self.graph.add_path(5, (10, -10), (20, -10), 10)
+
+    def test_same_path(self):
+        self.assertEqual(self.graph.shortest_path((1, 0.2), (1, 0.8)), [(1, 0.2, 0.8)])
+
+    def test_neighbour_paths(self):
+        self.assertEqual(self.graph.shortest_path((1, 0.5), (2, 0.5)),
+                         [(1, 0.5, 1.0), (2, 0.0, 0.5)])
+
+    def test_reversed_paths(self):
+        self.assertEqual(self.graph.shortest_path((5, 0.5), (2, 0.5)),
+                         [(5, 0.5, 1.0), (4, 0.0, 1.0), (2, 1.0, 0.5)])
+
+    def test_snapped_on_node(self):
+        self.assertEqual(self.graph.shortest_path((1, 1.0), (3, 1.0)), [(3, 0.0, 1.0)])
+
+    def test_unreachable(self):
+        self.graph.add_path(6, (100, 100), (200, 200), 141)
+        self.assertIsNone(self.graph.shortest_path((1, 0.5), (6, 0.5)))
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class RouteViewTest(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('homer', 'h@s.com', 'dooh')
+        success = self.client.login(username=user.username, password='dooh')
+        self.assertTrue(success)
+        self.url = reverse('core:path_json_route')
+
+    def test_missing_points(self):
+        response = self.client.get(self.url, {'start': '3,46.5'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_route_is_a_valid_topology(self):
+        path_1 = PathFactory(geom=LineString((700000, 6600000), (700100, 6600000)))
+        path_2 = PathFactory(geom=LineString((700100, 6600000), (700200, 6600000)))
+        start = Point(700050, 6600000, srid=settings.SRID).transform(settings.API_SRID, clone=True)
+        end = Point(700150, 6600000, srid=settings.SRID).transform(settings.API_SRID, clone=True)
+        response = self.client.get(self.url, {'start': '%s,%s' % (start.x, start.y),
+                                              'end': '%s,%s' % (end.x, end.y)})
+        self.assertEqual(response.status_code, 200)
+        serialized = json.loads(response.content)
+        self.assertEqual(serialized[0]['paths'], [path_1.pk, path_2.pk])
+        topology = Topology.deserialize(serialized)
+        self.assertAlmostEqual(topology.length, 100, places=1)
+
+    def test_route_on_path_unknown_from_cached_graph(self):
+        caches['fat'].clear()
+        path_1 = PathFactory(geom=LineString((700000, 6600000), (700100, 6600000)))
+        path_2 = PathFactory(geom=LineString((700100, 6600000), (700200, 6600000)))
+        # Graph refreshed before path_2 was committed
+        graph = get_path_graph()
+        graph.remove_path(path_2.pk)
+        graph.latest = Path.objects.get(pk=path_2.pk).date_update + timedelta(hours=1)
+        caches['fat'].set(GRAPH_CACHE_KEY, graph, None)
+        start = Point(700050, 6600000, srid=settings.SRID).transform(settings.API_SRID, clone=True)
+        end = Point(700150, 6600000, srid=settings.SRID).transform(settings.API_SRID, clone=True)
+        response = self.client.get(self.url, {'start': '%s,%s' % (start.x, start.y),
+                                              'end': '%s,%s' % (end.x, end.y)})
+        self.assertEqual(response.status_code, 200)
+        serialized = json.loads(response.content)
+        self.assertEqual(serialized[0]['paths'], [path_1.pk, path_2.pk])
@@ -4,13 +4,14 @@ from unittest import skipIf
 
 from django.test import TestCase
 from django.conf import settings
-from django.contrib.gis.geos import LineString
+from django.contrib.gis.geos import LineString, Point
 from django.db import IntegrityError
 
 from geotrek.common.utils import dbnow
 from geotrek.authent.factories import UserFactory
 from geotrek.authent.models import Structure
 from geotrek.core.factories import (PathFactory, StakeFactory, TrailFactory)
+from geotrek.core.helpers import PathHelper
 from geotrek.core.models import Path
 
 
@@ -92,6 +93,40 @@ class PathTest(TestCase):
         self.assertEqual(p1.extent, (3.0, 46.499999999999936, 3.0013039767202154, 46.50090044234927))
 
 
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathClosestTest(TestCase):
+    def setUp(self):
+        self.path_1 = PathFactory.create(geom=LineString((0, 0), (10, 0)))
+        self.path_2 = PathFactory.create(geom=LineString((0, 10), (10, 10)))
+        self.draft = PathFactory.create(geom=LineString((0, 5), (10, 5)), draft=True)
+
+    def test_closest(self):
+        self.assertEqual(Path.closest(Point(5, 4, srid=settings.SRID)), self.path_1)
+        self.assertEqual(Path.closest(Point(5, 6, srid=settings.SRID)), self.path_2)
+
+    def test_closest_exclude(self):
+        self.assertEqual(Path.closest(Point(5, 4, srid=settings.SRID), exclude=self.path_1), self.path_2)
+
+    def test_closest_max_distance(self):
+        point = Point(5, 4, srid=settings.SRID)
+        self.assertEqual(Path.closest(point, max_distance=5), self.path_1)
+        with self.assertRaises(IndexError):
+            Path.closest(point, max_distance=3)
+
+    def test_closest_many(self):
+        points = [Point(5, 4, srid=settings.SRID), Point(5, 6, srid=settings.SRID), Point(50, 50, srid=settings.SRID)]
+        self.assertEqual(Path.closest_many(points), [self.path_1, self.path_2, self.path_2])
+        self.assertEqual(Path.closest_many(points, max_distance=5), [self.path_1, self.path_2, None])
+
+    def test_closest_many_positions(self):
+        closests = PathHelper.closest_many([Point(2, 0, srid=settings.SRID), Point(5, 12, srid=settings.SRID)])
+        self.assertEqual(closests[0], (self.path_1.pk, 0.2, 0))
+        pk, position, offset = closests[1]
+        self.assertEqual(pk, self.path_2.pk)
+        self.assertAlmostEqual(position, 0.5)
+        self.assertAlmostEqual(abs(offset), 2)
+
+
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
 class TrailTest(TestCase):
     def test_no_trail_csv(self):
@@ -877,6 +877,22 @@ class TopologyDerialization(TestCase):
         self.assertEqual(topology.aggregations.all()[2].start_position, 0.0)
         self.assertEqual(topology.aggregations.all()[2].end_position, 0.7)
 
+    def test_deserialize_lines_computes_geometry(self):
+        p1 = PathFactory.create(geom=LineString((0, 0), (2, 0)))
+        p2 = PathFactory.create(geom=LineString((2, 0), (2, 2)))
+        p3 = PathFactory.create(geom=LineString((2, 2), (4, 2)))
+        topology = Topology.deserialize('[{"paths": [%s, %s], "positions": {"0": [0.5, 1.0], "1": [0.0, 0.5]}},'
+                                        ' {"paths": [%s, %s], "positions": {"0": [0.5, 1.0], "1": [0.0, 1.0]}}]'
+                                        % (p1.pk, p2.pk, p2.pk, p3.pk))
+        self.assertFalse(topology.deleted)
+        self.assertEqual(topology.aggregations.count(), 5)
+        self.assertEqual(topology.geom.coords, ((1, 0), (2, 0), (2, 1), (2, 2), (4, 2)))
+        self.assertAlmostEqual(topology.length, 5)
+
+    def test_deserialize_unknown_path(self):
+        with self.assertRaises(ValueError):
+            Topology.deserialize('[{"paths": [1234], "positions": {"0": [0.0, 1.0]}}]')
+
     def test_deserialize_point(self):
         PathFactory.create()
         # Take a point
@@ -961,6 +977,14 @@ class TopologyOverlappingTest(TestCase):
         self.assertEqual(list(overlaps), [self.topo1,
                                           self.point2, self.point3, self.point1, self.topo2])
 
+    def test_overlapping_accepts_many_topologies(self):
+        overlaps = Topology.overlapping(Topology.objects.filter(pk__in=[self.point1.pk, self.point2.pk]))
+        self.assertEqual(list(overlaps), [self.topo2, self.point1, self.point2, self.topo1])
+
+    def test_overlapping_can_be_used_as_subquery(self):
+        overlaps = Topology.overlapping(self.point1).values('pk')
+        self.assertEqual(Topology.objects.filter(pk__in=overlaps).count(), 3)
+
     def test_overlapping_does_not_fail_if_no_records(self):
         from geotrek.trekking.models import Trek
         overlaps = Topology.overlapping(Trek.objects.all())
@@ -1,11 +1,16 @@
 from django.test import TestCase
 from django.conf import settings
 from django.contrib.gis.geos import LineString
-from django.db import connections, DEFAULT_DB_ALIAS
+from django.db import connection, connections, DataError, DEFAULT_DB_ALIAS
 from django.contrib.gis.geos import fromstr
+from django.core.management import call_command
 
 from unittest import skipIf
 
+from geotrek.core.factories import PathFactory, TopologyFactory
+from geotrek.core.helpers import TopologyHelper, topologies_geometry_mode
+from geotrek.core.models import DeferredTopology
+
 
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
 class SmartMakelineTest(TestCase):
@@ -53,3 +58,83 @@ class SmartMakelineTest(TestCase):
         self.assertEqual(merged,
                          LineString((2, 0), (4, 0), (8, 0), (9, 0), (10, 0), (9, 0), (8, 0), (4, 0), (2, 0)),
                          merged.coords)
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class DeferredGeometryTest(TestCase):
+
+    def setUp(self):
+        self.path = PathFactory.create(geom=LineString((0, 0), (10, 0)))
+        self.topology = TopologyFactory.create(no_path=True)
+        self.topology.add_path(self.path, start=0.0, end=0.5)
+
+    def test_worker_mode_queues_topologies(self):
+        with topologies_geometry_mode('worker'):
+            self.path.geom = LineString((0, 0), (20, 0))
+            self.path.save()
+            self.topology.reload()
+            self.assertEqual(self.topology.geom.coords, ((0, 0), (5, 0)))
+            self.assertEqual(DeferredTopology.objects.filter(topology=self.topology.pk).count(), 1)
+        call_command('update_topologies_geometry', verbosity=0)
+        self.assertFalse(DeferredTopology.objects.exists())
+        self.topology.reload()
+        self.assertEqual(self.topology.geom.coords, ((0, 0), (10, 0)))
+
+    def test_transaction_mode_computes_geometry_at_end_of_block(self):
+        with topologies_geometry_mode('transaction'):
+            self.path.geom = LineString((0, 0), (20, 0))
+            self.path.save()
+            self.topology.reload()
+            self.assertEqual(self.topology.geom.coords, ((0, 0), (5, 0)))
+        self.assertFalse(DeferredTopology.objects.exists())
+        self.topology.reload()
+        self.assertEqual(self.topology.geom.coords, ((0, 0), (10, 0)))
+
+    def test_nested_block_restores_enclosing_mode(self):
+        with topologies_geometry_mode('transaction'):
+            with topologies_geometry_mode('off'):
+                pass
+            self.path.geom = LineString((0, 0), (20, 0))
+            self.path.save()
+            self.topology.reload()
+            self.assertEqual(self.topology.geom.coords, ((0, 0), (5, 0)))
+        self.assertFalse(DeferredTopology.objects.exists())
+        self.topology.reload()
+        self.assertEqual(self.topology.geom.coords, ((0, 0), (10, 0)))
+
+    def test_errors_are_raised_from_block(self):
+        with self.assertRaises(DataError):
+            with topologies_geometry_mode('off'):
+                connection.cursor().execute("SELECT 1 / 0")
+
+    def test_off_mode_does_not_compute_geometry(self):
+        with topologies_geometry_mode('off'):
+            self.path.geom = LineString((0, 0), (20, 0))
+            self.path.save()
+        self.assertFalse(DeferredTopology.objects.exists())
+        self.topology.reload()
+        self.assertEqual(self.topology.geom.coords, ((0, 0), (5, 0)))
+        TopologyHelper.update_geometry([self.topology.pk])
+        self.topology.reload()
+        self.assertEqual(self.topology.geom.coords, ((0, 0), (10, 0)))
+
+
+class SimplifiedGeometryTest(TestCase):
+    def test_path_simplified_geometries_are_computed(self):
+        path = PathFactory.create(geom=LineString((0, 0), (50, 2), (100, 0), (100, 300)))
+        path.reload()
+        self.assertEqual(path.geom_simplified_10.coords, ((0, 0), (100, 0), (100, 300)))
+        self.assertEqual(path.geom_simplified_100.coords, ((0, 0), (100, 300)))
+        path.geom = LineString((0, 0), (0, 500))
+        path.save()
+        path.reload()
+        self.assertEqual(path.geom_simplified_100.coords, ((0, 0), (0, 500)))
+
+    @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+    def test_topology_simplified_geometries_are_computed(self):
+        path = PathFactory.create(geom=LineString((0, 0), (50, 2), (100, 0)))
+        topology = TopologyFactory.create(no_path=True)
+        topology.add_path(path, start=0.0, end=1.0)
+        topology.save()
+        topology.reload()
+        self.assertEqual(topology.geom_simplified_10.coords, ((0, 0), (100, 0)))
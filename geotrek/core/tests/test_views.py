@@ -11,16 +11,18 @@ from django.utils.translation import ugettext_lazy as _
 from django.core.urlresolvers import reverse
 from django.contrib.gis.geos import LineString, Point, Polygon, MultiPolygon
 from django.test import TestCase
+from django.core.cache import caches
 
 from mapentity.factories import UserFactory
 
+from geotrek.common import vector_tiles
 from geotrek.common.tests import CommonTest
 from geotrek.common.utils import LTE
 
 from geotrek.authent.factories import PathManagerFactory, StructureFactory
 from geotrek.authent.tests import AuthentFixturesTest
 
-from geotrek.core.models import Path, Trail
+from geotrek.core.models import Path, Trail, path_layer_grid
 
 from geotrek.trekking.factories import POIFactory, TrekFactory, ServiceFactory
 from geotrek.infrastructure.factories import InfrastructureFactory
@@ -543,6 +545,69 @@ class PathKmlGPXTest(TestCase):
 
 
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathVectorTileTest(TestCase):
+    def setUp(self):
+        caches['fat'].clear()
+        self.path = PathFactory.create(name="Ichitaro")
+        point = self.path.geom.centroid.transform(vector_tiles.WEB_MERCATOR_SRID, clone=True)
+        size = 2 * vector_tiles.ORIGIN / 2 ** 14
+        self.url = reverse('core:path_vector_tile', kwargs={
+            'z': 14,
+            'x': int((point.x + vector_tiles.ORIGIN) / size),
+            'y': int((vector_tiles.ORIGIN - point.y) / size),
+        })
+
+    def test_login_required(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_tile(self):
+        user = PathManagerFactory(password='booh')
+        self.client.login(username=user.username, password='booh')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertIn(b'Ichitaro', response.content)
+
+    def test_invalid_tile(self):
+        user = PathManagerFactory(password='booh')
+        self.client.login(username=user.username, password='booh')
+        response = self.client.get(reverse('core:path_vector_tile', kwargs={'z': 1, 'x': 2, 'y': 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+@skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+class PathLayerCacheTest(TestCase):
+    def setUp(self):
+        caches['fat'].clear()
+        user = PathManagerFactory(password='booh')
+        self.client.login(username=user.username, password='booh')
+        self.path = PathFactory.create(name="Ichitaro", geom=LineString((700000, 6600000), (700100, 6600100)))
+        self.other = PathFactory.create(name="Jiro", geom=LineString((200000, 6200000), (200100, 6200100)))
+
+    def get_names(self, **params):
+        response = self.client.get(reverse('core:path_layer'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(feature['properties']['name'] for feature in json.loads(response.content)['features'])
+
+    def test_layer_is_assembled_from_cells(self):
+        self.assertEqual(self.get_names(), ["Ichitaro", "Jiro"])
+        self.assertEqual(self.get_names(), ["Ichitaro", "Jiro"])
+
+    def test_only_modified_cells_are_invalidated(self):
+        self.get_names()
+        Path.objects.filter(pk=self.path.pk).update(name="Saburo")
+        Path.objects.filter(pk=self.other.pk).update(name="Shiro")
+        path_layer_grid.invalidate(self.path.geom)
+        self.assertEqual(self.get_names(), ["Jiro", "Saburo"])
+
+    def test_no_draft(self):
+        self.other.draft = True
+        self.other.save()
+        self.assertEqual(self.get_names(no_draft='true'), ["Ichitaro"])
+        self.assertEqual(self.get_names(), ["Ichitaro", "Jiro"])
+
+
 class DenormalizedTrailTest(AuthentFixturesTest):
     def setUp(self):
         self.trail1 = TrailFactory(no_path=True)
@@ -6,12 +6,14 @@ from mapentity.registry import registry
 from geotrek.altimetry.urls import AltimetryEntityOptions
 from geotrek.core.models import Path, Trail
 from geotrek.core.views import (
-    get_graph_json, merge_path, ParametersView, PathGPXDetail, PathKMLDetail, TrailGPXDetail, TrailKMLDetail,
-    MultiplePathDelete
+    get_graph_json, get_route_json, merge_path, ParametersView, PathGPXDetail, PathKMLDetail, TrailGPXDetail, TrailKMLDetail,
+    MultiplePathDelete, PathVectorTile
 )
 
 urlpatterns = [
+    url(r'^api/path/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$', PathVectorTile.as_view(), name="path_vector_tile"),
     url(r'^api/graph.json$', get_graph_json, name="path_json_graph"),
+    url(r'^api/route.json$', get_route_json, name="path_json_route"),
     url(r'^api/(?P<lang>\w\w)/parameters.json$', ParametersView.as_view(), name='parameters_json'),
     url(r'^mergepath/$', merge_path, name="merge_path"),
     url(r'^path/delete/(?P<pk>\d+(,\d+)+)/', MultiplePathDelete.as_view(), name="multiple_path_delete"),
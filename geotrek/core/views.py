@@ -9,13 +9,13 @@ from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
 from django.shortcuts import redirect
-from django.views.decorators.http import last_modified as cache_last_modified
 from django.views.decorators.cache import cache_control
 from django.views.generic import View, TemplateView
 from django.utils.translation import ugettext as _
 from django.core.cache import caches
 from django.views.generic.detail import BaseDetailView
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, HttpResponseNotModified
+from django.contrib.gis.geos import Point
 
 from mapentity.serializers import GPXSerializer
 from mapentity.views import (MapEntityLayer, MapEntityList, MapEntityJsonList,
@@ -25,10 +25,11 @@ from mapentity.views import (MapEntityLayer, MapEntityList, MapEntityJsonList,
 
 from geotrek.authent.decorators import same_structure_required
 from geotrek.common.utils import classproperty
-from geotrek.common.views import PublicOrReadPermMixin
+from geotrek.common.views import PublicOrReadPermMixin, VectorTileView
+from geotrek.zoning.views import ZoningFormatListMixin
 from geotrek.core.models import AltimetryMixin
 
-from .models import Path, Trail, Topology
+from .models import Path, Trail, Topology, path_layer_grid
 from .forms import PathForm, TrailForm
 from .filters import PathFilterSet, TrailFilterSet
 from . import graph as graph_lib
@@ -62,30 +63,71 @@ class CreateFromTopologyMixin(object):
 
 
 class PathLayer(MapEntityLayer):
+    """
+    Paths layer, cached by cells of ``path_layer_grid``: modifying a path
+    only invalidates the features of the cells around it.
+    """
     properties = ['name', 'draft']
     queryset = Path.objects.all()
+    cells = None
 
     def get_queryset(self):
         qs = super(PathLayer, self).get_queryset()
         if self.request.GET.get('no_draft'):
             qs = qs.exclude(draft=True)
+        if self.cells is not None:
+            qs = qs.annotate(layer_cell=path_layer_grid.cell_expression()).filter(layer_cell__in=self.cells)
         return qs
 
     def view_cache_key(self):
         """Used by the ``view_cache_response_content`` decorator.
+        Whole layer is not cached, see ``render_to_response()``.
         """
-        language = self.request.LANGUAGE_CODE
-        latest_saved = Path.latest_updated()
-        if latest_saved:
-            geojson_lookup = '%s_path_%s%s_json_layer' % (
-                language,
-                latest_saved.strftime('%y%m%d%H%M%S%f'),
-                '_nodraft' if self.request.GET.get('no_draft') == 'true' else ''
-            )
-        else:
-            geojson_lookup = None
+        return None
+
+    def get_cell_cache_key(self, cell, version):
+        return '%s_path_%s_%s%s_json_layer_cell' % (
+            self.request.LANGUAGE_CODE,
+            cell,
+            version,
+            '_nodraft' if self.request.GET.get('no_draft') == 'true' else ''
+        )
 
-        return geojson_lookup
+    def render_cells(self, context, cells):
+        """
+        Features of the given cells, as JSON fragments (without brackets).
+        """
+        self.cells = cells
+        response = super(PathLayer, self).render_to_response(context)
+        cells_by_pk = dict(self.get_queryset().values_list('pk', 'layer_cell'))
+        features = defaultdict(list)
+        for feature in json.loads(response.content)['features']:
+            features[cells_by_pk[feature['id']]].append(json.dumps(feature))
+        return dict((cell, ','.join(features[cell])) for cell in cells)
+
+    def render_to_response(self, context, **response_kwargs):
+        params = [p for p in self.request.GET.keys() if not p.startswith('_')]
+        if [p for p in params if p != 'no_draft']:
+            # Filtered layers are not cached
+            return super(PathLayer, self).render_to_response(context, **response_kwargs)
+        cache = caches[settings.MAPENTITY_CONFIG['GEOJSON_LAYERS_CACHE_BACKEND']]
+        keys = dict((cell, self.get_cell_cache_key(cell, version))
+                    for cell, version in path_layer_grid.versions().items())
+        cached = cache.get_many(keys.values())
+        fragments = dict((cell, cached[key]) for cell, key in keys.items() if key in cached)
+        missing = [cell for cell in keys if cell not in fragments]
+        if missing:
+            rendered = self.render_cells(context, missing)
+            cache.set_many(dict((keys[cell], fragment) for cell, fragment in rendered.items()))
+            fragments.update(rendered)
+        content = '{"type": "FeatureCollection", "features": [%s]}' % ','.join(
+            fragments[cell] for cell in sorted(fragments) if fragments[cell])
+        return self.response_class(content=content, **response_kwargs)
+
+
+class PathVectorTile(VectorTileView):
+    queryset = Path.objects.all()
+    properties = ['name', 'draft']
 
 
 class PathList(MapEntityList):
@@ -110,7 +152,7 @@ class PathJsonList(MapEntityJsonList, PathList):
         return context
 
 
-class PathFormatList(MapEntityFormat, PathList):
+class PathFormatList(ZoningFormatListMixin, MapEntityFormat, PathList):
     columns = [
         'id', 'structure', 'valid', 'visible', 'name', 'comments', 'departure', 'arrival',
         'comfort', 'source', 'stake', 'usages', 'networks',
@@ -259,27 +301,81 @@ class PathDelete(MapEntityDelete):
 
 @login_required
 @cache_control(max_age=0, must_revalidate=True)
-@cache_last_modified(lambda x: Path.latest_updated())
 def get_graph_json(request):
+    """
+    Graph of paths, cached until the network changes (paths ends, length or
+    visibility), edits of other path attributes keep it valid.
+    """
     cache = caches['fat']
-    key = 'path_graph_json'
+    key = graph_lib.GRAPH_JSON_CACHE_KEY
+
+    graph = graph_lib.get_path_graph()
+    etag = '"%s"' % graph.version
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        return HttpResponseNotModified()
 
     result = cache.get(key)
-    latest = Path.latest_updated()
+    if result and result[0] == graph.version:
+        json_graph = result[1]
+    else:
+        json_graph = json.dumps(graph.serialize())
+        cache.set(key, (graph.version, json_graph))
+    response = HttpJSONResponse(json_graph)
+    response['ETag'] = etag
+    return response
+
+
+def _route_point(value):
+    """ Parse a ``lng,lat`` string, and snap it on the closest path.
+    """
+    try:
+        lng, lat = [float(v) for v in value.split(',')]
+    except (AttributeError, ValueError):
+        raise ValueError(_(u"Invalid point: %s") % value)
+    point = Point(lng, lat, srid=settings.API_SRID)
+    point.transform(settings.SRID)
+    closest = Path.closest(point)
+    position, offset = closest.interpolate(point)
+    return closest.pk, position
 
-    if result and latest:
-        cache_latest, json_graph = result
-        # Not empty and still valid
-        if cache_latest and cache_latest >= latest:
-            return HttpJSONResponse(json_graph)
 
-    # cache does not exist or is not up to date
-    # rebuild the graph and cache the json
-    graph = graph_lib.graph_edges_nodes_of_qs(Path.objects.exclude(draft=True))
-    json_graph = json.dumps(graph)
+@login_required
+@cache_control(max_age=0, must_revalidate=True)
+def get_route_json(request):
+    """
+    Shortest route along paths between ``start`` and ``end`` points, through
+    optional ``via`` points (``lng,lat`` in API_SRID).
 
-    cache.set(key, (latest, json_graph))
-    return HttpJSONResponse(json_graph)
+    Returns a serialized topology, as expected by ``Topology.deserialize``.
+    """
+    try:
+        values = [request.GET.get('start')] + request.GET.getlist('via') + [request.GET.get('end')]
+        if None in values:
+            raise ValueError(_(u"Start and end points are required"))
+        if not Path.objects.exclude(draft=True).exists():
+            raise ValueError(_(u"No path found"))
+        markers = [_route_point(value) for value in values]
+    except ValueError as exc:
+        return JsonResponse({u'error': u'%s' % exc}, status=400)
+
+    graph = graph_lib.get_path_graph()
+    unknown = [pk for pk, position in markers if pk not in graph]
+    if unknown:
+        # Snapped on paths committed since the graph was last refreshed
+        graph = graph_lib.get_path_graph(updated=unknown)
+        if any(pk not in graph for pk in unknown):
+            return JsonResponse({u'error': _(u"No route found between these points")}, status=404)
+    serialized = []
+    for source, target in zip(markers[:-1], markers[1:]):
+        steps = graph.shortest_path(source, target)
+        if steps is None:
+            return JsonResponse({u'error': _(u"No route found between these points")}, status=404)
+        serialized.append({
+            'offset': 0,
+            'paths': [pk for pk, start, end in steps],
+            'positions': dict((str(i), (start, end)) for i, (pk, start, end) in enumerate(steps)),
+        })
+    return JsonResponse(serialized, safe=False)
 
 
 class TrailLayer(MapEntityLayer):
@@ -297,7 +393,7 @@ class TrailJsonList(MapEntityJsonList, TrailList):
     pass
 
 
-class TrailFormatList(MapEntityFormat, TrailList):
+class TrailFormatList(ZoningFormatListMixin, MapEntityFormat, TrailList):
     columns = [
         'id', 'structure', 'name', 'comments', 'departure', 'arrival',
         'date_insert', 'date_update',
@@ -13,8 +13,10 @@ from rest_framework import permissions as rest_permissions, viewsets
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 
 from geotrek.authent.decorators import same_structure_required
+from geotrek.common.mixins import pictures_prefetch
 from geotrek.common.models import RecordSource, TargetPortal
 from geotrek.common.views import DocumentPublic, MarkupPublic
+from geotrek.zoning.views import ZoningFormatListMixin
 
 from .filters import DiveFilterSet
 from .forms import DiveForm
@@ -40,7 +42,7 @@ class DiveJsonList(MapEntityJsonList, DiveList):
     pass
 
 
-class DiveFormatList(MapEntityFormat, DiveList):
+class DiveFormatList(ZoningFormatListMixin, MapEntityFormat, DiveList):
     columns = [
         'id', 'eid', 'structure', 'name', 'departure',
         'description', 'description_teaser',
@@ -158,7 +160,7 @@ class DiveViewSet(MapEntityViewSet):
     def get_queryset(self):
         qs = self.model.objects.existing()
         qs = qs.select_related('structure', 'difficulty', 'practice')
-        qs = qs.prefetch_related('levels', 'source', 'portal', 'themes', 'attachments')
+        qs = qs.prefetch_related('levels', 'source', 'portal', 'themes', pictures_prefetch())
         qs = qs.filter(published=True).order_by('pk').distinct('pk')
         if 'source' in self.request.GET:
             qs = qs.filter(source__name__in=self.request.GET['source'].split(','))
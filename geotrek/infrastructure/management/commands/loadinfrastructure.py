@@ -49,6 +49,8 @@ class Command(BaseCommand):
         parser.add_argument('--eid-field', action='store', dest='eid_field', help='External ID field')
         parser.add_argument('--year-default', action='store', dest='year_default',
                             help='Default year for all infrastructures')
+        parser.add_argument('--bulk', action='store_true', dest='bulk', default=False,
+                            help='Create new infrastructures all at once, faster for large layers')
 
     def handle(self, *args, **options):
         verbosity = options.get('verbosity')
@@ -77,6 +79,17 @@ class Command(BaseCommand):
         sid = transaction.savepoint()
         structure_default = options.get('structure_default')
 
+        # Lookup tables resolved once per value
+        self.structures = {}
+        self.types = {}
+        self.conditions = {}
+        # New infrastructures and their points, created at the end with --bulk
+        self.bulk = options.get('bulk')
+        self.pending = []
+        self.pending_eids = {}
+        if self.bulk:
+            self.existing_eids = set(Infrastructure.objects.exclude(eid=None).values_list('eid', flat=True))
+
         try:
             for layer in data_source:
                 if verbosity >= 2:
@@ -165,7 +178,7 @@ class Command(BaseCommand):
                         condition = feature.get(field_condition_type)
                     else:
                         condition = options.get('condition_default')
-                    structure = Structure.objects.get(name=feature.get(field_structure_type)) \
+                    structure = self.get_structure(feature.get(field_structure_type)) \
                         if field_structure_type in available_fields else structure
                     description = feature.get(
                         field_description) if field_description in available_fields else options.get(
@@ -175,9 +188,12 @@ class Command(BaseCommand):
                         field_implantation_year).isdigit() else options.get('year_default')
                     eid = feature.get(field_eid) if field_eid in available_fields else None
 
-                    self.create_infrastructure(feature_geom, name, type, category, use_structure,
-                                               condition, structure, description, year, verbosity, eid)
+                    create = self.add_infrastructure if self.bulk else self.create_infrastructure
+                    create(feature_geom, name, type, category, use_structure,
+                           condition, structure, description, year, verbosity, eid)
 
+            if self.bulk:
+                self.bulk_create_infrastructures()
             transaction.savepoint_commit(sid)
             if verbosity >= 2:
                 self.stdout.write(self.style.NOTICE(u"{} objects created.".format(self.counter)))
@@ -187,20 +203,75 @@ class Command(BaseCommand):
             transaction.savepoint_rollback(sid)
             raise
 
+    def get_structure(self, name):
+        if name not in self.structures:
+            self.structures[name] = Structure.objects.get(name=name)
+        return self.structures[name]
+
+    def get_infrastructure_type(self, type, category, structure, verbosity):
+        key = (type, category, structure)
+        if key not in self.types:
+            self.types[key], created = InfrastructureType.objects.get_or_create(label=type, type=category,
+                                                                                structure=structure)
+            if created and verbosity:
+                self.stdout.write(u"- InfrastructureType '{}' created".format(self.types[key]))
+        return self.types[key]
+
+    def get_condition(self, condition, structure, verbosity):
+        key = (condition, structure)
+        if key not in self.conditions:
+            self.conditions[key], created = InfrastructureCondition.objects.get_or_create(label=condition,
+                                                                                          structure=structure)
+            if created and verbosity:
+                self.stdout.write(u"- Condition Type '{}' created".format(self.conditions[key]))
+        return self.conditions[key]
+
+    def add_infrastructure(self, geometry, name, type, category, use_structure,
+                           condition, structure, description, year, verbosity, eid):
+        """
+        Same as ``create_infrastructure()``, but new infrastructures are only
+        created by ``bulk_create_infrastructures()``.
+        """
+        if eid and eid in self.existing_eids:
+            return self.create_infrastructure(geometry, name, type, category, use_structure,
+                                              condition, structure, description, year, verbosity, eid)
+        infra_type = self.get_infrastructure_type(type, category, structure if use_structure else None, verbosity)
+        condition_type = self.get_condition(condition, structure if use_structure else None,
+                                            verbosity) if condition else None
+        if geometry.geom_type != 'Point':
+            raise GEOSException('Invalid Geometry type.')
+        geometry.coord_dim = 2
+        geometry = geometry.transform(settings.SRID, clone=True)
+        infra = Infrastructure(type=infra_type, name=name, condition=condition_type, structure=structure,
+                               description=description, implantation_year=year, eid=eid or None)
+        if eid in self.pending_eids:
+            # Last feature wins, like updates of existing infrastructures
+            if verbosity > 0:
+                self.stdout.write(u"Update : %s with eid %s" % (name, eid))
+            self.pending[self.pending_eids[eid]] = (infra, Point(geometry.x, geometry.y, srid=settings.SRID))
+            return infra
+        if eid:
+            self.pending_eids[eid] = len(self.pending)
+        self.pending.append((infra, Point(geometry.x, geometry.y, srid=settings.SRID)))
+        return infra
+
+    def bulk_create_infrastructures(self):
+        infras = [infra for infra, point in self.pending]
+        with transaction.atomic():
+            try:
+                TopologyHelper.bulk_create_points(infras, [point for infra, point in self.pending])
+            except IndexError:
+                raise GEOSException('Invalid Geometry type. You need 1 path')
+        self.counter += len(infras)
+        return infras
+
     def create_infrastructure(self, geometry, name, type, category, use_structure,
                               condition, structure, description, year, verbosity, eid):
 
-        infra_type, created = InfrastructureType.objects.get_or_create(label=type, type=category,
-                                                                       structure=structure if use_structure else None)
-        if created and verbosity:
-            self.stdout.write(u"- InfrastructureType '{}' created".format(infra_type))
+        infra_type = self.get_infrastructure_type(type, category, structure if use_structure else None, verbosity)
 
         if condition:
-            condition_type, created = InfrastructureCondition.objects.get_or_create(
-                label=condition,
-                structure=structure if use_structure else None)
-            if created and verbosity:
-                self.stdout.write(u"- Condition Type '{}' created".format(condition_type))
+            condition_type = self.get_condition(condition, structure if use_structure else None, verbosity)
         else:
             condition_type = None
 
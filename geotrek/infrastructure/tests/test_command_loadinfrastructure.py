@@ -3,6 +3,7 @@ import mock
 import sys
 from StringIO import StringIO
 
+from django.conf import settings
 from django.contrib.gis.geos.error import GEOSException
 from django.core.management import call_command
 from django.test import TestCase
@@ -38,6 +39,35 @@ class InfrastructureCommandTest(TestCase):
         self.assertAlmostEqual(value[1].geom.x, -436345.505347, places=5)
         self.assertAlmostEqual(value[1].geom.y, 1176480.918334, places=5)
 
+    def test_load_infrastructure_bulk(self):
+        output = StringIO()
+        StructureFactory.create(name='structure')
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'infrastructure.shp')
+        call_command('loadinfrastructure', filename, type_default='label', name_default='name',
+                     condition_default='condition', structure_default='structure',
+                     description_default='description', year_default=2010, bulk=True, verbosity=2, stdout=output)
+        self.assertIn('2 objects created.', output.getvalue())
+        value = Infrastructure.objects.filter(name='name').order_by('pk')
+        self.assertEquals(value.count(), 2)
+        self.assertEquals(2010, value[0].implantation_year)
+        self.assertEquals('condition', value[0].condition.label)
+        self.assertEquals(value[0].type, value[1].type)
+        self.assertAlmostEqual(value[0].geom.x, -436345.704831, places=5)
+        self.assertAlmostEqual(value[0].geom.y, 1176487.742917, places=5)
+        self.assertAlmostEqual(value[1].geom.x, -436345.505347, places=5)
+        self.assertAlmostEqual(value[1].geom.y, 1176480.918334, places=5)
+        if settings.TREKKING_TOPOLOGY_ENABLED:
+            self.assertEqual(list(value[0].paths.all()), [self.path])
+
+    def test_update_same_eid_bulk(self):
+        output = StringIO()
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'infrastructure.shp')
+        InfrastructureFactory(name="name", eid="eid_2")
+        call_command('loadinfrastructure', filename, eid_field='eid', type_default='label',
+                     name_default='name', bulk=True, verbosity=2, stdout=output)
+        self.assertIn("Update : name with eid eid1", output.getvalue())
+        self.assertEqual(Infrastructure.objects.count(), 2)
+
     def test_load_infrastructure_multipoints(self):
         output = StringIO()
         structure = StructureFactory.create(name='structure')
@@ -6,6 +6,7 @@ from mapentity.views import (MapEntityLayer, MapEntityList, MapEntityJsonList, M
 from geotrek.authent.decorators import same_structure_required
 from geotrek.core.models import AltimetryMixin
 from geotrek.core.views import CreateFromTopologyMixin
+from geotrek.zoning.views import ZoningFormatListMixin
 
 from .filters import InfrastructureFilterSet
 from .forms import InfrastructureForm
@@ -31,7 +32,7 @@ class InfrastructureJsonList(MapEntityJsonList, InfrastructureList):
     pass
 
 
-class InfrastructureFormatList(MapEntityFormat, InfrastructureList):
+class InfrastructureFormatList(ZoningFormatListMixin, MapEntityFormat, InfrastructureList):
     columns = [
         'id', 'name', 'type', 'condition', 'description',
         'implantation_year', 'published', 'publication_date', 'structure', 'date_insert',
@@ -74,7 +74,7 @@ class PhysicalEdge(MapEntityMixin, Topology):
 Path.add_property('physical_edges', PhysicalEdge.path_physicals, _(u"Physical edges"))
 Topology.add_property('physical_edges', PhysicalEdge.topology_physicals, _(u"Physical edges"))
 Intervention.add_property('physical_edges', lambda self: self.topology.physical_edges if self.topology else [], _(u"Physical edges"))
-Project.add_property('physical_edges', lambda self: self.edges_by_attr('physical_edges'), _(u"Physical edges"))
+Project.add_property('physical_edges', lambda self: self.edges_by_attr(PhysicalEdge), _(u"Physical edges"))
 
 
 class LandType(StructureOrNoneRelated):
@@ -145,7 +145,7 @@ class LandEdge(MapEntityMixin, Topology):
 Path.add_property('land_edges', LandEdge.path_lands, _(u"Land edges"))
 Topology.add_property('land_edges', LandEdge.topology_lands, _(u"Land edges"))
 Intervention.add_property('land_edges', lambda self: self.topology.land_edges if self.topology else [], _(u"Land edges"))
-Project.add_property('land_edges', lambda self: self.edges_by_attr('land_edges'), _(u"Land edges"))
+Project.add_property('land_edges', lambda self: self.edges_by_attr(LandEdge), _(u"Land edges"))
 
 
 class CompetenceEdge(MapEntityMixin, Topology):
@@ -198,7 +198,7 @@ class CompetenceEdge(MapEntityMixin, Topology):
 Path.add_property('competence_edges', CompetenceEdge.path_competences, _(u"Competence edges"))
 Topology.add_property('competence_edges', CompetenceEdge.topology_competences, _(u"Competence edges"))
 Intervention.add_property('competence_edges', lambda self: self.topology.competence_edges if self.topology else [], _(u"Competence edges"))
-Project.add_property('competence_edges', lambda self: self.edges_by_attr('competence_edges'), _(u"Competence edges"))
+Project.add_property('competence_edges', lambda self: self.edges_by_attr(CompetenceEdge), _(u"Competence edges"))
 
 
 class WorkManagementEdge(MapEntityMixin, Topology):
@@ -251,7 +251,7 @@ class WorkManagementEdge(MapEntityMixin, Topology):
 Path.add_property('work_edges', WorkManagementEdge.path_works, _(u"Work management edges"))
 Topology.add_property('work_edges', WorkManagementEdge.topology_works, _(u"Work management edges"))
 Intervention.add_property('work_edges', lambda self: self.topology.work_edges if self.topology else [], _(u"Work management edges"))
-Project.add_property('work_edges', lambda self: self.edges_by_attr('work_edges'), _(u"Work management edges"))
+Project.add_property('work_edges', lambda self: self.edges_by_attr(WorkManagementEdge), _(u"Work management edges"))
 
 
 class SignageManagementEdge(MapEntityMixin, Topology):
@@ -304,4 +304,4 @@ class SignageManagementEdge(MapEntityMixin, Topology):
 Path.add_property('signage_edges', SignageManagementEdge.path_signages, _(u"Signage management edges"))
 Topology.add_property('signage_edges', SignageManagementEdge.topology_signages, _(u"Signage management edges"))
 Intervention.add_property('signage_edges', lambda self: self.topology.signage_edges if self.topology else [], _(u"Signage management edges"))
-Project.add_property('signage_edges', lambda self: self.edges_by_attr('signage_edges'), _(u"Signage management edges"))
+Project.add_property('signage_edges', lambda self: self.edges_by_attr(SignageManagementEdge), _(u"Signage management edges"))
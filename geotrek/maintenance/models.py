@@ -6,6 +6,8 @@ from django.db.models.functions import ExtractYear
 from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.gis.db import models
+from django.contrib.gis.db.models.query import GeoQuerySet
+from django.db.models import Func, OuterRef, Subquery
 from django.contrib.gis.geos import GeometryCollection
 
 from mapentity.models import MapEntityMixin
@@ -214,11 +216,8 @@ class Intervention(AddPropertyMixin, MapEntityMixin, AltimetryMixin,
 
     @property
     def trails(self):
-        s = []
-        for p in self.paths.all():
-            for t in p.trails.all():
-                s.append(t.pk)
-        return Trail.objects.filter(pk__in=s)
+        return Trail.objects.filter(pk__in=Trail.objects.existing().filter(aggregations__path__in=self.paths)
+                                                                   .values('pk'))
 
     @property
     def signages(self):
@@ -392,7 +391,26 @@ class ManDay(models.Model):
         return str(self.nb_days)
 
 
+def interventions_geom():
+    """ Geometries of interventions topologies, collected as a geometry collection
+    """
+    return Func(models.Collect('topology__geom'), function='ST_ForceCollection',
+                output_field=models.GeometryCollectionField(srid=settings.SRID))
+
+
+class ProjectQuerySet(GeoQuerySet):
+    def with_geom(self):
+        """ Compute geometries of projects in the same query (see ``Project.geom``)
+        """
+        interventions = Intervention.objects.existing().filter(project=OuterRef('pk')).order_by().values('project')
+        geom = interventions.annotate(geom=interventions_geom()).values('geom')
+        return self.annotate(_geom=Subquery(geom, output_field=models.GeometryCollectionField(srid=settings.SRID)))
+
+
 class ProjectManager(models.GeoManager):
+    def get_queryset(self):
+        return ProjectQuerySet(self.model, using=self._db)
+
     def all_years(self):
         all_years = []
         for (begin, end) in self.existing().values_list('begin_year', 'end_year'):
@@ -438,36 +456,29 @@ class Project(AddPropertyMixin, MapEntityMixin, TimeStampedModelMixin,
         super(Project, self).__init__(*args, **kwargs)
         self._geom = None
 
+    @property
+    def topologies(self):
+        """ Topologies of project interventions, as a subquery
+        """
+        return self.interventions.existing().order_by().values('topology')
+
     @property
     def paths(self):
-        s = []
-        for i in self.interventions.existing():
-            s += i.paths
-        return Path.objects.filter(pk__in=[p.pk for p in set(s)])
+        return Path.objects.filter(pk__in=Path.objects.filter(aggregations__topo_object__in=self.topologies)
+                                                      .values('pk'))
 
     @property
     def trails(self):
-        s = []
-        for i in self.interventions.existing():
-            for p in i.paths.all():
-                for t in p.trails.all():
-                    s.append(t.pk)
-
-        return Trail.objects.filter(pk__in=s)
+        return Trail.objects.filter(pk__in=Trail.objects.existing().filter(aggregations__path__in=self.paths)
+                                                                   .values('pk'))
 
     @property
     def signages(self):
-        s = []
-        for i in self.interventions.existing():
-            s += i.signages
-        return list(set(s))
+        return list(Signage.objects.existing().filter(pk__in=self.topologies))
 
     @property
     def infrastructures(self):
-        s = []
-        for i in self.interventions.existing():
-            s += i.infrastructures
-        return list(set(s))
+        return list(Infrastructure.objects.existing().filter(pk__in=self.topologies))
 
     @classproperty
     def geomfield(cls):
@@ -483,9 +494,7 @@ class Project(AddPropertyMixin, MapEntityMixin, TimeStampedModelMixin,
         """
         if self._geom is None:
             interventions = Intervention.objects.existing().filter(project=self)
-            geoms = [i.geom for i in interventions if i.geom is not None]
-            if geoms:
-                self._geom = GeometryCollection(*geoms, srid=settings.SRID)
+            self._geom = interventions.aggregate(geom=interventions_geom())['geom']
         return self._geom
 
     @geom.setter
@@ -550,23 +559,12 @@ class Project(AddPropertyMixin, MapEntityMixin, TimeStampedModelMixin,
     def topology_projects(cls, topology):
         return cls.objects.existing().filter(interventions__in=topology.interventions).distinct()
 
-    def edges_by_attr(self, interventionattr):
-        """ Return related topology objects of project, by aggregating the same attribute
-        on its interventions.
+    def edges_by_attr(self, modelclass):
+        """ Return topology objects of ``modelclass`` overlapping the topologies
+        of project interventions, as a single query.
         (See geotrek.land.models)
         """
-        pks = []
-        modelclass = Topology
-        for i in self.interventions.all():
-            attr_value = getattr(i, interventionattr)
-            if isinstance(attr_value, list):
-                pks += [o.pk for o in attr_value]
-            else:
-                modelclass = attr_value.model
-                topologies = attr_value.values('id')
-                for topology in topologies:
-                    pks.append(topology['id'])
-        return modelclass.objects.filter(pk__in=pks)
+        return modelclass.overlapping(Topology.objects.filter(pk__in=self.topologies))
 
     @classmethod
     def get_create_label(cls):
@@ -6,6 +6,7 @@ from unittest import skipIf
 from geotrek.infrastructure.factories import InfrastructureFactory
 from geotrek.signage.factories import SignageFactory
 from geotrek.maintenance.factories import InterventionFactory, ProjectFactory
+from geotrek.maintenance.models import Project
 from geotrek.core.factories import TopologyFactory, PathAggregationFactory
 from geotrek.land.factories import (SignageManagementEdgeFactory, WorkManagementEdgeFactory,
                                     CompetenceEdgeFactory)
@@ -120,6 +121,23 @@ class ProjectTest(TestCase):
 
         self.assertEquals(proj.infrastructures, [])
 
+    def test_geom(self):
+        i1 = InterventionFactory.create(topology=TopologyFactory.create())
+        i2 = InterventionFactory.create(topology=TopologyFactory.create())
+        proj = ProjectFactory.create()
+        self.assertIsNone(proj.geom)
+        proj.interventions.add(i1, i2)
+        proj = Project.objects.get(pk=proj.pk)
+        self.assertEqual(proj.geom.geom_type, 'GeometryCollection')
+        self.assertEqual(len(proj.geom), 2)
+
+    def test_with_geom(self):
+        proj = ProjectFactory.create()
+        proj.interventions.add(InterventionFactory.create(topology=TopologyFactory.create()))
+        with self.assertNumQueries(1):
+            proj = Project.objects.with_geom().get(pk=proj.pk)
+            self.assertEqual(len(proj.geom), 1)
+
 
 @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
 class ProjectLandTest(TestCase):
@@ -175,3 +193,7 @@ class ProjectLandTest(TestCase):
         self.assertIn(self.restricted, self.intervention.area_edges)
         self.assertIn(self.restricted, self.project.area_edges)
         self.assertIn(self.restricted.restricted_area, self.project.areas)
+
+    def test_project_edges_are_fetched_in_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.project.work_edges), [self.workmgt])
@@ -130,7 +130,7 @@ class InterventionViewSet(MapEntityViewSet):
 
 
 class ProjectLayer(MapEntityLayer):
-    queryset = Project.objects.existing()
+    queryset = Project.objects.existing().with_geom()
     properties = ['name']
 
     def get_queryset(self):
@@ -149,6 +149,7 @@ class ProjectJsonList(MapEntityJsonList, ProjectList):
 
 
 class ProjectFormatList(MapEntityFormat, ProjectList):
+    queryset = Project.objects.existing().with_geom()
     columns = [
         'id', 'structure', 'name', 'period', 'type', 'domain', 'constraint', 'global_cost',
         'interventions', 'interventions_total_cost', 'comments', 'contractors',
@@ -201,6 +202,6 @@ class ProjectDelete(MapEntityDelete):
 
 class ProjectViewSet(MapEntityViewSet):
     model = Project
-    queryset = Project.objects.existing()
+    queryset = Project.objects.existing().with_geom()
     serializer_class = ProjectSerializer
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
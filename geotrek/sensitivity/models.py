@@ -14,6 +14,7 @@ from mapentity.serializers import plain_text
 from geotrek.authent.models import StructureRelated
 from geotrek.common.mixins import (OptionalPictogramMixin, NoDeleteMixin, TimeStampedModelMixin, AddPropertyMixin)
 from geotrek.common.utils import intersecting, classproperty
+from geotrek.common.vector_tiles import connect_vector_tiles_invalidation
 
 
 class SportPractice(models.Model):
@@ -203,11 +204,20 @@ class SensitiveArea(MapEntityMixin, StructureRelated, TimeStampedModelMixin, NoD
     pretty_practices_verbose_name = _("Practices")
 
 
+connect_vector_tiles_invalidation(SensitiveArea, ['sensitivearea'])
+
+
 if 'geotrek.core' in settings.INSTALLED_APPS:
     from geotrek.core.models import Topology
     Topology.add_property('sensitive_areas', lambda self: intersecting(SensitiveArea, self, settings.SENSITIVE_AREA_INTERSECTION_MARGIN), _(u"Sensitive areas"))
     Topology.add_property('published_sensitive_areas', lambda self: intersecting(SensitiveArea, self, settings.SENSITIVE_AREA_INTERSECTION_MARGIN).filter(published=True), _(u"Published sensitive areas"))
 
+if 'geotrek.trekking' in settings.INSTALLED_APPS:
+    from geotrek.trekking.models import Trek
+    # Sensitive areas near treks are materialized (see TrekProximity)
+    Trek.sensitive_areas = property(lambda self: self.nearby(SensitiveArea, settings.SENSITIVE_AREA_INTERSECTION_MARGIN))
+    Trek.published_sensitive_areas = property(lambda self: self.sensitive_areas.filter(published=True))
+
 if 'geotrek.diving' in settings.INSTALLED_APPS:
     from geotrek.diving.models import Dive
     Dive.add_property('sensitive_areas', lambda self: intersecting(SensitiveArea, self, settings.SENSITIVE_AREA_INTERSECTION_MARGIN), _(u"Sensitive areas"))
@@ -0,0 +1,10 @@
+-------------------------------------------------------------------------------
+-- Sync objects near treks when sensitive areas are created, modified or
+-- deleted (see trekking/sql/40_proximites.sql)
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS s_t_zone_sensible_proximites_iud_tgr ON s_t_zone_sensible;
+
+CREATE TRIGGER s_t_zone_sensible_proximites_iud_tgr
+AFTER INSERT OR UPDATE OF geom OR DELETE ON s_t_zone_sensible
+FOR EACH ROW EXECUTE PROCEDURE proximites_objet_iud('sensitivearea', 'id');
@@ -19,6 +19,8 @@ class SensitiveAreaEntityOptions(PublishableEntityOptions):
 
 
 urlpatterns = [
+    url(r'^api/sensitivearea/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$',
+        views.SensitiveAreaVectorTile.as_view(), name="sensitivearea_vector_tile"),
     url(r'^api/(?P<lang>\w\w)/sensitiveareas/(?P<pk>\d+).kml$',
         views.SensitiveAreaKMLDetail.as_view(), name="sensitivearea_kml_detail"),
 ]
@@ -1,7 +1,8 @@
 import json
 import logging
 from django.conf import settings
-from django.db.models import F, Case, When
+from django.db.models import F, Case, When, Value
+from django.db.models.functions import Coalesce
 from django.http import Http404, HttpResponse
 from django.views.generic.detail import BaseDetailView
 from mapentity.views import (MapEntityCreate, MapEntityUpdate, MapEntityLayer, MapEntityList, MapEntityDetail,
@@ -12,7 +13,7 @@ from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from geotrek.api.v2.functions import Transform, Buffer, GeometryType, Area
 from geotrek.authent.decorators import same_structure_required
 
-from geotrek.common.views import PublicOrReadPermMixin
+from geotrek.common.views import PublicOrReadPermMixin, VectorTileView
 from .filters import SensitiveAreaFilterSet
 from .forms import SensitiveAreaForm, RegulatorySensitiveAreaForm
 from .models import SensitiveArea, Species
@@ -32,6 +33,15 @@ class SensitiveAreaLayer(MapEntityLayer):
     properties = ['species', 'radius', 'published']
 
 
+class SensitiveAreaVectorTile(VectorTileView):
+    queryset = SensitiveArea.objects.existing()
+    properties = [('species', 'species__name'), ('radius', 'species_radius'), 'published']
+
+    def get_queryset(self):
+        qs = super(SensitiveAreaVectorTile, self).get_queryset()
+        return qs.annotate(species_radius=Coalesce('species__radius', Value(settings.SENSITIVITY_DEFAULT_RADIUS)))
+
+
 class SensitiveAreaList(MapEntityList):
     queryset = SensitiveArea.objects.existing()
     filterform = SensitiveAreaFilterSet
@@ -404,6 +404,9 @@ API_SRID = 4326
 # Extent in native projection (Toulouse area)
 SPATIAL_EXTENT = (105000, 6150000, 1100000, 7150000)
 
+# Number of cells along each axis of the grid partitioning layers cache over SPATIAL_EXTENT
+SPATIAL_CACHE_GRID_SIZE = 16
+
 
 MAPENTITY_CONFIG = {
     'TITLE': gettext_noop("Geotrek"),
@@ -563,6 +566,10 @@ PATH_MODEL_ENABLED = True
 
 
 TREKKING_TOPOLOGY_ENABLED = True
+# When topologies geometries are computed, after paths or path aggregations changes:
+# 'immediate', 'transaction' (once per topology, at commit)
+# or 'worker' (by ``update_topologies_geometry`` command)
+TOPOLOGY_GEOMETRY_UPDATE = 'immediate'
 FLATPAGES_ENABLED = True
 TOURISM_ENABLED = True
 
@@ -632,6 +639,7 @@ MOBILE_TILES_RADIUS_SMALL = 0.005  # ~500 m
 MOBILE_TILES_GLOBAL_ZOOMS = range(13)
 MOBILE_TILES_LOW_ZOOMS = range(13, 15)
 MOBILE_TILES_HIGH_ZOOMS = range(15, 17)
+MOBILE_TILES_CONCURRENCY = 4  # Number of tiles downloaded simultaneously
 MOBILE_CATEGORY_PICTO_SIZE = 32
 MOBILE_POI_PICTO_SIZE = 32
 MOBILE_INFORMATIONDESKTYPE_PICTO_SIZE = 32
@@ -38,6 +38,23 @@ class SignageCommandTest(TestCase):
         self.assertAlmostEqual(value[1].geom.x, -436345.505347, places=5)
         self.assertAlmostEqual(value[1].geom.y, 1176480.918334, places=5)
 
+    def test_load_signage_bulk(self):
+        output = StringIO()
+        StructureFactory.create(name='structure')
+        filename = os.path.join(os.path.dirname(__file__), 'data', 'signage.shp')
+        call_command('loadsignage', filename, type_default='label', name_default='name',
+                     condition_default='condition', structure_default='structure',
+                     description_default='description', year_default=2010, bulk=True, verbosity=2, stdout=output)
+        self.assertIn('2 objects created.', output.getvalue())
+        value = Signage.objects.filter(name='name').order_by('pk')
+        self.assertEquals(value.count(), 2)
+        self.assertEquals(2010, value[0].implantation_year)
+        self.assertEquals(value[0].type, value[1].type)
+        self.assertAlmostEqual(value[0].geom.x, -436345.704831, places=5)
+        self.assertAlmostEqual(value[0].geom.y, 1176487.742917, places=5)
+        self.assertAlmostEqual(value[1].geom.x, -436345.505347, places=5)
+        self.assertAlmostEqual(value[1].geom.y, 1176480.918334, places=5)
+
     def test_load_signage_multipoints(self):
         output = StringIO()
         structure = StructureFactory.create(name='structure')
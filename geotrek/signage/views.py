@@ -8,6 +8,7 @@ from mapentity.views import (MapEntityLayer, MapEntityList, MapEntityJsonList, M
 from geotrek.authent.decorators import same_structure_required
 from geotrek.common.views import FormsetMixin
 from geotrek.core.models import AltimetryMixin
+from geotrek.zoning.views import ZoningFormatListMixin
 
 from geotrek.signage.filters import SignageFilterSet, BladeFilterSet
 from geotrek.signage.forms import SignageForm, BladeForm, LineFormset
@@ -40,7 +41,7 @@ class SignageJsonList(MapEntityJsonList, SignageList):
     pass
 
 
-class SignageFormatList(MapEntityFormat, SignageList):
+class SignageFormatList(ZoningFormatListMixin, MapEntityFormat, SignageList):
     columns = [
         'id', 'structure', 'name', 'code', 'type', 'condition', 'description',
         'implantation_year', 'published', 'date_insert',
@@ -19,10 +19,12 @@ from rest_framework.views import APIView
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 
 from geotrek.authent.decorators import same_structure_required
+from geotrek.common.mixins import pictures_prefetch
 from geotrek.common.models import RecordSource, TargetPortal
 from geotrek.common.views import DocumentPublic, MarkupPublic
 from geotrek.tourism.serializers import TouristicContentCategorySerializer
 from geotrek.trekking.models import Trek
+from geotrek.zoning.views import ZoningFormatListMixin, ZoningViewSetMixin
 
 from .filters import TouristicContentFilterSet, TouristicEventFilterSet, TouristicEventApiFilterSet
 from .forms import TouristicContentForm, TouristicEventForm
@@ -54,7 +56,7 @@ class TouristicContentList(MapEntityList):
         return TouristicContentCategory.objects.filter(pk__in=used)
 
 
-class TouristicContentFormatList(MapEntityFormat, TouristicContentList):
+class TouristicContentFormatList(ZoningFormatListMixin, MapEntityFormat, TouristicContentList):
     columns = [
         'id', 'structure', 'eid', 'name', 'category', 'type1', 'type2', 'description_teaser',
         'description', 'themes', 'contact', 'email', 'website', 'practical_info',
@@ -169,7 +171,7 @@ class TouristicEventList(MapEntityList):
     columns = ['id', 'name', 'type', 'begin_date', 'end_date']
 
 
-class TouristicEventFormatList(MapEntityFormat, TouristicEventList):
+class TouristicEventFormatList(ZoningFormatListMixin, MapEntityFormat, TouristicEventList):
     columns = [
         'id', 'structure', 'eid', 'name', 'type', 'description_teaser', 'description', 'themes',
         'begin_date', 'end_date', 'duration', 'meeting_point', 'meeting_time',
@@ -263,14 +265,14 @@ class TouristicEventMeta(DetailView):
         return context
 
 
-class TouristicContentViewSet(MapEntityViewSet):
+class TouristicContentViewSet(ZoningViewSetMixin, MapEntityViewSet):
     model = TouristicContent
     serializer_class = TouristicContentSerializer
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
     def get_queryset(self):
         qs = TouristicContent.objects.existing()
-        qs = qs.filter(published=True)
+        qs = qs.filter(published=True).prefetch_related(pictures_prefetch())
 
         if 'source' in self.request.GET:
             qs = qs.filter(source__name__in=self.request.GET['source'].split(','))
@@ -296,7 +298,7 @@ class TouristicContentCategoryViewSet(MapEntityViewSet):
         return queryset
 
 
-class TouristicEventViewSet(MapEntityViewSet):
+class TouristicEventViewSet(ZoningViewSetMixin, MapEntityViewSet):
     model = TouristicEvent
     serializer_class = TouristicEventSerializer
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
@@ -305,7 +307,7 @@ class TouristicEventViewSet(MapEntityViewSet):
 
     def get_queryset(self):
         qs = TouristicEvent.objects.existing()
-        qs = qs.filter(published=True)
+        qs = qs.filter(published=True).prefetch_related(pictures_prefetch())
 
         if 'source' in self.request.GET:
             qs = qs.filter(source__name__in=self.request.GET['source'].split(','))
@@ -357,7 +359,7 @@ class TrekInformationDeskViewSet(viewsets.ModelViewSet):
         return trek.information_desks.all().transform(settings.API_SRID, field_name='geom')
 
 
-class TrekTouristicContentViewSet(viewsets.ModelViewSet):
+class TrekTouristicContentViewSet(ZoningViewSetMixin, viewsets.ModelViewSet):
     model = TouristicContent
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
@@ -390,7 +392,7 @@ class TrekTouristicContentViewSet(viewsets.ModelViewSet):
                                   field_name='geom')
 
 
-class TrekTouristicEventViewSet(viewsets.ModelViewSet):
+class TrekTouristicEventViewSet(ZoningViewSetMixin, viewsets.ModelViewSet):
     model = TouristicEvent
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
@@ -421,7 +423,7 @@ class TrekTouristicEventViewSet(viewsets.ModelViewSet):
 
 
 if 'geotrek.diving' in settings.INSTALLED_APPS:
-    class DiveTouristicContentViewSet(viewsets.ModelViewSet):
+    class DiveTouristicContentViewSet(ZoningViewSetMixin, viewsets.ModelViewSet):
         model = TouristicContent
         permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
@@ -453,7 +455,7 @@ if 'geotrek.diving' in settings.INSTALLED_APPS:
             return queryset.transform(settings.API_SRID,
                                       field_name='geom')
 
-    class DiveTouristicEventViewSet(viewsets.ModelViewSet):
+    class DiveTouristicEventViewSet(ZoningViewSetMixin, viewsets.ModelViewSet):
         model = TouristicEvent
         permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
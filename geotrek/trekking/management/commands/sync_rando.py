@@ -1,16 +1,26 @@
 # -*- encoding: UTF-8 -
 
+import copy
+import errno
+import hashlib
+import json
 import logging
 import filecmp
+import math
 import os
 import re
 import shutil
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 from time import sleep
 from zipfile import ZipFile
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.gis.geos import Polygon
+from django.core.cache import caches
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
 from django.db.models import Q
 from django.http import StreamingHttpResponse
 from django.test.client import RequestFactory
@@ -19,8 +29,9 @@ from django.utils.translation import ugettext as _
 from landez import TilesManager
 from landez.sources import DownloadError
 from geotrek.common.models import FileType  # NOQA
-from geotrek.altimetry.views import ElevationProfile, ElevationArea, serve_elevation_chart
+from geotrek.altimetry.views import ElevationProfile, ElevationArea, ElevationAreaBinary, serve_elevation_chart
 from geotrek.common import models as common_models
+from geotrek.common.mixins import pictures_prefetch
 from geotrek.common.views import ThemeViewSet
 from geotrek.core.views import ParametersView
 from geotrek.feedback.views import CategoryList as FeedbackCategoryList
@@ -36,6 +47,7 @@ from geotrek.trekking.views import (TrekViewSet, POIViewSet, TrekPOIViewSet,
                                     TrekGPXDetail, TrekKMLDetail, TrekServiceViewSet,
                                     ServiceViewSet, TrekDocumentPublic, TrekMeta, Meta,
                                     TrekInfrastructureViewSet, TrekSignageViewSet,)
+from geotrek.zoning.helpers import attach_zoning
 if 'geotrek.diving' in settings.INSTALLED_APPS:
     from geotrek.diving import models as diving_models
     from geotrek.diving import views as diving_views
@@ -50,11 +62,57 @@ from geotrek.tourism import urls  # NOQA
 
 logger = logging.getLogger(__name__)
 
+# Command running in worker processes (inherited on fork, see ``--jobs``)
+_pool_command = None
+
+# Outputs of synced objects, used by ``--incremental``
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def tile_polygon(z, x, y):
+    """
+    Extent of tile z/x/y (XYZ scheme) as a WGS84 polygon.
+    """
+    n = 2.0 ** z
+    lng_min = x / n * 360.0 - 180.0
+    lng_max = (x + 1) / n * 360.0 - 180.0
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    return Polygon.from_bbox((lng_min, lat_min, lng_max, lat_max))
+
+
+def corridor_tiles(geom, radius, zoomlevels):
+    """
+    Tiles (z, x, y) of ``zoomlevels`` intersecting the corridor of ``radius``
+    degrees around ``geom`` (in WGS84, all parts of multi-geometries).
+
+    The corridor is built once, then tiles are subdivided from zoom level 0,
+    testing only children of tiles intersecting it at each level.
+    """
+    zoomlevels = set(zoomlevels)
+    if not zoomlevels or geom.empty:
+        return set()
+    corridor = geom.buffer(radius).prepared
+    tiles = set()
+    candidates = [(0, 0)]
+    for z in range(max(zoomlevels) + 1):
+        covered = [(x, y) for (x, y) in candidates if corridor.intersects(tile_polygon(z, x, y))]
+        if z in zoomlevels:
+            tiles.update((z, x, y) for (x, y) in covered)
+        candidates = [(2 * x + dx, 2 * y + dy) for (x, y) in covered for dx in (0, 1) for dy in (0, 1)]
+    return tiles
+
 
 class ZipTilesBuilder(object):
-    def __init__(self, zipfile, prefix="", **builder_args):
+    """
+    Download tiles with a pool of threads (tiles are cached on disk by landez,
+    in ``tiles_dir``), and write them in the zip file from the calling thread.
+    """
+    def __init__(self, zipfile, prefix="", concurrency=None, **builder_args):
         self.zipfile = zipfile
         self.prefix = prefix
+        self.concurrency = concurrency or settings.MOBILE_TILES_CONCURRENCY
         builder_args['tile_format'] = self.format_from_url(builder_args['tiles_url'])
         self.tm = TilesManager(**builder_args)
 
@@ -81,19 +139,148 @@ class ZipTilesBuilder(object):
     def add_coverage(self, bbox, zoomlevels):
         self.tiles |= set(self.tm.tileslist(bbox, zoomlevels))
 
+    def add_corridor(self, geom, radius, zoomlevels):
+        """
+        Add tiles around ``geom`` (in WGS84), see ``corridor_tiles()``.
+        """
+        self.tiles |= corridor_tiles(geom, radius, zoomlevels)
+
+    def fetch(self, tile):
+        name = '{prefix}{0}/{1}/{2}{ext}'.format(
+            *tile,
+            prefix=self.prefix,
+            ext=settings.MOBILE_TILES_EXTENSION or self.tm._tile_extension
+        )
+        try:
+            data = self.tm.tile(tile)
+        except DownloadError:
+            logger.warning("Failed to download tile %s" % name)
+            data = None
+        return name, data
+
     def run(self):
-        for tile in self.tiles:
-            name = '{prefix}{0}/{1}/{2}{ext}'.format(
-                *tile,
-                prefix=self.prefix,
-                ext=settings.MOBILE_TILES_EXTENSION or self.tm._tile_extension
-            )
-            try:
-                data = self.tm.tile(tile)
-            except DownloadError:
-                logger.warning("Failed to download tile %s" % name)
-            else:
-                self.zipfile.writestr(name, data)
+        if not self.tiles:
+            return
+        pool = ThreadPool(min(self.concurrency, len(self.tiles)))
+        try:
+            for name, data in pool.imap_unordered(self.fetch, sorted(self.tiles)):
+                if data is not None:
+                    self.zipfile.writestr(name, data)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def _replace_2028(chunks):
+    """
+    Replace escaped unicode characters 2028 and 2029 by line feeds in a
+    stream of chunks (escape sequences may span two chunks).
+    """
+    tail = b''
+    for chunk in chunks:
+        chunk = (tail + chunk).replace('\\u2028', '\\n').replace('\\u2029', '\\n')
+        tail = chunk[-5:]
+        yield chunk[:-5]
+    yield tail
+
+
+def response_chunks(response, fix2028=False):
+    """
+    Content of ``response`` chunk by chunk, without loading streaming
+    responses in memory.
+    Strange unicode characters 2028 and 2029 make Geotrek-rando and
+    Geotrek-mobile crash: ``fix2028`` replaces them by line feeds.
+    """
+    if isinstance(response, StreamingHttpResponse):
+        chunks = response.streaming_content
+    else:
+        chunks = [response.content]
+    if fix2028:
+        chunks = _replace_2028(chunks)
+    return chunks
+
+
+class ExportZipFile(ZipFile):
+    """
+    Zip file of synced files, with an index of entries names (``namelist()``
+    builds a new list on each call).
+    """
+    def __init__(self, *args, **kwargs):
+        super(ExportZipFile, self).__init__(*args, **kwargs)
+        self.names = set(self.namelist())
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def write(self, *args, **kwargs):
+        super(ExportZipFile, self).write(*args, **kwargs)
+        self.names.add(self.filelist[-1].filename)
+
+    def writestr(self, *args, **kwargs):
+        super(ExportZipFile, self).writestr(*args, **kwargs)
+        self.names.add(self.filelist[-1].filename)
+
+    def close_or_reuse(self, previous):
+        """
+        Close the zip file, and replace it by a link to the ``previous`` one if
+        they have the same entries. Returns True in that case.
+        """
+        try:
+            previous_zipfile = ZipFile(previous, 'r')
+        except IOError:
+            uptodate = False
+        else:
+            old = set([(zi.filename, zi.CRC) for zi in previous_zipfile.infolist()])
+            new = set([(zi.filename, zi.CRC) for zi in self.infolist()])
+            uptodate = (old == new)
+            previous_zipfile.close()
+
+        self.close()
+        if uptodate:
+            os.unlink(self.filename)
+            os.link(previous, self.filename)
+        return uptodate
+
+
+class ZipEntries(object):
+    """
+    Stands for a zip file in worker processes: entries are recorded and
+    added to the actual zip file by the main process.
+    """
+    def __init__(self):
+        self.entries = []
+        self.names = set()
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def write(self, filename, arcname=None):
+        self.entries.append((filename, arcname))
+        self.names.add(arcname)
+
+
+def _init_worker():
+    # Do not share cache connections with the main process
+    for cache in caches.all():
+        cache.close()
+
+
+def _sync_trek_unit(unit):
+    """
+    Sync a trek in a worker process.
+    Returns success flag, entries to add to language global zip file and
+    manifest entry.
+    """
+    lang, pk = unit
+    command = copy.copy(_pool_command)
+    command.successfull = True
+    command.zipfile = ZipEntries()
+    translation.activate(lang)
+    try:
+        manifest_entry = command.sync_trek_unit(lang, trekking_models.Trek.objects.get(pk=pk))
+    finally:
+        translation.deactivate()
+    return command.successfull, command.zipfile.entries, manifest_entry
 
 
 class Command(BaseCommand):
@@ -124,11 +311,20 @@ class Command(BaseCommand):
                             default=False, help='include infrastructures')
         parser.add_argument('--with-dives', action='store_true', dest='with_dives',
                             default=False, help='include dives')
+        parser.add_argument('--jobs', '-j', dest='jobs', type=int, default=1,
+                            help='Number of processes syncing treks in parallel')
+        parser.add_argument('--incremental', action='store_true', dest='incremental', default=False,
+                            help='Reuse previous files of treks which did not change')
 
     def mkdirs(self, name):
         dirname = os.path.dirname(name)
         if not os.path.exists(dirname):
-            os.makedirs(dirname)
+            try:
+                os.makedirs(dirname)
+            except OSError as e:
+                # Created meanwhile by another worker
+                if e.errno != errno.EEXIST:
+                    raise
 
     def sync_global_tiles(self):
         """ Creates a tiles file on the global extent.
@@ -147,7 +343,7 @@ class Command(BaseCommand):
         logger.info("Build global tiles file...")
         self.mkdirs(global_file)
 
-        zipfile = ZipFile(global_file, 'w')
+        zipfile = ExportZipFile(global_file, 'w')
         tiles = ZipTilesBuilder(zipfile, **self.builder_args)
         tiles.add_coverage(bbox=global_extent,
                            zoomlevels=settings.MOBILE_TILES_GLOBAL_ZOOMS)
@@ -165,25 +361,14 @@ class Command(BaseCommand):
 
         trek_file = os.path.join(self.tmp_root, zipname)
 
-        def _radius2bbox(lng, lat, radius):
-            return (lng - radius, lat - radius,
-                    lng + radius, lat + radius)
-
         self.mkdirs(trek_file)
 
-        zipfile = ZipFile(trek_file, 'w')
+        zipfile = ExportZipFile(trek_file, 'w')
         tiles = ZipTilesBuilder(zipfile, **self.builder_args)
 
-        geom = trek.geom
-        if geom.geom_type == 'MultiLineString':
-            geom = geom[0]  # FIXME
-        geom.transform(4326)
-
-        for (lng, lat) in geom.coords:
-            large = _radius2bbox(lng, lat, settings.MOBILE_TILES_RADIUS_LARGE)
-            small = _radius2bbox(lng, lat, settings.MOBILE_TILES_RADIUS_SMALL)
-            tiles.add_coverage(bbox=large, zoomlevels=settings.MOBILE_TILES_LOW_ZOOMS)
-            tiles.add_coverage(bbox=small, zoomlevels=settings.MOBILE_TILES_HIGH_ZOOMS)
+        geom = trek.geom.transform(4326, clone=True)
+        tiles.add_corridor(geom, settings.MOBILE_TILES_RADIUS_LARGE, settings.MOBILE_TILES_LOW_ZOOMS)
+        tiles.add_corridor(geom, settings.MOBILE_TILES_RADIUS_SMALL, settings.MOBILE_TILES_HIGH_ZOOMS)
 
         tiles.run()
         self.close_zip(zipfile, zipname)
@@ -213,17 +398,9 @@ class Command(BaseCommand):
             if self.verbosity == 2:
                 self.stdout.write(u"\x1b[3D\x1b[31;1mfailed (HTTP {code})\x1b[0m".format(code=response.status_code))
             return
-        f = open(fullname, 'w')
-        if isinstance(response, StreamingHttpResponse):
-            content = b''.join(response.streaming_content)
-        else:
-            content = response.content
-        # Fix strange unicode characters 2028 and 2029 that make Geotrek-rando crash
-        if fix2028:
-            content = content.replace('\\u2028', '\\n')
-            content = content.replace('\\u2029', '\\n')
-        f.write(content)
-        f.close()
+        with open(fullname, 'wb') as f:
+            for chunk in response_chunks(response, fix2028):
+                f.write(chunk)
         oldfilename = os.path.join(self.dst_root, name)
         # If new file is identical to old one, don't recreate it. This will help backup
         if os.path.isfile(oldfilename) and filecmp.cmp(fullname, oldfilename):
@@ -235,9 +412,9 @@ class Command(BaseCommand):
             if self.verbosity == 2:
                 self.stdout.write(u"\x1b[3D\x1b[32mgenerated\x1b[0m")
         # FixMe: Find why there are duplicate files.
-        if zipfile:
-            if name not in zipfile.namelist():
-                zipfile.write(fullname, name)
+        if zipfile is not None and name not in zipfile:
+            zipfile.write(fullname, name)
+        self.add_output(name, zipfile)
 
     def sync_json(self, lang, viewset, name, zipfile=None, params={}, as_view_args=[], **kwargs):
         view = viewset.as_view(*as_view_args)
@@ -315,6 +492,8 @@ class Command(BaseCommand):
             return
         view = ElevationArea.as_view(model=type(obj))
         self.sync_object_view(lang, obj, view, 'dem.json')
+        view = ElevationAreaBinary.as_view(model=type(obj))
+        self.sync_object_view(lang, obj, view, 'dem.bin')
 
     def sync_gpx(self, lang, obj):
         self.sync_object_view(lang, obj, TrekGPXDetail.as_view(), '{obj.slug}.gpx')
@@ -356,9 +535,15 @@ class Command(BaseCommand):
                 self.stdout.write(u"\x1b[36m{lang}\x1b[0m \x1b[1m{url}/{name}\x1b[0m \x1b[31mfile does not exist\x1b[0m".format(lang=lang, url=url, name=name))
             return
         if not os.path.isfile(dst):
-            os.link(src, dst)
+            try:
+                os.link(src, dst)
+            except OSError as e:
+                # Linked meanwhile by another worker
+                if e.errno != errno.EEXIST:
+                    raise
         if zipfile:
             zipfile.write(dst, os.path.join(url, name))
+        self.add_output(os.path.join(url, name), zipfile)
         if self.verbosity == 2:
             self.stdout.write(u"\x1b[36m{lang}\x1b[0m \x1b[1m{url}/{name}\x1b[0m \x1b[32mcopied\x1b[0m".format(lang=lang, url=url, name=name))
 
@@ -385,10 +570,8 @@ class Command(BaseCommand):
         zipname = os.path.join('zip', 'treks', lang, '{pk}.zip'.format(pk=trek.pk))
         zipfullname = os.path.join(self.tmp_root, zipname)
         self.mkdirs(zipfullname)
-        self.trek_zipfile = ZipFile(zipfullname, 'w')
+        self.trek_zipfile = ExportZipFile(zipfullname, 'w')
 
-        self.sync_json(lang, ParametersView, 'parameters', zipfile=self.zipfile)
-        self.sync_json(lang, ThemeViewSet, 'themes', as_view_args=[{'get': 'list'}], zipfile=self.zipfile)
         self.sync_trek_pois(lang, trek, zipfile=self.zipfile)
         if self.with_infrastructures:
             self.sync_trek_infrastructures(lang, trek)
@@ -425,24 +608,141 @@ class Command(BaseCommand):
                               ending="")
 
         self.close_zip(self.trek_zipfile, zipname)
+        self.add_output(zipname)
 
-    def close_zip(self, zipfile, name):
-        oldzipfilename = os.path.join(self.dst_root, name)
-        zipfilename = os.path.join(self.tmp_root, name)
+    def sync_trek_unit(self, lang, trek):
+        """
+        Sync a trek, or reuse its previous files if it did not change (incremental mode).
+        Returns its manifest entry as (key, entry).
+        """
+        if not self.incremental:
+            self.sync_trek(lang, trek)
+            return None
+        key = '{lang}/{pk}'.format(lang=lang, pk=trek.pk)
+        signature = self.trek_signature(lang, trek)
+        previous = self.previous_manifest.get(key)
+        if previous and previous['signature'] == signature and self.reuse_outputs(previous['outputs']):
+            if self.verbosity == 2:
+                self.stdout.write(u"\x1b[36m{lang}\x1b[0m \x1b[1mtrek {pk}\x1b[0m \x1b[32munchanged\x1b[0m".format(
+                    lang=lang, pk=trek.pk))
+            return key, previous
+        successfull, self.successfull = self.successfull, True
+        self.outputs = []
         try:
-            oldzipfile = ZipFile(oldzipfilename, 'r')
-        except IOError:
-            uptodate = False
-        else:
-            old = set([(zi.filename, zi.CRC) for zi in oldzipfile.infolist()])
-            new = set([(zi.filename, zi.CRC) for zi in zipfile.infolist()])
-            uptodate = (old == new)
-            oldzipfile.close()
+            self.sync_trek(lang, trek)
+            # Failed treks will be synced again next time
+            entry = {'signature': signature, 'outputs': self.outputs} if self.successfull else None
+        finally:
+            self.successfull = successfull and self.successfull
+            self.outputs = None
+        return key, entry
+
+    def sync_treks(self, lang, treks):
+        if self.jobs <= 1:
+            for trek in treks:
+                self.add_to_manifest(self.sync_trek_unit(lang, trek))
+            return
+        units = [(lang, trek.pk) for trek in treks]
+        for successfull, entries, manifest_entry in self.pool.imap(_sync_trek_unit, units):
+            self.successfull = self.successfull and successfull
+            for filename, name in entries:
+                if name not in self.zipfile:
+                    self.zipfile.write(filename, name)
+            self.add_to_manifest(manifest_entry)
+
+    def add_output(self, name, zipfile=None):
+        """ Record a file generated while syncing a trek in incremental mode.
+        """
+        if self.outputs is not None:
+            self.outputs.append((name, zipfile is not None and zipfile is self.zipfile))
 
-        zipfile.close()
-        if uptodate:
-            stat = os.stat(oldzipfilename)
-            os.utime(zipfilename, (stat.st_atime, stat.st_mtime))
+    def reuse_outputs(self, outputs):
+        """ Link previous files of a trek into the new tree.
+        Returns False if some of them are missing.
+        """
+        for name, in_global_zip in outputs:
+            if not os.path.isfile(os.path.join(self.dst_root, name)):
+                return False
+        for name, in_global_zip in outputs:
+            dst = os.path.join(self.tmp_root, name)
+            self.mkdirs(dst)
+            if not os.path.isfile(dst):
+                try:
+                    os.link(os.path.join(self.dst_root, name), dst)
+                except OSError as e:
+                    # Linked meanwhile by another worker
+                    if e.errno != errno.EEXIST:
+                        raise
+            if in_global_zip and name not in self.zipfile:
+                self.zipfile.write(dst, name)
+        return True
+
+    def trek_signature(self, lang, trek):
+        """ Hash of the trek and of the objects its files depend on.
+        """
+        def stamps(objects):
+            return [(obj.pk, obj.date_update) for obj in objects]
+
+        pois = list(trek.published_pois)
+        attachments = []
+        for obj in [trek] + pois:
+            attachments.extend((attachment.pk, attachment.date_update) for attachment in obj.attachments.all())
+        parts = [self.options_signature, lang, trek.pk, trek.date_update, trek.parents_id,
+                 list(trek.children_id), stamps(pois), attachments, stamps(trek.published_services),
+                 list(trek.information_desks.values_list('pk', flat=True))]
+        if self.with_infrastructures:
+            parts.append(stamps(trek.published_infrastructures))
+        if self.with_signages:
+            parts.append(stamps(trek.published_signages))
+        if self.with_events:
+            parts.append(stamps(trek.touristic_events))
+        if self.categories:
+            parts.append(stamps(trek.touristic_contents))
+        if 'geotrek.sensitivity' in settings.INSTALLED_APPS:
+            parts.append(stamps(trek.published_sensitive_areas))
+        return hashlib.md5(json.dumps(parts, default=str)).hexdigest()
+
+    @property
+    def options_signature(self):
+        return [self.referer, self.rando_url, self.source, self.portal, self.skip_pdf, self.skip_dem,
+                self.skip_profile_png, self.with_events, self.categories, self.with_signages,
+                self.with_infrastructures]
+
+    def add_to_manifest(self, manifest_entry):
+        if manifest_entry is not None:
+            key, entry = manifest_entry
+            if entry is not None:
+                self.manifest[key] = entry
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.dst_root, MANIFEST_NAME), 'r') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest['treks']
+
+    def save_manifest(self):
+        with open(os.path.join(self.tmp_root, MANIFEST_NAME), 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'treks': self.manifest}, f)
+
+    def prepare_pictures(self):
+        """ Generate thumbnails before syncing treks in parallel, since
+        pictures (of POIs mainly) are shared between treks.
+        """
+        treks = trekking_models.Trek.objects.existing().prefetch_related(pictures_prefetch())
+        if self.source:
+            treks = treks.filter(source__name__in=self.source)
+        for trek in treks:
+            trek.resized_pictures
+            trek.thumbnail
+            for poi in trek.published_pois:
+                poi.resized_pictures
+
+    def close_zip(self, zipfile, name):
+        uptodate = zipfile.close_or_reuse(os.path.join(self.dst_root, name))
 
         if self.verbosity == 2:
             if uptodate:
@@ -465,7 +765,7 @@ class Command(BaseCommand):
         zipname = os.path.join('zip', 'treks', lang, 'global.zip')
         zipfullname = os.path.join(self.tmp_root, zipname)
         self.mkdirs(zipfullname)
-        self.zipfile = ZipFile(zipfullname, 'w')
+        self.zipfile = ExportZipFile(zipfullname, 'w')
 
         self.sync_geojson(lang, TrekViewSet, 'treks.geojson', zipfile=self.zipfile)
         self.sync_geojson(lang, POIViewSet, 'pois.geojson')
@@ -513,8 +813,14 @@ class Command(BaseCommand):
         if self.portal:
             treks = treks.filter(Q(portal__name__in=self.portal) | Q(portal=None))
 
-        for trek in treks:
-            self.sync_trek(lang, trek)
+        treks = list(treks)
+        # Compute elevation profiles and zoning once for all languages
+        trekking_models.Trek.cache_elevation_profiles(treks)
+        attach_zoning(treks)
+
+        self.sync_json(lang, ParametersView, 'parameters', zipfile=self.zipfile)
+        self.sync_json(lang, ThemeViewSet, 'themes', as_view_args=[{'get': 'list'}], zipfile=self.zipfile)
+        self.sync_treks(lang, treks)
 
         if self.with_dives:
             self.sync_dives(lang)
@@ -800,6 +1106,31 @@ class Command(BaseCommand):
     def sync(self):
         self.sync_tiles()
 
+        if self.jobs > 1:
+            global _pool_command
+            self.prepare_pictures()
+            _pool_command = self
+            # Each worker opens its own database connection
+            connections.close_all()
+            self.pool = Pool(self.jobs, initializer=_init_worker)
+        try:
+            self.sync_languages()
+        finally:
+            if self.jobs > 1:
+                # All treks are synced (or sync failed)
+                self.pool.terminate()
+                self.pool.join()
+
+        self.sync_static_file('**', 'tourism/touristicevent.svg')
+        self.sync_pictograms('**', tourism_models.InformationDeskType)
+        self.sync_pictograms('**', tourism_models.TouristicContentCategory)
+        self.sync_pictograms('**', tourism_models.TouristicContentType)
+        self.sync_pictograms('**', tourism_models.TouristicEventType)
+
+        if self.incremental:
+            self.save_manifest()
+
+    def sync_languages(self):
         step_value = int(50 / len(settings.MODELTRANSLATION_LANGUAGES))
         current_value = 30
 
@@ -820,17 +1151,11 @@ class Command(BaseCommand):
             self.sync_trekking(lang)
             translation.deactivate()
 
-        self.sync_static_file('**', 'tourism/touristicevent.svg')
-        self.sync_pictograms('**', tourism_models.InformationDeskType)
-        self.sync_pictograms('**', tourism_models.TouristicContentCategory)
-        self.sync_pictograms('**', tourism_models.TouristicContentType)
-        self.sync_pictograms('**', tourism_models.TouristicEventType)
-
     def check_dst_root_is_empty(self):
         if not os.path.exists(self.dst_root):
             return
         existing = set([os.path.basename(p) for p in os.listdir(self.dst_root)])
-        remaining = existing - set(('api', 'media', 'meta', 'static', 'zip'))
+        remaining = existing - set(('api', 'media', 'meta', 'static', 'zip', MANIFEST_NAME))
         if remaining:
             raise CommandError(u"Destination directory contains extra data")
 
@@ -881,6 +1206,11 @@ class Command(BaseCommand):
         self.with_signages = options.get('with_signages', False)
         self.with_infrastructures = options.get('with_infrastructures', False)
         self.with_dives = options.get('with_dives', False)
+        self.jobs = options.get('jobs', 1)
+        self.incremental = options.get('incremental', False)
+        self.previous_manifest = self.load_manifest() if self.incremental else {}
+        self.manifest = {}
+        self.outputs = None
         self.celery_task = options.get('task', None)
 
         if self.source is not None:
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.14 on 2026-10-18 15:10
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trekking', '0009_auto_20190809_1146'),
+    ]
+
+    operations = [
+        # Relations are computed when loading SQL files (see sql/40_proximites.sql)
+        migrations.CreateModel(
+            name='TrekProximity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(db_column=b'type', max_length=32)),
+                ('object_id', models.IntegerField(db_column=b'objet')),
+                ('distance', models.FloatField(db_column=b'distance')),
+                ('position', models.FloatField(db_column=b'position', null=True)),
+                ('trek', models.ForeignKey(db_column=b'itineraire', on_delete=django.db.models.deletion.CASCADE, related_name='proximities', to='trekking.Trek')),
+            ],
+            options={
+                'db_table': 'o_r_itineraire_proximite',
+                'verbose_name': 'Trek proximity',
+                'verbose_name_plural': 'Trek proximities',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='trekproximity',
+            unique_together=set([('trek', 'kind', 'object_id')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='trekproximity',
+            index_together=set([('kind', 'object_id')]),
+        ),
+    ]
@@ -5,7 +5,7 @@ from django.conf import settings
 from django.contrib.gis.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from django.db.models import F, Value
+from django.db.models import F, OuterRef, Subquery, Value
 from django.template.defaultfilters import slugify
 from django.utils.translation import get_language, ugettext, ugettext_lazy as _
 from django.urls import reverse
@@ -21,6 +21,7 @@ from geotrek.common.utils import intersecting, classproperty
 from geotrek.common.mixins import (PicturesMixin, PublishableMixin,
                                    PictogramMixin, OptionalPictogramMixin)
 from geotrek.common.models import Theme
+from geotrek.common.vector_tiles import connect_vector_tiles_invalidation
 from geotrek.maintenance.models import Intervention, Project
 from geotrek.tourism import models as tourism_models
 
@@ -189,14 +190,7 @@ class Trek(StructureRelated, PicturesMixin, PublishableMixin, MapEntityMixin, To
 
     @property
     def poi_types(self):
-        if settings.TREKKING_TOPOLOGY_ENABLED:
-            # Can't use values_list and must add 'ordering' because of bug:
-            # https://code.djangoproject.com/ticket/14930
-            values = self.pois.values('ordering', 'type')
-        else:
-            values = self.pois.values('type')
-        pks = [value['type'] for value in values]
-        return POIType.objects.filter(pk__in=set(pks))
+        return POIType.objects.filter(pk__in=self.pois.order_by().values('type'))
 
     @property
     def length_kilometer(self):
@@ -272,6 +266,12 @@ class Trek(StructureRelated, PicturesMixin, PublishableMixin, MapEntityMixin, To
 
     @classmethod
     def topology_treks(cls, topology):
+        if isinstance(topology, (POI, Service)):
+            proximities = {'proximities__kind': topology._meta.model_name,
+                           'proximities__object_id': topology.pk}
+            if not settings.TREKKING_TOPOLOGY_ENABLED:
+                proximities['proximities__distance__lte'] = settings.TREK_POI_INTERSECTION_MARGIN
+            return cls.objects.existing().filter(**proximities)
         if settings.TREKKING_TOPOLOGY_ENABLED:
             qs = cls.overlapping(topology)
         else:
@@ -365,6 +365,21 @@ class Trek(StructureRelated, PicturesMixin, PublishableMixin, MapEntityMixin, To
         else:
             return settings.TOURISM_INTERSECTION_MARGIN
 
+    def nearby(self, model, distance=None):
+        """
+        Objects of ``model`` near the trek (within ``distance`` if given),
+        ordered along the trek. They are read from ``TrekProximity`` instead
+        of being computed again.
+        """
+        proximities = TrekProximity.objects.filter(trek=self, kind=model._meta.model_name)
+        if distance is not None:
+            proximities = proximities.filter(distance__lte=distance)
+        position = proximities.filter(object_id=OuterRef('pk')).values('position')[:1]
+        qs = model.objects.existing() if hasattr(model.objects, 'existing') else model.objects.all()
+        qs = qs.filter(pk__in=proximities.values('object_id'))
+        qs = qs.annotate(proximity_position=Subquery(position, output_field=models.FloatField()))
+        return qs.order_by('proximity_position')
+
     def is_public(self):
         for parent in self.parents:
             if parent.any_published:
@@ -436,6 +451,14 @@ class Trek(StructureRelated, PicturesMixin, PublishableMixin, MapEntityMixin, To
         return {"maplayers": maplayers}
 
 
+# Touristic contents and events near treks are materialized (see TrekProximity)
+Trek.touristic_contents = property(lambda self: self.nearby(tourism_models.TouristicContent,
+                                                            self.distance(tourism_models.TouristicContent)))
+Trek.published_touristic_contents = property(lambda self: self.touristic_contents.filter(published=True))
+Trek.touristic_events = property(lambda self: self.nearby(tourism_models.TouristicEvent,
+                                                          self.distance(tourism_models.TouristicEvent)))
+Trek.published_touristic_events = property(lambda self: self.touristic_events.filter(published=True))
+
 Path.add_property('treks', Trek.path_treks, _(u"Treks"))
 Topology.add_property('treks', Trek.topology_treks, _(u"Treks"))
 if settings.HIDE_PUBLISHED_TREKS_IN_TOPOLOGIES:
@@ -443,7 +466,11 @@ if settings.HIDE_PUBLISHED_TREKS_IN_TOPOLOGIES:
 else:
     Topology.add_property('published_treks', lambda self: intersecting(Trek, self).filter(published=True), _(u"Published treks"))
 Intervention.add_property('treks', lambda self: self.topology.treks if self.topology else [], _(u"Treks"))
-Project.add_property('treks', lambda self: self.edges_by_attr('treks'), _(u"Treks"))
+if settings.TREKKING_TOPOLOGY_ENABLED:
+    Project.add_property('treks', lambda self: self.edges_by_attr(Trek), _(u"Treks"))
+else:
+    Project.add_property('treks', lambda self: intersecting(Trek, self, distance=settings.TREK_POI_INTERSECTION_MARGIN),
+                         _(u"Treks"))
 tourism_models.TouristicContent.add_property('treks', lambda self: intersecting(Trek, self), _(u"Treks"))
 tourism_models.TouristicContent.add_property('published_treks', lambda self: intersecting(Trek, self).filter(published=True), _(u"Published treks"))
 tourism_models.TouristicEvent.add_property('treks', lambda self: intersecting(Trek, self), _(u"Treks"))
@@ -497,6 +524,29 @@ class TrekRelationship(models.Model):
         return self.relation
 
 
+class TrekProximity(models.Model):
+    """
+    Objects near treks (POIs, services, touristic contents and events, sensitive
+    areas), with their distance and position along the trek.
+    Maintained by triggers when treks or objects are modified.
+    """
+    trek = models.ForeignKey(Trek, related_name="proximities", db_column='itineraire')
+    kind = models.CharField(max_length=32, db_column='type')
+    object_id = models.IntegerField(db_column='objet')
+    distance = models.FloatField(db_column='distance')
+    position = models.FloatField(null=True, db_column='position')
+
+    class Meta:
+        db_table = 'o_r_itineraire_proximite'
+        verbose_name = _(u"Trek proximity")
+        verbose_name_plural = _(u"Trek proximities")
+        unique_together = ('trek', 'kind', 'object_id')
+        index_together = ('kind', 'object_id')
+
+    def __unicode__(self):
+        return u"%s <--> %s %s" % (self.trek, self.kind, self.object_id)
+
+
 class TrekNetwork(PictogramMixin):
     network = models.CharField(verbose_name=_(u"Name"), max_length=128, db_column='reseau')
 
@@ -704,6 +754,9 @@ class POI(StructureRelated, PicturesMixin, PublishableMixin, MapEntityMixin, Top
 
     @classmethod
     def topology_all_pois(cls, topology):
+        if isinstance(topology, Trek):
+            return topology.nearby(cls, None if settings.TREKKING_TOPOLOGY_ENABLED
+                                   else settings.TREK_POI_INTERSECTION_MARGIN)
         if settings.TREKKING_TOPOLOGY_ENABLED:
             qs = cls.overlapping(topology)
         else:
@@ -742,7 +795,11 @@ Topology.add_property('pois', POI.topology_pois, _(u"POIs"))
 Topology.add_property('all_pois', POI.topology_all_pois, _(u"POIs"))
 Topology.add_property('published_pois', POI.published_topology_pois, _(u"Published POIs"))
 Intervention.add_property('pois', lambda self: self.topology.pois if self.topology else [], _(u"POIs"))
-Project.add_property('pois', lambda self: self.edges_by_attr('pois'), _(u"POIs"))
+if settings.TREKKING_TOPOLOGY_ENABLED:
+    Project.add_property('pois', lambda self: self.edges_by_attr(POI), _(u"POIs"))
+else:
+    Project.add_property('pois', lambda self: intersecting(POI, self, distance=settings.TREK_POI_INTERSECTION_MARGIN),
+                         _(u"POIs"))
 tourism_models.TouristicContent.add_property('pois', lambda self: intersecting(POI, self), _(u"POIs"))
 tourism_models.TouristicContent.add_property('published_pois', lambda self: intersecting(POI, self).filter(published=True), _(u"Published POIs"))
 tourism_models.TouristicEvent.add_property('pois', lambda self: intersecting(POI, self), _(u"POIs"))
@@ -838,7 +895,10 @@ class Service(StructureRelated, MapEntityMixin, Topology):
 
     @classmethod
     def topology_services(cls, topology):
-        if settings.TREKKING_TOPOLOGY_ENABLED:
+        if isinstance(topology, Trek):
+            qs = topology.nearby(cls, None if settings.TREKKING_TOPOLOGY_ENABLED
+                                 else settings.TREK_POI_INTERSECTION_MARGIN)
+        elif settings.TREKKING_TOPOLOGY_ENABLED:
             qs = cls.overlapping(topology)
         else:
             area = topology.geom.buffer(settings.TREK_POI_INTERSECTION_MARGIN)
@@ -859,8 +919,16 @@ Path.add_property('services', Service.path_services, _(u"Services"))
 Topology.add_property('services', Service.topology_services, _(u"Services"))
 Topology.add_property('published_services', Service.published_topology_services, _(u"Published Services"))
 Intervention.add_property('services', lambda self: self.topology.services if self.topology else [], _(u"Services"))
-Project.add_property('services', lambda self: self.edges_by_attr('services'), _(u"Services"))
+if settings.TREKKING_TOPOLOGY_ENABLED:
+    Project.add_property('services', lambda self: self.edges_by_attr(Service), _(u"Services"))
+else:
+    Project.add_property('services', lambda self: intersecting(Service, self, distance=settings.TREK_POI_INTERSECTION_MARGIN),
+                         _(u"Services"))
 tourism_models.TouristicContent.add_property('services', lambda self: intersecting(Service, self), _(u"Services"))
 tourism_models.TouristicContent.add_property('published_services', lambda self: intersecting(Service, self).filter(published=True), _(u"Published Services"))
 tourism_models.TouristicEvent.add_property('services', lambda self: intersecting(Service, self), _(u"Services"))
 tourism_models.TouristicEvent.add_property('published_services', lambda self: intersecting(Service, self).filter(published=True), _(u"Published Services"))
+
+
+connect_vector_tiles_invalidation(Trek, ['trek'])
+connect_vector_tiles_invalidation(POI, ['poi'])
@@ -0,0 +1,205 @@
+-------------------------------------------------------------------------------
+-- Objects near treks (POIs, services, touristic contents and events, sensitive
+-- areas), see TrekProximity model.
+--
+-- Relations are stored within the largest margin, accessors filter them
+-- according to current settings and trek practice.
+-------------------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION rando.update_proximites(kind varchar, trek integer, obj integer) RETURNS void SECURITY DEFINER AS $$
+DECLARE
+    objects varchar;
+    margin varchar;
+    condition varchar;
+BEGIN
+    -- Compute relations of the given trek, or of the given object
+    DELETE FROM o_r_itineraire_proximite WHERE type = kind AND (itineraire = trek OR objet = obj);
+
+    IF kind IN ('poi', 'service') AND {{TREKKING_TOPOLOGY_ENABLED}} THEN
+        -- Topologies sharing paths with the trek, ordered like TopologyHelper.overlapping()
+        IF trek IS NOT NULL THEN
+            condition := 'ta.evenement = $2';
+        ELSE
+            condition := 'oa.evenement = $3';
+        END IF;
+        EXECUTE 'INSERT INTO o_r_itineraire_proximite (itineraire, type, objet, distance, position)
+                 SELECT ta.evenement, $1, oa.evenement, 0,
+                        min(ta.ordre + CASE WHEN ta.pk_debut > ta.pk_fin THEN 1 - oa.pk_debut ELSE oa.pk_debut END)
+                 FROM e_r_evenement_troncon ta
+                 JOIN o_t_itineraire i ON i.evenement = ta.evenement
+                 JOIN e_r_evenement_troncon oa ON oa.troncon = ta.troncon
+                 JOIN e_t_evenement o ON o.id = oa.evenement AND o.kind = upper($1)
+                 WHERE ' || condition || '
+                   AND least(oa.pk_debut, oa.pk_fin) <= greatest(ta.pk_debut, ta.pk_fin)
+                   AND greatest(oa.pk_debut, oa.pk_fin) >= least(ta.pk_debut, ta.pk_fin)
+                 GROUP BY ta.evenement, oa.evenement'
+        USING kind, trek, obj;
+        RETURN;
+    END IF;
+
+    IF kind = 'poi' THEN
+        objects := '(SELECT e.id, e.geom FROM o_t_poi p JOIN e_t_evenement e ON e.id = p.evenement)';
+        margin := '{{TREK_POI_INTERSECTION_MARGIN}}';
+    ELSIF kind = 'service' THEN
+        objects := '(SELECT e.id, e.geom FROM o_t_service s JOIN e_t_evenement e ON e.id = s.evenement)';
+        margin := '{{TREK_POI_INTERSECTION_MARGIN}}';
+    ELSIF kind = 'touristiccontent' THEN
+        objects := 't_t_contenu_touristique';
+        margin := 'greatest(pr.distance, {{TOURISM_INTERSECTION_MARGIN}})';
+    ELSIF kind = 'touristicevent' THEN
+        objects := 't_t_evenement_touristique';
+        margin := 'greatest(pr.distance, {{TOURISM_INTERSECTION_MARGIN}})';
+    ELSIF kind = 'sensitivearea' THEN
+        objects := 's_t_zone_sensible';
+        margin := '{{SENSITIVE_AREA_INTERSECTION_MARGIN}}';
+    ELSE
+        RAISE EXCEPTION 'Unknown trek proximity type';
+    END IF;
+
+    IF trek IS NOT NULL THEN
+        condition := 't.id = $2';
+    ELSE
+        condition := 'o.id = $3';
+    END IF;
+    EXECUTE 'INSERT INTO o_r_itineraire_proximite (itineraire, type, objet, distance, position)
+             SELECT t.id, $1, o.id, ST_Distance(t.geom, o.geom),
+                    CASE WHEN GeometryType(t.geom) = ''LINESTRING''
+                         THEN ST_LineLocatePoint(t.geom, ST_ClosestPoint(t.geom, o.geom)) END
+             FROM o_t_itineraire i
+             JOIN e_t_evenement t ON t.id = i.evenement
+             LEFT JOIN o_b_pratique pr ON pr.id = i.pratique
+             JOIN ' || objects || ' o ON ST_DWithin(t.geom, o.geom, ' || margin || ')
+             WHERE ' || condition
+    USING kind, trek, obj;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION rando.update_proximites_itineraire(trek integer) RETURNS void SECURITY DEFINER AS $$
+DECLARE
+    kind varchar;
+BEGIN
+    FOREACH kind IN ARRAY ARRAY['poi', 'service', 'touristiccontent', 'touristicevent']
+    LOOP
+        PERFORM update_proximites(kind, trek, NULL);
+    END LOOP;
+    -- Sensitivity module is optional
+    IF EXISTS (SELECT 1 FROM pg_tables WHERE tablename = 's_t_zone_sensible') THEN
+        PERFORM update_proximites('sensitivearea', trek, NULL);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-------------------------------------------------------------------------------
+-- Sync when treks, POIs or services geometries are computed or modified
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS e_t_evenement_proximites_u_tgr ON e_t_evenement;
+
+CREATE OR REPLACE FUNCTION rando.proximites_evenement_u() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    IF NEW.kind = 'TREK' THEN
+        PERFORM update_proximites_itineraire(NEW.id);
+    ELSIF NEW.kind IN ('POI', 'SERVICE') THEN
+        PERFORM update_proximites(lower(NEW.kind), NULL, NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER e_t_evenement_proximites_u_tgr
+AFTER UPDATE OF geom ON e_t_evenement
+FOR EACH ROW EXECUTE PROCEDURE proximites_evenement_u();
+
+
+-------------------------------------------------------------------------------
+-- Sync when treks are created or change of practice
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS o_t_itineraire_proximites_iu_tgr ON o_t_itineraire;
+
+CREATE OR REPLACE FUNCTION rando.proximites_itineraire_iu() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    -- Practice is updated on each save
+    IF TG_OP = 'UPDATE' AND OLD.pratique IS NOT DISTINCT FROM NEW.pratique THEN
+        RETURN NULL;
+    END IF;
+    PERFORM update_proximites_itineraire(NEW.evenement);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER o_t_itineraire_proximites_iu_tgr
+AFTER INSERT OR UPDATE OF pratique ON o_t_itineraire
+FOR EACH ROW EXECUTE PROCEDURE proximites_itineraire_iu();
+
+
+DROP TRIGGER IF EXISTS o_b_pratique_proximites_u_tgr ON o_b_pratique;
+
+CREATE OR REPLACE FUNCTION rando.proximites_pratique_u() RETURNS trigger SECURITY DEFINER AS $$
+BEGIN
+    -- Touristic contents and events are associated within practice distance
+    PERFORM update_proximites(kind, i.evenement, NULL)
+    FROM o_t_itineraire i, unnest(ARRAY['touristiccontent', 'touristicevent']) AS kind
+    WHERE i.pratique = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER o_b_pratique_proximites_u_tgr
+AFTER UPDATE OF distance ON o_b_pratique
+FOR EACH ROW EXECUTE PROCEDURE proximites_pratique_u();
+
+
+-------------------------------------------------------------------------------
+-- Sync when objects are created, modified or deleted
+-------------------------------------------------------------------------------
+
+DROP TRIGGER IF EXISTS o_t_poi_proximites_iud_tgr ON o_t_poi;
+DROP TRIGGER IF EXISTS o_t_service_proximites_iud_tgr ON o_t_service;
+DROP TRIGGER IF EXISTS t_t_contenu_touristique_proximites_iud_tgr ON t_t_contenu_touristique;
+DROP TRIGGER IF EXISTS t_t_evenement_touristique_proximites_iud_tgr ON t_t_evenement_touristique;
+
+CREATE OR REPLACE FUNCTION rando.proximites_objet_iud() RETURNS trigger SECURITY DEFINER AS $$
+DECLARE
+    kind varchar := TG_ARGV[0];
+    id_name varchar := TG_ARGV[1];
+    object_id integer;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        EXECUTE 'SELECT ($1).' || quote_ident(id_name) INTO object_id USING OLD;
+        DELETE FROM o_r_itineraire_proximite WHERE type = kind AND objet = object_id;
+    ELSE
+        EXECUTE 'SELECT ($1).' || quote_ident(id_name) INTO object_id USING NEW;
+        PERFORM update_proximites(kind, NULL, object_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Geometries of POIs and services are handled with evenements
+CREATE TRIGGER o_t_poi_proximites_iud_tgr
+AFTER INSERT OR DELETE ON o_t_poi
+FOR EACH ROW EXECUTE PROCEDURE proximites_objet_iud('poi', 'evenement');
+
+CREATE TRIGGER o_t_service_proximites_iud_tgr
+AFTER INSERT OR DELETE ON o_t_service
+FOR EACH ROW EXECUTE PROCEDURE proximites_objet_iud('service', 'evenement');
+
+CREATE TRIGGER t_t_contenu_touristique_proximites_iud_tgr
+AFTER INSERT OR UPDATE OF geom OR DELETE ON t_t_contenu_touristique
+FOR EACH ROW EXECUTE PROCEDURE proximites_objet_iud('touristiccontent', 'id');
+
+CREATE TRIGGER t_t_evenement_touristique_proximites_iud_tgr
+AFTER INSERT OR UPDATE OF geom OR DELETE ON t_t_evenement_touristique
+FOR EACH ROW EXECUTE PROCEDURE proximites_objet_iud('touristicevent', 'id');
+
+
+-------------------------------------------------------------------------------
+-- Margins are read from settings when loading this file, compute again
+-- all relations
+-------------------------------------------------------------------------------
+
+DELETE FROM o_r_itineraire_proximite;
+SELECT update_proximites_itineraire(evenement) FROM o_t_itineraire;
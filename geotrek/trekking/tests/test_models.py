@@ -8,7 +8,10 @@ from django.test.utils import override_settings
 from unittest import skipIf
 from bs4 import BeautifulSoup
 
+from geotrek.common.factories import AttachmentFactory
+from geotrek.common.mixins import pictures_prefetch
 from geotrek.common.tests import TranslationResetMixin
+from geotrek.common.utils.testdata import get_dummy_uploaded_image
 from geotrek.core.factories import PathFactory
 from geotrek.zoning.factories import DistrictFactory, CityFactory
 from geotrek.trekking.factories import (POIFactory, TrekFactory,
@@ -151,6 +154,38 @@ class TrekTest(TranslationResetMixin, TestCase):
                                  trek1.full_clean)
 
 
+class TrekPicturesTest(TestCase):
+    def test_pictures_are_memoized_until_attachments_change(self):
+        trek = TrekFactory.create()
+        AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image())
+        with self.assertNumQueries(1):
+            self.assertEqual(len(trek.pictures), 1)
+            self.assertEqual(len(trek.pictures), 1)
+            self.assertEqual(trek.files, [])
+        AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image())
+        self.assertEqual(len(trek.pictures), 2)
+
+    def test_pictures_prefetch(self):
+        for i in range(3):
+            trek = TrekFactory.create()
+            AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image(), starred=i == 1)
+            AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image())
+        with self.assertNumQueries(2):
+            treks = list(Trek.objects.prefetch_related(pictures_prefetch()))
+            for trek in treks:
+                self.assertEqual(len(trek.pictures), 2)
+        # Starred pictures come first
+        self.assertEqual([trek.pictures[0].starred for trek in treks].count(True), 1)
+
+    def test_pictures_prefetched_without_ordering(self):
+        trek = TrekFactory.create()
+        AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image('b.png'))
+        AttachmentFactory.create(content_object=trek, attachment_file=get_dummy_uploaded_image('a.png'))
+        trek = Trek.objects.prefetch_related('attachments').get(pk=trek.pk)
+        expected = [a.pk for a in trek.attachments.all().order_by('attachment_file')]
+        self.assertEqual([picture.pk for picture in trek.pictures], expected)
+
+
 class TrekPublicationDateTest(TranslationResetMixin, TestCase):
     def setUp(self):
         self.trek = TrekFactory.create(published=False)
@@ -348,6 +383,45 @@ class RelatedObjectsTest(TranslationResetMixin, TestCase):
         self.assertEqual(trek.city_departure, unicode(city1))
 
 
+class TrekProximityTest(TestCase):
+    @skipIf(not settings.TREKKING_TOPOLOGY_ENABLED, 'Test with dynamic segmentation only')
+    def test_proximities_follow_topologies(self):
+        p1 = PathFactory.create(geom=LineString((0, 0), (4, 4)))
+        p2 = PathFactory.create(geom=LineString((4, 4), (8, 8)))
+        trek = TrekFactory.create(no_path=True)
+        trek.add_path(p1)
+        poi = POIFactory.create(no_path=True)
+        poi.add_path(p2, start=0.5, end=0.5)
+        self.assertItemsEqual(trek.pois, [])
+        self.assertItemsEqual(poi.treks, [])
+
+        trek.add_path(p2, order=1)
+        self.assertItemsEqual(trek.pois, [poi])
+        self.assertItemsEqual(poi.treks, [trek])
+        self.assertEqual(trek.proximities.get(kind='poi', object_id=poi.pk).position, 1.5)
+
+    @skipIf(settings.TREKKING_TOPOLOGY_ENABLED, 'Test without dynamic segmentation only')
+    def test_proximities_follow_geometries_nds(self):
+        trek = TrekFactory.create(geom=LineString((0, 0), (4, 4)))
+        poi = POIFactory.create(geom=Point(2.4, 2.4))
+        self.assertItemsEqual(trek.pois, [poi])
+        self.assertAlmostEqual(trek.proximities.get(kind='poi', object_id=poi.pk).position, 0.6)
+
+        poi.geom = Point(2000, 2000)
+        poi.save()
+        self.assertItemsEqual(trek.pois, [])
+        self.assertItemsEqual(poi.treks, [])
+
+    @override_settings(TREK_POI_INTERSECTION_MARGIN=1)
+    @skipIf(settings.TREKKING_TOPOLOGY_ENABLED, 'Test without dynamic segmentation only')
+    def test_proximities_respect_current_margin_nds(self):
+        trek = TrekFactory.create(geom=LineString((0, 0), (4, 4)))
+        poi = POIFactory.create(geom=Point(10, 10))
+        self.assertItemsEqual(trek.pois, [])
+        self.assertItemsEqual(poi.treks, [])
+        self.assertTrue(trek.proximities.filter(kind='poi', object_id=poi.pk).exists())
+
+
 class TrekUpdateGeomTest(TestCase):
     def setUp(self):
         self.trek = TrekFactory.create(published=True, geom=LineString(((700000, 6600000), (700100, 6600100)), srid=2154))
@@ -9,6 +9,7 @@ import zipfile
 
 from django.test import TestCase
 from django.conf import settings
+from django.contrib.gis.geos import LineString, MultiLineString
 from django.core import management
 from django.core.management.base import CommandError
 from django.http import HttpResponse, StreamingHttpResponse
@@ -23,6 +24,7 @@ from geotrek.sensitivity.factories import SensitiveAreaFactory
 from geotrek.signage.factories import SignageFactory
 from geotrek.trekking.factories import POIFactory, PracticeFactory as PracticeTrekFactory, TrekFactory, TrekWithPublishedPOIsFactory
 from geotrek.trekking import models as trek_models
+from geotrek.trekking.management.commands.sync_rando import ExportZipFile, corridor_tiles, response_chunks
 from geotrek.tourism.factories import InformationDeskFactory, TouristicContentFactory, TouristicEventFactory
 
 
@@ -54,6 +56,22 @@ class SyncRandoTilesTest(TestCase):
             self.assertEqual(ifile.readline(), 'I am a png')
         self.assertIn("zip/tiles/global.zip", output.getvalue())
 
+    @override_settings(MOBILE_TILES_CONCURRENCY=3)
+    @mock.patch('landez.TilesManager.tile')
+    @mock.patch('landez.TilesManager.tileslist', return_value=[(9, 258, 199), (9, 258, 200), (9, 259, 199),
+                                                               (9, 259, 200)])
+    def test_tiles_concurrency(self, mock_tileslist, mock_tiles):
+        def tile(tile):
+            if tile == (9, 259, 200):
+                raise DownloadError
+            return 'I am the png {}/{}/{}'.format(*tile)
+        mock_tiles.side_effect = tile
+        management.call_command('sync_rando', 'tmp', url='http://localhost:8000', verbosity=0)
+        zfile = zipfile.ZipFile(os.path.join('tmp', 'zip', 'tiles', 'global.zip'))
+        self.assertEqual(sorted(zfile.namelist()), ['tiles/9/258/199.png', 'tiles/9/258/200.png',
+                                                    'tiles/9/259/199.png'])
+        self.assertEqual(zfile.read('tiles/9/258/200.png'), 'I am the png 9/258/200')
+
     @override_settings(MOBILE_TILES_URL=['http://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png',
                                          'http://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png'])
     @mock.patch('landez.TilesManager.tile', return_value='Error')
@@ -103,6 +121,31 @@ class SyncRandoTilesTest(TestCase):
         shutil.rmtree('tmp')
 
 
+class CorridorTilesTest(TestCase):
+    def test_tiles_between_vertices(self):
+        geom = LineString((1, 1), (179, 1), srid=4326)
+        self.assertEqual(corridor_tiles(geom, 0.01, [3]), {(3, 4, 3), (3, 5, 3), (3, 6, 3), (3, 7, 3)})
+
+    def test_tiles_of_all_parts(self):
+        geom = MultiLineString(LineString((3, 45), (3.01, 45.01)), LineString((-100, -30), (-100.01, -30.01)),
+                               srid=4326)
+        self.assertEqual(corridor_tiles(geom, 0.01, [0, 1]), {(0, 0, 0), (1, 1, 0), (1, 0, 1)})
+
+
+class ExportWriterTest(TestCase):
+    def test_response_chunks_fix2028(self):
+        response = StreamingHttpResponse(['{"a": "x\\u20', '28y", "b": "\\u2029"}'])
+        self.assertEqual(b''.join(response_chunks(response, fix2028=True)), '{"a": "x\\ny", "b": "\\n"}')
+
+    def test_export_zipfile_names(self):
+        output = BytesIO()
+        zfile = ExportZipFile(output, 'w')
+        zfile.writestr('api/en/treks.geojson', '{}')
+        self.assertIn('api/en/treks.geojson', zfile)
+        self.assertNotIn('api/fr/treks.geojson', zfile)
+        zfile.close()
+
+
 class SyncRandoFailTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -351,6 +394,56 @@ class SyncTest(SyncSetup):
                 self.assertEquals(len(treks['features']),
                                   trek_models.Trek.objects.filter(published=True).count())
 
+    @mock.patch('geotrek.trekking.management.commands.sync_rando.connections')
+    @mock.patch('geotrek.trekking.management.commands.sync_rando.Pool')
+    def test_sync_jobs(self, mock_pool, mock_connections):
+        # Run work units in the test process, to see test data
+        class SerialPool(object):
+            def __init__(self, processes, initializer=None):
+                initializer()
+
+            def imap(self, func, iterable):
+                return [func(item) for item in iterable]
+
+            def terminate(self):
+                pass
+
+            def join(self):
+                pass
+
+        mock_pool.side_effect = SerialPool
+        with mock.patch('geotrek.trekking.models.Trek.prepare_map_image'):
+            management.call_command('sync_rando', 'tmp', url='http://localhost:8000', jobs=2,
+                                    skip_tiles=True, skip_pdf=True, verbosity=2, stdout=BytesIO())
+        self.assertEqual(mock_pool.call_count, 1)
+        self.assertTrue(os.path.exists(os.path.join('tmp', 'zip', 'treks', 'en', '{}.zip'.format(self.trek_1.pk))))
+        zfile = zipfile.ZipFile(os.path.join('tmp', 'zip', 'treks', 'en', 'global.zip'))
+        names = zfile.namelist()
+        self.assertIn('api/en/parameters.json', names)
+        self.assertIn('api/en/treks/{}/pois.geojson'.format(self.trek_1.pk), names)
+        self.assertIn('api/en/treks/{}/pois.geojson'.format(self.trek_4.pk), names)
+
+    def test_sync_incremental(self):
+        with mock.patch('geotrek.trekking.models.Trek.prepare_map_image'):
+            management.call_command('sync_rando', 'tmp', url='http://localhost:8000', incremental=True,
+                                    skip_tiles=True, skip_pdf=True, verbosity=2, stdout=BytesIO())
+            self.trek_2.save()
+            output = BytesIO()
+            with mock.patch('geotrek.trekking.management.commands.sync_rando.Command.sync_trek',
+                            autospec=True) as mock_sync_trek:
+                management.call_command('sync_rando', 'tmp', url='http://localhost:8000', incremental=True,
+                                        skip_tiles=True, skip_pdf=True, verbosity=2, stdout=output)
+        # Only the modified trek is synced again
+        synced = set(call[0][2].pk for call in mock_sync_trek.call_args_list)
+        self.assertEqual(synced, set([self.trek_2.pk]))
+        self.assertIn('trek {}\x1b[0m \x1b[32munchanged'.format(self.trek_1.pk), output.getvalue())
+        self.assertTrue(os.path.exists(os.path.join('tmp', 'api', 'en', 'treks', str(self.trek_1.pk), 'pois.geojson')))
+        zfile = zipfile.ZipFile(os.path.join('tmp', 'zip', 'treks', 'en', 'global.zip'))
+        self.assertIn('api/en/treks/{}/pois.geojson'.format(self.trek_1.pk), zfile.namelist())
+        with open(os.path.join('tmp', 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+        self.assertIn('en/{}'.format(self.trek_1.pk), manifest['treks'])
+
     def test_sync_2028(self):
         self.trek_1.description = u'toto\u2028tata'
         self.trek_1.save()
@@ -13,12 +13,14 @@ from .views import (
     TrekGPXDetail, TrekKMLDetail, WebLinkCreatePopup,
     CirkwiTrekView, CirkwiPOIView, TrekPOIViewSet,
     SyncRandoRedirect, TrekServiceViewSet, sync_view,
-    sync_update_json
+    sync_update_json, TrekVectorTile, POIVectorTile
 )
 from . import serializers as trekking_serializers
 
 
 urlpatterns = [
+    url(r'^api/trek/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$', TrekVectorTile.as_view(), name="trek_vector_tile"),
+    url(r'^api/poi/tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$', POIVectorTile.as_view(), name="poi_vector_tile"),
     url(r'^api/(?P<lang>\w\w)/treks/(?P<pk>\d+)/pois\.geojson$', TrekPOIViewSet.as_view({'get': 'list'}), name="trek_poi_geojson"),
     url(r'^api/(?P<lang>\w\w)/treks/(?P<pk>\d+)/services\.geojson$', TrekServiceViewSet.as_view({'get': 'list'}), name="trek_service_geojson"),
     url(r'^api/(?P<lang>\w\w)/treks/(?P<pk>\d+)/(?P<slug>[-_\w]+).gpx$', TrekGPXDetail.as_view(), name="trek_gpx_detail"),
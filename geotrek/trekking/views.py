@@ -6,7 +6,7 @@ from urlparse import urljoin
 from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Q
-from django.db.models.query import Prefetch
+from django.db.models.query import Prefetch, QuerySet
 from django.http import HttpResponse, Http404
 from django.shortcuts import render
 from django.utils import translation
@@ -23,19 +23,22 @@ from mapentity.views import (MapEntityLayer, MapEntityList, MapEntityJsonList,
 from rest_framework import permissions as rest_permissions, viewsets
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 
+from geotrek.api.v2.utils import get_geometry_simplification, get_simplified_geometry
 from geotrek.authent.decorators import same_structure_required
-from geotrek.common.models import RecordSource, TargetPortal, Attachment
-from geotrek.common.views import FormsetMixin, PublicOrReadPermMixin, DocumentPublic, MarkupPublic
+from geotrek.common.mixins import pictures_prefetch
+from geotrek.common.models import RecordSource, TargetPortal
+from geotrek.common.views import FormsetMixin, PublicOrReadPermMixin, DocumentPublic, MarkupPublic, VectorTileView
 from geotrek.core.models import AltimetryMixin
 from geotrek.core.views import CreateFromTopologyMixin
 from geotrek.trekking.forms import SyncRandoForm
-from geotrek.zoning.models import District, City, RestrictedArea
+from geotrek.zoning.helpers import attach_zoning
+from geotrek.zoning.views import ZoningFormatListMixin, ZoningViewSetMixin
 from geotrek.celery import app as celery_app
 
 from .filters import TrekFilterSet, POIFilterSet, ServiceFilterSet
 from .forms import (TrekForm, TrekRelationshipFormSet, POIForm,
                     WebLinkCreateFormPopup, ServiceForm)
-from .models import Trek, POI, WebLink, Service, TrekRelationship, OrderedTrekChild
+from .models import Trek, POI, WebLink, Service, TrekRelationship, TrekProximity, OrderedTrekChild
 from .serializers import (TrekGPXSerializer, TrekSerializer, POISerializer,
                           CirkwiTrekSerializer, CirkwiPOISerializer, ServiceSerializer)
 from geotrek.infrastructure.models import Infrastructure
@@ -75,21 +78,9 @@ class FlattenPicturesMixin(object):
 
     def get_queryset(self):
         """ Override queryset to avoid attachment lookup while serializing.
-        It will fetch attachments, and force ``pictures`` attribute of instances.
+        It will fetch attachments of all objects at once (see ``pictures``).
         """
-        app_label = self.get_model()._meta.app_label
-        model_name = self.get_model()._meta.object_name.lower()
-        attachments = Attachment.objects.filter(content_type__app_label=app_label,
-                                                content_type__model=model_name)
-        pictures = {}
-        for attachment in attachments:
-            if attachment.is_image:
-                obj_id = attachment.object_id
-                pictures.setdefault(obj_id, []).append(attachment)
-
-        for obj in super(FlattenPicturesMixin, self).get_queryset():
-            obj.pictures = pictures.get(obj.id, [])
-            yield obj
+        return super(FlattenPicturesMixin, self).get_queryset().prefetch_related(pictures_prefetch())
 
 
 class TrekLayer(MapEntityLayer):
@@ -97,6 +88,11 @@ class TrekLayer(MapEntityLayer):
     queryset = Trek.objects.existing()
 
 
+class TrekVectorTile(VectorTileView):
+    queryset = Trek.objects.existing()
+    properties = ['name', 'published']
+
+
 class TrekList(FlattenPicturesMixin, MapEntityList):
     queryset = Trek.objects.existing()
     filterform = TrekFilterSet
@@ -107,7 +103,7 @@ class TrekJsonList(MapEntityJsonList, TrekList):
     pass
 
 
-class TrekFormatList(MapEntityFormat, TrekList):
+class TrekFormatList(ZoningFormatListMixin, MapEntityFormat, TrekList):
     columns = [
         'id', 'eid', 'eid2', 'structure', 'name', 'departure', 'arrival', 'duration',
         'duration_pretty', 'description', 'description_teaser',
@@ -285,6 +281,11 @@ class POILayer(MapEntityLayer):
     properties = ['name', 'published']
 
 
+class POIVectorTile(VectorTileView):
+    queryset = POI.objects.existing()
+    properties = ['name', 'published']
+
+
 class POIList(FlattenPicturesMixin, MapEntityList):
     queryset = POI.objects.existing()
     filterform = POIFilterSet
@@ -308,30 +309,20 @@ class POIFormatList(MapEntityFormat, POIList):
     def get_queryset(self):
         qs = super(POIFormatList, self).get_queryset()
 
-        denormalized = {}
-
-        # Since Land layers should have less records, start by them.
-        land_layers = [('districts', District),
-                       ('cities', City),
-                       ('areas', RestrictedArea)]
-        for attrname, land_layer in land_layers:
-            denormalized[attrname] = {}
-            for d in land_layer.objects.all():
-                overlapping = POI.objects.existing().filter(geom__within=d.geom)
-                for pid in overlapping.values_list('id', flat=True):
-                    denormalized[attrname].setdefault(pid, []).append(d)
-
-        # Same for treks
-        denormalized['treks'] = {}
-        for d in Trek.objects.existing():
-            for pid in d.pois.all():
-                denormalized['treks'].setdefault(pid, []).append(d)
+        # Land layers in one query per layer
+        attach_zoning(qs)
+
+        # Treks of all POIs in one query
+        treks = {}
+        proximities = TrekProximity.objects.filter(kind='poi', trek__deleted=False).select_related('trek')
+        if not settings.TREKKING_TOPOLOGY_ENABLED:
+            proximities = proximities.filter(distance__lte=settings.TREK_POI_INTERSECTION_MARGIN)
+        for proximity in proximities:
+            treks.setdefault(proximity.object_id, []).append(proximity.trek)
 
         for poi in qs:
             # Put denormalized in specific attribute used in serializers
-            for attrname in denormalized.keys():
-                overlapping = denormalized[attrname].get(poi.id, [])
-                setattr(poi, '%s_csv_display' % attrname, overlapping)
+            poi.treks_csv_display = treks.get(poi.id, [])
             yield poi
 
 
@@ -385,7 +376,7 @@ class WebLinkCreatePopup(CreateView):
         """ % (escape(form.instance._get_pk_val()), escape(form.instance)))
 
 
-class TrekViewSet(MapEntityViewSet):
+class TrekViewSet(ZoningViewSetMixin, MapEntityViewSet):
     model = Trek
     serializer_class = TrekSerializer
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
@@ -395,7 +386,7 @@ class TrekViewSet(MapEntityViewSet):
         qs = qs.select_related('structure', 'difficulty', 'practice', 'route')
         qs = qs.prefetch_related(
             'networks', 'source', 'portal', 'web_links', 'accessibilities', 'themes', 'aggregations',
-            'information_desks', 'attachments',
+            'information_desks', pictures_prefetch(),
             Prefetch('trek_relationship_a', queryset=TrekRelationship.objects.select_related('trek_a', 'trek_b')),
             Prefetch('trek_relationship_b', queryset=TrekRelationship.objects.select_related('trek_a', 'trek_b')),
             Prefetch('trek_children', queryset=OrderedTrekChild.objects.select_related('parent', 'child')),
@@ -410,21 +401,36 @@ class TrekViewSet(MapEntityViewSet):
         if 'portal' in self.request.GET:
             qs = qs.filter(Q(portal__name__in=self.request.GET['portal'].split(',')) | Q(portal=None))
 
-        qs = qs.transform(settings.API_SRID, field_name='geom')
+        tolerance, precision = get_geometry_simplification(self.request)
+        if tolerance is None and precision is None:
+            qs = qs.transform(settings.API_SRID, field_name='geom')
+        else:
+            qs = qs.annotate(api_geom=get_simplified_geometry(Trek, 'geom', tolerance, precision))
 
         return qs
 
+    def get_serializer(self, instance=None, *args, **kwargs):
+        # Serialize simplified geometries (see get_queryset)
+        if isinstance(instance, QuerySet):
+            instance = list(instance)
+        for trek in (instance if isinstance(instance, list) else [instance]):
+            if getattr(trek, 'api_geom', None) is not None:
+                trek.geom = trek.api_geom
+                trek.geom.srid = settings.API_SRID
+        return super(TrekViewSet, self).get_serializer(instance, *args, **kwargs)
+
 
-class POIViewSet(MapEntityViewSet):
+class POIViewSet(ZoningViewSetMixin, MapEntityViewSet):
     model = POI
     serializer_class = POISerializer
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
     def get_queryset(self):
-        return POI.objects.existing().filter(published=True).transform(settings.API_SRID, field_name='geom')
+        qs = POI.objects.existing().filter(published=True).prefetch_related(pictures_prefetch())
+        return qs.transform(settings.API_SRID, field_name='geom')
 
 
-class TrekPOIViewSet(viewsets.ModelViewSet):
+class TrekPOIViewSet(ZoningViewSetMixin, viewsets.ModelViewSet):
     model = POI
     permission_classes = [rest_permissions.DjangoModelPermissionsOrAnonReadOnly]
 
@@ -441,7 +447,8 @@ class TrekPOIViewSet(viewsets.ModelViewSet):
             raise Http404
         if not trek.is_public():
             raise Http404
-        return trek.pois.filter(published=True).transform(settings.API_SRID, field_name='geom')
+        qs = trek.pois.filter(published=True).prefetch_related(pictures_prefetch())
+        return qs.transform(settings.API_SRID, field_name='geom')
 
 
 class TrekSignageViewSet(viewsets.ModelViewSet):
@@ -0,0 +1,84 @@
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+from .models import City, District, RestrictedArea
+
+
+ZONING_LAYERS = OrderedDict([
+    ('cities', City),
+    ('districts', District),
+    ('areas', RestrictedArea),
+])
+
+
+def _intersection_distance(obj, layer):
+    """
+    Same margin as ``cities``, ``districts`` and ``areas`` properties: only
+    districts and areas of points (with dynamic segmentation) use one.
+    """
+    if layer == 'cities' or not settings.TREKKING_TOPOLOGY_ENABLED:
+        return 0
+    if obj.geom is None or obj.geom.geom_type != 'Point' or not hasattr(obj, 'distance'):
+        return 0
+    return obj.distance(ZONING_LAYERS[layer]) or 0
+
+
+def _zoning_pairs(model, objects, layer):
+    """
+    (object id, zone id, position along object) for zones intersecting objects
+    of ``model``, in one spatial join.
+    """
+    geom_field = model._meta.get_field('geom')
+    table_opts = geom_field.model._meta
+    zone_opts = ZONING_LAYERS[layer]._meta
+    sql = """
+    SELECT o.id, z.{zone_pk},
+           CASE WHEN GeometryType(t.{geom}) = 'LINESTRING' THEN (
+               SELECT min(ST_LineLocatePoint(t.{geom}, COALESCE(ST_StartPoint(d.geom), d.geom)))
+               FROM ST_Dump(ST_Intersection(t.{geom}, z.geom)) AS d
+           ) END
+    FROM unnest(%s::integer[], %s::float[]) AS o(id, distance)
+    JOIN {table} t ON t.{pk} = o.id
+    JOIN {zone_table} z ON ST_DWithin(t.{geom}, z.geom, o.distance)
+    """.format(table=table_opts.db_table, pk=table_opts.pk.column, geom=geom_field.column,
+               zone_table=zone_opts.db_table, zone_pk=zone_opts.pk.column)
+    cursor = connection.cursor()
+    cursor.execute(sql, [[obj.pk for obj in objects],
+                         [float(_intersection_distance(obj, layer)) for obj in objects]])
+    return cursor.fetchall()
+
+
+def attach_zoning(objects, layers=None):
+    """
+    Resolve cities, districts and restricted areas of many objects (having a
+    ``geom`` field) at once, with one spatial join per layer, and attach them
+    to instances: ``cities``, ``districts`` and ``areas`` properties will not
+    query the database anymore.
+
+    Zones are ordered along linear objects, like ``intersecting()`` does.
+    """
+    objects = [obj for obj in objects if obj.pk is not None]
+    layers = ZONING_LAYERS.keys() if layers is None else layers
+    by_model = defaultdict(list)
+    for obj in objects:
+        obj._zoning = getattr(obj, '_zoning', {})
+        by_model[type(obj)].append(obj)
+    for layer in layers:
+        zone_model = ZONING_LAYERS[layer]
+        pairs = dict((model, _zoning_pairs(model, instances, layer)) for model, instances in by_model.items())
+        # Zones in their default ordering, used after position along objects
+        zone_pks = set(zone_pk for rows in pairs.values() for obj_pk, zone_pk, position in rows)
+        zones = list(zone_model.objects.filter(pk__in=zone_pks)) if zone_pks else []
+        ranks = dict((zone.pk, rank) for rank, zone in enumerate(zones))
+        zones = dict((zone.pk, zone) for zone in zones)
+        for model, rows in pairs.items():
+            rows.sort(key=lambda row: (row[0], row[2] is None, row[2], ranks[row[1]]))
+            related = defaultdict(list)
+            for obj_pk, zone_pk, position in rows:
+                if zones[zone_pk] not in related[obj_pk]:
+                    related[obj_pk].append(zones[zone_pk])
+            for obj in by_model[model]:
+                obj._zoning[layer] = related[obj.pk]
+    return objects
@@ -94,7 +94,7 @@ if settings.TREKKING_TOPOLOGY_ENABLED:
                               _(u"Restricted area edges"))
     Intervention.add_property('areas', lambda self: self.topology.areas if self.topology else [],
                               _(u"Restricted areas"))
-    Project.add_property('area_edges', lambda self: self.edges_by_attr('area_edges'), _(u"Restricted area edges"))
+    Project.add_property('area_edges', lambda self: self.edges_by_attr(RestrictedAreaEdge), _(u"Restricted area edges"))
     Project.add_property('areas', lambda self: uniquify(map(attrgetter('restricted_area'), self.area_edges)),
                          _(u"Restricted areas"))
 else:
@@ -166,7 +166,7 @@ if settings.TREKKING_TOPOLOGY_ENABLED:
     Intervention.add_property('city_edges', lambda self: self.topology.city_edges if self.topology else [],
                               _(u"City edges"))
     Intervention.add_property('cities', lambda self: self.topology.cities if self.topology else [], _(u"Cities"))
-    Project.add_property('city_edges', lambda self: self.edges_by_attr('city_edges'), _(u"City edges"))
+    Project.add_property('city_edges', lambda self: self.edges_by_attr(CityEdge), _(u"City edges"))
     Project.add_property('cities', lambda self: uniquify(map(attrgetter('city'), self.city_edges)), _(u"Cities"))
 else:
     Topology.add_property('cities', lambda self: uniquify(intersecting(City, self, distance=0)), _(u"Cities"))
@@ -233,7 +233,7 @@ if settings.TREKKING_TOPOLOGY_ENABLED:
                               _(u"District edges"))
     Intervention.add_property('districts', lambda self: self.topology.districts if self.topology else [],
                               _(u"Districts"))
-    Project.add_property('district_edges', lambda self: self.edges_by_attr('district_edges'), _(u"District edges"))
+    Project.add_property('district_edges', lambda self: self.edges_by_attr(DistrictEdge), _(u"District edges"))
     Project.add_property('districts', lambda self: uniquify(map(attrgetter('district'), self.district_edges)),
                          _(u"Districts"))
 else:
@@ -248,3 +248,23 @@ TouristicContent.add_property('districts', lambda self: intersecting(District, s
 TouristicEvent.add_property('districts', lambda self: intersecting(District, self, distance=0), _(u"Districts"))
 if 'geotrek.diving' in settings.INSTALLED_APPS:
     Dive.add_property('districts', lambda self: intersecting(District, self, distance=0), _(u"Districts"))
+
+
+def prefetched_zoning(layer, func):
+    """ Use zones attached by ``geotrek.zoning.helpers.attach_zoning()``, if any
+    """
+    def getter(self):
+        zoning = getattr(self, '_zoning', {})
+        if layer in zoning:
+            return zoning[layer]
+        return func(self)
+    return getter
+
+
+zoned_models = [Path, Topology, Intervention, Project, TouristicContent, TouristicEvent]
+if 'geotrek.diving' in settings.INSTALLED_APPS:
+    zoned_models.append(Dive)
+for zoned_model in zoned_models:
+    for layer in ('cities', 'districts', 'areas'):
+        if isinstance(zoned_model.__dict__.get(layer), property):
+            setattr(zoned_model, layer, property(prefetched_zoning(layer, zoned_model.__dict__[layer].fget)))
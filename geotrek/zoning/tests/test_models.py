@@ -5,8 +5,9 @@ from django.contrib.gis.geos import LineString, Polygon, MultiPolygon
 from geotrek.core.models import Topology
 from geotrek.core.factories import PathFactory
 from geotrek.land.tests.test_views import EdgeHelperTest
+from geotrek.zoning.helpers import attach_zoning
 from geotrek.zoning.models import City
-from geotrek.zoning.factories import (DistrictEdgeFactory, CityEdgeFactory,
+from geotrek.zoning.factories import (DistrictEdgeFactory, CityEdgeFactory, CityFactory,
                                       RestrictedAreaFactory, RestrictedAreaEdgeFactory)
 
 
@@ -168,3 +169,28 @@ class LandLayersUpdateTest(TestCase):
         self.assertEquals(Topology.objects.filter(pk=t_ra1.pk).count(), 0)
         self.assertEquals(ra2.restrictedareaedge_set.count(), 0)
         self.assertEquals(Topology.objects.filter(pk=t_ra2.pk).count(), 0)
+
+
+class AttachZoningTest(TestCase):
+
+    def test_zones_are_attached_in_order_along_objects(self):
+        p1 = PathFactory.create(geom=LineString((5, 5), (0, 0), srid=settings.SRID))
+        p2 = PathFactory.create(geom=LineString((0, 0), (1, 1), srid=settings.SRID))
+        c1 = CityFactory.create(geom=MultiPolygon(Polygon(((-1, -1), (3, -1), (3, 3), (-1, 3), (-1, -1)),
+                                                          srid=settings.SRID)))
+        c2 = CityFactory.create(geom=MultiPolygon(Polygon(((3, 3), (9, 3), (9, 9), (3, 9), (3, 3)),
+                                                          srid=settings.SRID)))
+        paths = attach_zoning([p1, p2])
+        with self.assertNumQueries(0):
+            self.assertEqual(paths[0].cities, [c2, c1])
+            self.assertEqual(paths[1].cities, [c1])
+            self.assertEqual(paths[1].districts, [])
+            self.assertEqual(paths[1].areas, [])
+
+    def test_same_zones_as_properties(self):
+        path = PathFactory.create(geom=LineString((0, 0), (5, 5), srid=settings.SRID))
+        CityFactory.create(geom=MultiPolygon(Polygon(((-1, -1), (3, -1), (3, 3), (-1, 3), (-1, -1)),
+                                                     srid=settings.SRID)))
+        expected = list(path.cities)
+        attach_zoning([path], layers=['cities'])
+        self.assertEqual(path.cities, expected)
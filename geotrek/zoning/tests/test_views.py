@@ -1,6 +1,12 @@
+import mock
+
 from django.test import TestCase
 from django.core.urlresolvers import reverse
 
+from mapentity.factories import SuperUserFactory
+
+from geotrek.core.factories import PathFactory
+from geotrek.core.models import Path
 from geotrek.zoning.factories import RestrictedAreaTypeFactory
 
 
@@ -25,3 +31,15 @@ class RestrictedAreaViewsTest(TestCase):
         url = reverse('zoning:restrictedarea_type_layer', kwargs={'type_pk': t.pk})
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+
+
+class ZoningFormatListTest(TestCase):
+
+    def test_zoning_is_attached_once_per_export(self):
+        user = SuperUserFactory.create(password='booh')
+        self.client.login(username=user.username, password='booh')
+        PathFactory.create()
+        with mock.patch('geotrek.zoning.views.attach_zoning') as attach_zoning:
+            response = self.client.get(Path.get_format_list_url() + '?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(attach_zoning.call_count, 1)
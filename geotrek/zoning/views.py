@@ -4,9 +4,43 @@ from django.conf import settings
 from django.utils.decorators import method_decorator
 from djgeojson.views import GeoJSONLayerView
 
+from .helpers import ZONING_LAYERS, attach_zoning
 from .models import City, RestrictedArea, RestrictedAreaType, District
 
 
+class ZoningFormatListMixin(object):
+    """
+    Resolve cities, districts and restricted areas of exported objects at
+    once (see ``attach_zoning()``), instead of one query per object.
+    """
+    serializing = False
+
+    def get_queryset(self):
+        qs = super(ZoningFormatListMixin, self).get_queryset()
+        layers = [layer for layer in ZONING_LAYERS if layer in self.columns]
+        # Only the queryset of format views is evaluated, not ``object_list``
+        if layers and self.serializing:
+            attach_zoning(qs, layers)
+        return qs
+
+    def render_to_response(self, context, **response_kwargs):
+        self.serializing = True
+        return super(ZoningFormatListMixin, self).render_to_response(context, **response_kwargs)
+
+
+class ZoningViewSetMixin(object):
+    """
+    Resolve cities, districts and restricted areas of serialized lists at once
+    (see ``attach_zoning()``).
+    """
+    zoning_layers = None
+
+    def get_serializer(self, instance=None, *args, **kwargs):
+        if kwargs.get('many') and instance is not None:
+            instance = attach_zoning(instance, self.zoning_layers)
+        return super(ZoningViewSetMixin, self).get_serializer(instance, *args, **kwargs)
+
+
 class LandLayerMixin(object):
     srid = settings.API_SRID
     precision = settings.LAYER_PRECISION_LAND